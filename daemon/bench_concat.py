@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Benchmark for episode concat / transitions against synthetic clips.
+
+Generates N test clips with ffmpeg's lavfi sources (testsrc2 + sine) and
+times ffmpeg_composer over them in four modes:
+
+    copy       concat_videos without a transition (stream copy only)
+    single     one ffmpeg process cross-fading every clip (full re-encode)
+    splice     concat_videos with a transition, one encoder at a time
+    parallel   concat_videos with a transition, --workers encoders
+
+and reports per mode:
+
+    wall_s        wall time
+    duration_s    probed output duration
+    drift_ms      duration_s minus the expected sum(clips) - (N-1)·T
+    encoded_s     seconds of video re-encoded (concat_videos modes)
+    segments      ffmpeg encodes run (concat_videos modes)
+
+--gop sets the clips' keyframe interval in frames: a small GOP leaves
+short windows around each cut, one at least as long as a clip makes the
+whole episode a single encoded run, split into parallel groups.
+
+    python bench_concat.py --clips 24 --clip-seconds 5 --gop 250 --workers 4
+
+Requires ffmpeg and ffprobe on PATH. Results are written as JSON (default
+~/.opencli/benchmarks/); the daemon's config is isolated in a temporary
+HOME unless --home is given.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+MODES = ["copy", "single", "splice", "parallel"]
+
+
+def make_clips(work_dir: Path, count: int, seconds: float, size: str, fps: int,
+               gop: int) -> list[str]:
+    """Render *count* lavfi test clips (distinct patterns and tones)."""
+    clips = []
+    for i in range(count):
+        path = work_dir / f"clip_{i:03d}.mp4"
+        if not path.exists():
+            subprocess.run([
+                "ffmpeg", "-v", "error", "-y",
+                "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={fps}:duration={seconds}",
+                "-f", "lavfi", "-i", f"sine=frequency={220 + 40 * i}:sample_rate=44100:duration={seconds}",
+                "-vf", f"hue=h={(i * 37) % 360}", "-c:v", "libx264", "-preset", "veryfast",
+                "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+                "-pix_fmt", "yuv420p", "-c:a", "aac", "-ac", "2", "-shortest", str(path),
+            ], check=True)
+        clips.append(str(path))
+    return clips
+
+
+def probe_duration(path: str) -> float:
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", path],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(json.loads(out)["format"]["duration"])
+
+
+async def run_mode(mode: str, clips: list[str], output: str, transition: str,
+                   duration: float, workers: int) -> dict[str, Any]:
+    from opencli_daemon.episode import ffmpeg_composer as fc
+
+    start = time.perf_counter()
+    if mode == "single":
+        probes = [await fc._probe_clip(c) for c in clips]
+        video, audio = fc._target_format(probes)
+        fade = min(duration, min(p["duration"] for p in probes) / 2)
+        run = [(c, 0.0, p["duration"]) for c, p in zip(clips, probes)]
+        stderr, rc = await fc._encode_run(run, output, transition, fade, video, audio)
+        result: dict[str, Any] = {"success": rc == 0, "error": stderr[-500:]}
+    else:
+        result = await fc.concat_videos(
+            clips, output, "" if mode == "copy" else transition, duration,
+            workers=1 if mode == "splice" else workers,
+        )
+    wall = time.perf_counter() - start
+    if not result.get("success"):
+        raise RuntimeError(f"{mode}: {result.get('error')}")
+    return {"wall_s": round(wall, 3), "encoded_s": result.get("encoded"),
+            "segments": result.get("segments")}
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="opencli-bench-concat-"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    clips = make_clips(work_dir, args.clips, args.clip_seconds, args.size, args.fps, args.gop)
+    clip_total = sum(probe_duration(c) for c in clips)
+    print(f"{len(clips)} clips, {clip_total:.1f}s total, GOP {args.gop}, "
+          f"{args.transition} {args.transition_duration}s, {args.workers} workers")
+
+    rows = []
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        fade = 0.0 if mode == "copy" else args.transition_duration
+        expected = clip_total - (len(clips) - 1) * fade
+        walls, row = [], {}
+        for _ in range(args.repeat):
+            output = str(work_dir / f"out_{mode}.mp4")
+            row = await run_mode(mode, clips, output, args.transition,
+                                 args.transition_duration, args.workers)
+            walls.append(row["wall_s"])
+        got = probe_duration(output)
+        row.update(mode=mode, wall_s=min(walls), duration_s=round(got, 3),
+                   drift_ms=round((got - expected) * 1000, 1))
+        rows.append(row)
+        print(f"  {mode:<9} {row['wall_s']:>8.2f}s  duration {got:8.2f}s  "
+              f"drift {row['drift_ms']:>+7.1f}ms  encoded {row['encoded_s'] or '-':>6}  "
+              f"segments {row['segments'] or '-'}")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(), "machine": platform.machine(),
+        "cpus": os.cpu_count(), "args": vars(args), "results": rows,
+    }
+    out = Path(args.out) if args.out else (
+        Path(args.results_dir) / f"concat-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Results: {out}")
+    if not args.work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Episode concat / transition benchmark")
+    parser.add_argument("--clips", type=int, default=12)
+    parser.add_argument("--clip-seconds", type=float, default=5.0)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--gop", type=int, default=48, help="keyframe interval (frames)")
+    parser.add_argument("--transition", default="fade")
+    parser.add_argument("--transition-duration", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--work-dir", default="", help="keep clips here (default: temporary)")
+    parser.add_argument("--out", default="")
+    parser.add_argument("--results-dir", default=str(Path.home() / ".opencli" / "benchmarks"))
+    parser.add_argument("--home", default="", help="HOME for the daemon (default: temporary)")
+    args = parser.parse_args()
+
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        parser.error("ffmpeg and ffprobe must be on PATH")
+    # Paths are resolved from HOME at import time, so isolate before importing
+    os.environ["HOME"] = args.home or tempfile.mkdtemp(prefix="opencli-bench-")
+    sys.path.insert(0, str(Path(__file__).parent))
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""Benchmark for the pipeline executor.
+
+Runs execute_pipeline over synthetic DAGs against a stub registry whose
+node latencies follow a configurable distribution:
+
+    chain      a → b → c …                     (N nodes)
+    fanout     source → N parallel → sink
+    lattice    √N × √N diamond lattice, each node feeding two below it
+    episode    build_episode_pipeline() with N scenes
+
+and reports per graph / size:
+
+    makespan_ms          wall time of the run under the latency distribution
+    ideal_ms             critical path of the sampled latencies (map nodes:
+                         item paths packed into their parallelism)
+    efficiency           ideal_ms / makespan_ms
+    overhead_us_per_node zero-latency run time per executed node
+    progress_us_per_node extra time per node with a JSON-encoding progress callback
+    peak_alloc_kb        tracemalloc peak during a zero-latency run
+    rss_growth_kb        max RSS growth over the case
+
+Results are written as JSON (default ~/.opencli/benchmarks/) so runs can
+be compared: --compare OLD.json prints the change per case and exits 1
+when makespan or overhead regressed by more than --threshold.
+
+    python bench_executor.py --graphs chain,episode --sizes 10,100
+    python bench_executor.py --latency lognormal:2.5:0.6 --compare old.json
+
+The daemon's database and config are isolated in a temporary HOME unless
+--home is given.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+DEFAULT_SIZES = {"chain": [10, 100, 1000], "fanout": [10, 100, 1000],
+                 "lattice": [16, 100, 900], "episode": [4, 16, 64]}
+
+
+# ── Latency distributions ────────────────────────────────────────────────────
+
+
+class Latency:
+    """Latency distribution in ms: const:M, uniform:A:B, exp:MEAN, lognormal:MU:SIGMA."""
+
+    def __init__(self, spec: str) -> None:
+        self.spec = spec
+        kind, *args = spec.split(":")
+        self.kind = kind
+        self.args = [float(a) for a in args]
+        if kind not in ("const", "uniform", "exp", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "const":
+            return self.args[0]
+        if self.kind == "uniform":
+            return rng.uniform(self.args[0], self.args[1])
+        if self.kind == "exp":
+            return rng.expovariate(1 / self.args[0]) if self.args[0] > 0 else 0.0
+        return rng.lognormvariate(self.args[0], self.args[1])
+
+
+class StubRegistry:
+    """Registry that sleeps for a sampled latency and records it per node."""
+
+    def __init__(self, default: Latency, per_type: dict[str, Latency], seed: int) -> None:
+        self.default = default
+        self.per_type = per_type
+        self.rng = random.Random(seed)
+        self.slept: dict[str, float] = {}
+        self.calls = 0
+
+    async def execute_task(self, task_type: str, params: dict[str, Any]) -> dict[str, Any]:
+        from opencli_daemon.utils import tracing
+
+        self.calls += 1
+        ms = self.per_type.get(task_type, self.default).sample(self.rng)
+        # The executor's node span names the node being run
+        span = tracing.current_span()
+        key = span.attrs.get("node_id") if span else None
+        if key:
+            self.slept[key] = ms
+        if ms > 0:
+            await asyncio.sleep(ms / 1000)
+        else:
+            await asyncio.sleep(0)
+        return {"success": True, "path": f"/tmp/bench/{task_type}-{self.calls}.mp4",
+                "duration": 1.0, "result": self.calls}
+
+
+# ── Graph generators ─────────────────────────────────────────────────────────
+
+
+def _pipeline(pid: str, nodes: list[dict], edges: list[tuple[str, str]]):
+    from opencli_daemon.pipeline.definition import PipelineDefinition
+
+    return PipelineDefinition.from_json({
+        "id": pid, "name": pid, "nodes": nodes,
+        "edges": [{"id": f"e{i}", "source_node": s, "source_port": "out",
+                   "target_node": t, "target_port": "in"} for i, (s, t) in enumerate(edges)],
+    })
+
+
+def _node(nid: str, task_type: str = "bench_task", **params: Any) -> dict:
+    return {"id": nid, "type": task_type, "params": params}
+
+
+def make_chain(n: int):
+    nodes = [_node("n0")] + [_node(f"n{i}", input=f"{{{{n{i - 1}.path}}}}") for i in range(1, n)]
+    return _pipeline(f"bench_chain_{n}", nodes, [(f"n{i - 1}", f"n{i}") for i in range(1, n)])
+
+
+def make_fanout(n: int):
+    nodes = [_node("src")] + [_node(f"w{i}", input="{{src.path}}") for i in range(n)]
+    nodes.append(_node("sink", clips=[f"{{{{w{i}.path}}}}" for i in range(n)]))
+    edges = [("src", f"w{i}") for i in range(n)] + [(f"w{i}", "sink") for i in range(n)]
+    return _pipeline(f"bench_fanout_{n}", nodes, edges)
+
+
+def make_lattice(n: int):
+    side = max(2, int(math.isqrt(n)))
+    nodes, edges = [], []
+    for r in range(side):
+        for c in range(side):
+            nodes.append(_node(f"l{r}_{c}"))
+            if r:
+                for pc in {c, max(0, c - 1)}:
+                    edges.append((f"l{r - 1}_{pc}", f"l{r}_{c}"))
+    return _pipeline(f"bench_lattice_{side * side}", nodes, edges)
+
+
+def make_episode(scenes: int):
+    from opencli_daemon.episode.pipeline_builder import build_episode_pipeline
+    from opencli_daemon.episode.script import DialogueLine, EpisodeScene, EpisodeScript
+
+    script = EpisodeScript(title="bench", scenes=[
+        EpisodeScene(id=f"s{i}", visual_prompt=f"scene {i}", duration_seconds=4 + i % 5,
+                     dialogue=[DialogueLine("a", f"line {i}")] if i % 2 == 0 else [])
+        for i in range(scenes)
+    ])
+    pipeline = build_episode_pipeline(f"bench_episode_{scenes}", script)
+    pipeline.id = f"bench_episode_{scenes}"
+    return pipeline
+
+
+GENERATORS = {"chain": make_chain, "fanout": make_fanout,
+              "lattice": make_lattice, "episode": make_episode}
+
+
+# ── Measurements ─────────────────────────────────────────────────────────────
+
+
+def ideal_ms(compiled: Any, nodes: dict[str, Any], slept: dict[str, float], prefix: str = "") -> float:
+    """Critical path of the sampled latencies (a lower bound on the makespan)."""
+    from opencli_daemon.pipeline.definition import DEFAULT_MAP_PARALLELISM, MAP_NODE_TYPE
+
+    graph = compiled.graph
+    finish: dict[str, float] = {}
+    for nid in graph.topo_order:
+        start = max((finish[p] for p in graph.parents[nid]), default=0.0)
+        node = nodes[nid]
+        if node.type == MAP_NODE_TYPE:
+            sub = compiled.subgraphs[nid]
+            sub_nodes = {n.id: n for n in node.subgraph.nodes}
+            head = f"{nid}["
+            count = len({k[len(head):].split("]", 1)[0] for k in slept if k.startswith(head)})
+            paths = [ideal_ms(sub, sub_nodes, slept, f"{nid}[{i}].") for i in range(count)]
+            # parallelism caps node executions across all items
+            work = sum(ms for k, ms in slept.items() if k.startswith(head))
+            parallelism = int(node.params.get("parallelism") or DEFAULT_MAP_PARALLELISM)
+            weight = max(max(paths), work / parallelism) if paths else 0.0
+        else:
+            weight = slept.get(prefix + nid, 0.0)
+        finish[nid] = start + weight
+    return max(finish.values(), default=0.0)
+
+
+async def _run(pipeline: Any, registry: StubRegistry, on_progress: Any = None) -> tuple[float, dict]:
+    from opencli_daemon.pipeline import executor
+
+    start = time.perf_counter()
+    result = await executor.execute_pipeline(pipeline, registry, on_progress=on_progress,
+                                             record_run=False)
+    elapsed = (time.perf_counter() - start) * 1000
+    if not result.get("success"):
+        raise RuntimeError(f"{pipeline.id} failed: {result.get('error') or result.get('failed_nodes')}")
+    return elapsed, result
+
+
+async def bench_case(kind: str, size: int, latency: Latency, per_type: dict[str, Latency],
+                     seed: int, repeat: int) -> dict[str, Any]:
+    from opencli_daemon.pipeline.graph import get_compiled
+
+    pipeline = GENERATORS[kind](size)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    zero = Latency("const:0")
+
+    # Warm-up: compile cache, duration model, first-use imports
+    await _run(pipeline, StubRegistry(zero, {}, seed))
+
+    registry = StubRegistry(latency, per_type, seed)
+    makespan, _ = await _run(pipeline, registry)
+    nodes = {n.id: n for n in pipeline.nodes}
+    ideal = ideal_ms(get_compiled(pipeline), nodes, registry.slept)
+    executed = registry.calls
+
+    bare, with_progress = [], []
+    callback_ms = 0.0
+    events = 0
+
+    async def on_progress(event: dict) -> None:
+        nonlocal callback_ms, events
+        t = time.perf_counter()
+        json.dumps(event, default=str)  # what a WS / SSE broadcast pays per event
+        callback_ms += (time.perf_counter() - t) * 1000
+        events += 1
+
+    for _ in range(repeat):
+        bare.append((await _run(pipeline, StubRegistry(zero, {}, seed)))[0])
+        with_progress.append((await _run(pipeline, StubRegistry(zero, {}, seed), on_progress))[0])
+
+    tracemalloc.start()
+    await _run(pipeline, StubRegistry(zero, {}, seed))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_scale = 1 / 1024 if sys.platform == "darwin" else 1  # bytes on macOS, KB on Linux
+    bare_ms = statistics.median(bare)
+    progress_ms = statistics.median(with_progress)
+    return {
+        "graph": kind,
+        "size": size,
+        "nodes": len(pipeline.nodes),
+        "executed": executed,
+        "latency": latency.spec,
+        "makespan_ms": round(makespan, 2),
+        "ideal_ms": round(ideal, 2),
+        "efficiency": round(ideal / makespan, 4) if makespan else None,
+        "overhead_us_per_node": round(bare_ms * 1000 / max(1, executed), 2),
+        "progress_us_per_node": round((progress_ms - bare_ms) * 1000 / max(1, executed), 2),
+        "progress_events": events // max(1, repeat),
+        "progress_callback_ms": round(callback_ms / max(1, repeat), 3),
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "rss_growth_kb": round((rss_after - rss_before) * rss_scale, 1),
+    }
+
+
+# ── Reporting ────────────────────────────────────────────────────────────────
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=Path(__file__).parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(old: dict, new: dict, threshold: float) -> bool:
+    """Print per-case changes; True if anything regressed beyond *threshold*."""
+    before = {(r["graph"], r["size"], r["latency"]): r for r in old.get("results", [])}
+    regressed = False
+    print(f"\nCompared with {old.get('meta', {}).get('git_rev') or 'previous run'}:")
+    for r in new["results"]:
+        prev = before.get((r["graph"], r["size"], r["latency"]))
+        if prev is None:
+            continue
+        parts = []
+        for key in ("makespan_ms", "overhead_us_per_node"):
+            if prev.get(key):
+                change = (r[key] - prev[key]) / prev[key]
+                flag = ""
+                if change > threshold:
+                    flag, regressed = " REGRESSION", True
+                parts.append(f"{key} {change:+.1%}{flag}")
+        print(f"  {r['graph']:>8} {r['size']:>5}: " + ", ".join(parts))
+    return regressed
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    latency = Latency(args.latency)
+    per_type = {}
+    for spec in args.latency_for:
+        task_type, _, dist = spec.partition("=")
+        per_type[task_type] = Latency(dist)
+
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else None
+    results = []
+    for kind in args.graphs.split(","):
+        if kind not in GENERATORS:
+            print(f"Unknown graph kind: {kind}")
+            return 2
+        for size in sizes or DEFAULT_SIZES[kind]:
+            row = await bench_case(kind, size, latency, per_type, args.seed, args.repeat)
+            results.append(row)
+            print(f"  {kind:>8} {size:>5}: makespan {row['makespan_ms']:>9.1f} ms "
+                  f"(ideal {row['ideal_ms']:.1f}, eff {row['efficiency'] or 0:.2f}) · "
+                  f"overhead {row['overhead_us_per_node']:.0f} µs/node · "
+                  f"progress {row['progress_us_per_node']:.0f} µs/node · "
+                  f"peak {row['peak_alloc_kb']:.0f} KB")
+
+    from opencli_daemon.database import connection as db
+    await db.close_db()
+
+    report = {
+        "meta": {
+            "timestamp": int(time.time()),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    out = Path(args.out) if args.out else (
+        Path(args.results_dir) / f"executor-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text())
+        if compare(old, report, args.threshold):
+            return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pipeline executor benchmark")
+    parser.add_argument("--graphs", default="chain,fanout,lattice,episode")
+    parser.add_argument("--sizes", default="", help="comma-separated (default: per graph kind)")
+    parser.add_argument("--latency", default="uniform:1:5", help="default node latency (ms)")
+    parser.add_argument("--latency-for", action="append", default=[],
+                        metavar="TASK_TYPE=DIST", help="per-task-type latency")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="")
+    parser.add_argument("--results-dir", default=str(Path.home() / ".opencli" / "benchmarks"))
+    parser.add_argument("--compare", default="", help="earlier results JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="regression threshold")
+    parser.add_argument("--home", default="", help="HOME for the daemon (default: temporary)")
+    args = parser.parse_args()
+
+    # Paths are resolved from HOME at import time, so isolate before importing
+    os.environ["HOME"] = args.home or tempfile.mkdtemp(prefix="opencli-bench-")
+    sys.path.insert(0, str(Path(__file__).parent))
+    print(f"Pipeline executor benchmark (latency {args.latency})")
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
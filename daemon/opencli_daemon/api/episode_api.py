@@ -12,18 +12,23 @@ from pathlib import Path
 from typing import Any
 
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, Response
 
 from opencli_daemon.episode import store, generator
 from opencli_daemon.episode.script import EpisodeScript
 from opencli_daemon.episode.pipeline_builder import build_episode_pipeline
 from opencli_daemon.pipeline import store as pipeline_store
 from opencli_daemon.pipeline import executor as pipeline_executor
+from opencli_daemon.pipeline import run_store
 from opencli_daemon.api.storage_api import register_media_asset
+from opencli_daemon.database import blob_store
+from opencli_daemon.database import connection as db
+from opencli_daemon.utils.cancellation import CancelToken
 
 router = APIRouter(prefix="/api/v1", tags=["episodes"])
 
 # Track running generation tasks for cancellation
-_running_generations: dict[str, bool] = {}  # episode_id -> cancelled
+_running_generations: dict[str, CancelToken] = {}  # episode_id -> cancel token
 
 
 @router.get("/episodes")
@@ -32,6 +37,13 @@ async def list_episodes(limit: int = 50) -> dict:
     return {"episodes": episodes}
 
 
+@router.get("/episodes/resumable")
+async def list_resumable_episodes() -> dict:
+    """Episodes whose generation was interrupted by a daemon restart."""
+    episodes = await store.list_episodes_by_status("interrupted")
+    return {"episodes": episodes}
+
+
 @router.post("/episodes/from-script")
 async def create_from_script(request: Request) -> dict:
     """Create an episode directly from a structured script (no Ollama generation)."""
@@ -102,6 +114,28 @@ async def delete_episode(episode_id: str) -> dict:
 @router.post("/episodes/{episode_id}/generate")
 async def generate_episode(episode_id: str, request: Request) -> dict:
     body = await request.json() if await request.body() else {}
+    return await _start_generation(episode_id, body, resume=bool(body.get("resume")))
+
+
+@router.post("/episodes/{episode_id}/resume")
+async def resume_episode(episode_id: str, request: Request) -> dict:
+    """Resume an interrupted generation, reusing checkpointed artifacts.
+
+    Generation options default to those recorded in the checkpoint.
+    """
+    body = await request.json() if await request.body() else {}
+    checkpoint = await store.get_episode_checkpoint(episode_id)
+    if checkpoint:
+        try:
+            body = {**json.loads(checkpoint).get("options", {}), **body}
+        except json.JSONDecodeError:
+            pass
+    return await _start_generation(episode_id, body, resume=True)
+
+
+async def _start_generation(episode_id: str, body: dict, *, resume: bool) -> dict:
+    if episode_id in _running_generations:
+        return {"success": False, "error": "Generation already running"}
 
     episode = await store.get_episode(episode_id)
     if episode is None:
@@ -113,7 +147,8 @@ async def generate_episode(episode_id: str, request: Request) -> dict:
     script = EpisodeScript.from_json(script_data)
 
     # Mark as generating
-    _running_generations[episode_id] = False
+    cancel_token = CancelToken()
+    _running_generations[episode_id] = cancel_token
 
     async def _on_progress(data: dict) -> None:
         from opencli_daemon.api.websocket_manager import ws_manager
@@ -135,6 +170,7 @@ async def generate_episode(episode_id: str, request: Request) -> dict:
             if use_pipeline:
                 result = await _run_via_pipeline(
                     episode_id, pipeline_id, body, _on_progress,
+                    resume=resume, cancel_token=cancel_token,
                 )
             else:
                 result = await generator.generate_episode(
@@ -145,7 +181,12 @@ async def generate_episode(episode_id: str, request: Request) -> dict:
                     quality=body.get("quality", "standard"),
                     color_grade=body.get("color_grade", ""),
                     export_platform=body.get("export_platform", ""),
-                    cancelled=lambda: _running_generations.get(episode_id, False),
+                    cancel_token=cancel_token,
+                    resume=resume,
+                    streaming=body.get("streaming"),
+                    seed=body.get("seed"),
+                    force=bool(body.get("force")),
+                    burn_subtitles=bool(body.get("burn_subtitles")),
                 )
 
             # Ensure DB status is updated (fallback if generator's own update failed)
@@ -196,7 +237,8 @@ async def generate_episode(episode_id: str, request: Request) -> dict:
             _running_generations.pop(episode_id, None)
 
     asyncio.create_task(_run())
-    return {"success": True, "message": "Generation started", "episode_id": episode_id}
+    message = "Generation resumed" if resume else "Generation started"
+    return {"success": True, "message": message, "episode_id": episode_id}
 
 
 async def _run_via_pipeline(
@@ -204,12 +246,28 @@ async def _run_via_pipeline(
     pipeline_id: str,
     body: dict,
     on_progress,
+    *,
+    resume: bool = False,
+    cancel_token: CancelToken | None = None,
 ) -> dict:
-    """Execute episode generation via the pipeline executor."""
+    """Execute episode generation via the pipeline executor.
+
+    With resume, nodes completed by the pipeline's last unfinished run are
+    reused if their artifacts still validate.
+    """
     pipeline = await pipeline_store.get_pipeline(pipeline_id)
     if pipeline is None:
         return {"success": False, "error": f"Pipeline {pipeline_id} not found"}
 
+    resume_results: dict = {}
+    parent_run_id = None
+    if resume:
+        for run in await run_store.list_runs(pipeline_id, limit=1):
+            if run["status"] in ("interrupted", "failed", "cancelled"):
+                parent_run_id = run["id"]
+                resume_results = await run_store.load_node_results(parent_run_id, validate=True)
+                await run_store.set_run_status(parent_run_id, "resumed")
+
     from opencli_daemon.domains.registry import get_registry
 
     # Map pipeline progress → episode progress format
@@ -218,14 +276,15 @@ async def _run_via_pipeline(
     async def _pipeline_progress(data: dict):
         node_id = data.get("node_id", "")
         pct = data.get("progress", 0)
-        # Map node_id prefix to phase name
-        if node_id.startswith("scene_") and node_id.endswith("_keyframe"):
+        # Map node_id to phase name ("scenes[i].keyframe" for map items,
+        # "scene_i_keyframe" in older unrolled pipelines)
+        if node_id.endswith((".keyframe", "_keyframe")):
             phase_name = "Keyframe Generation"
-        elif node_id.startswith("scene_") and node_id.endswith("_video"):
+        elif node_id.endswith((".video", "_video")):
             phase_name = "Video Animation"
-        elif node_id.startswith("scene_") and node_id.endswith("_tts"):
+        elif node_id.endswith((".tts", "_tts")):
             phase_name = "TTS Synthesis"
-        elif node_id.startswith("assembly_"):
+        elif node_id.startswith("assembly_") or node_id.endswith(".assembly") or node_id == "scenes":
             phase_name = "Scene Assembly"
         elif node_id.startswith("post_"):
             phase_name = "Post-Processing"
@@ -245,7 +304,9 @@ async def _run_via_pipeline(
         registry,
         override_params=body.get("params"),
         on_progress=_pipeline_progress,
-        cancelled=lambda: _running_generations.get(episode_id, False),
+        cancel_token=cancel_token,
+        parent_run_id=parent_run_id,
+        resume_results=resume_results,
     )
 
     # Update episode status based on pipeline result
@@ -253,7 +314,7 @@ async def _run_via_pipeline(
         # Find the final output path from the last node
         node_results = result.get("node_results", {})
         final_path = ""
-        for nid in ["post_encode", "post_colorgrade", "post_upscale", "post_concat"]:
+        for nid in ["post_finish", "post_upscale", "post_concat"]:
             if nid in node_results and node_results[nid].get("path"):
                 final_path = node_results[nid]["path"]
                 break
@@ -282,7 +343,6 @@ async def build_pipeline(episode_id: str, request: Request) -> dict:
     await pipeline_store.save_pipeline(pipeline)
 
     # Link pipeline to episode
-    from opencli_daemon.database import connection as db
     await db.execute(
         "UPDATE episodes SET pipeline_id = ? WHERE id = ?",
         (pipeline.id, episode_id),
@@ -337,7 +397,6 @@ async def apply_template(episode_id: str, request: Request) -> dict:
     pipeline = PipelineDefinition.from_json(template_data)
     await pipeline_store.save_pipeline(pipeline)
 
-    from opencli_daemon.database import connection as db
     await db.execute(
         "UPDATE episodes SET pipeline_id = ? WHERE id = ?",
         (pipeline_id, episode_id),
@@ -371,7 +430,8 @@ async def list_pipeline_templates() -> dict:
 @router.post("/episodes/{episode_id}/cancel")
 async def cancel_generation(episode_id: str) -> dict:
     if episode_id in _running_generations:
-        _running_generations[episode_id] = True
+        # Kills in-flight inference/FFmpeg/TTS rather than waiting for the item to finish
+        _running_generations[episode_id].cancel("Cancelled by user")
         return {"success": True, "message": "Cancellation requested"}
     return {"success": False, "error": "No active generation"}
 
@@ -433,17 +493,42 @@ async def list_characters(episode_id: str) -> dict:
 async def create_character(episode_id: str, request: Request) -> dict:
     body = await request.json()
     char_id = body.get("id", str(uuid.uuid4()))
-    await store.save_character({
+    data = {
         "id": char_id,
         "episode_id": episode_id,
         "character_id": body.get("character_id", char_id),
         "name": body.get("name", ""),
         "visual_description": body.get("visual_description", ""),
         "default_voice": body.get("default_voice", "zh-CN-XiaoxiaoNeural"),
-    })
+    }
+    if body.get("reference_image_base64"):
+        image = blob_store.decode_inline_blob(body["reference_image_base64"], True)
+        if image is None:
+            return {"success": False, "error": "Invalid reference_image_base64"}
+        data["reference_image"] = image
+    await store.save_character(data)
     return {"success": True, "id": char_id}
 
 
+@router.get("/characters/{char_id}/reference-image", response_model=None)
+async def get_character_reference_image(char_id: str):
+    """Serve a character's reference image from the blob store."""
+    image = await store.get_character_blob(char_id, "reference_image")
+    if image is None:
+        return JSONResponse(status_code=404, content={"error": "No reference image"})
+    return Response(content=image, media_type=_sniff_image_type(image))
+
+
+def _sniff_image_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
 @router.delete("/characters/{char_id}")
 async def delete_character(char_id: str) -> dict:
     deleted = await store.delete_character(char_id)
@@ -2,6 +2,8 @@
 
 Allows the web UI to load generated images, videos, and audio files
 produced by pipeline execution (keyframes, TTS audio, assembled videos).
+With ``?info=1`` returns the file's media metadata (duration, size, fps,
+streams) from the MediaInfo cache instead of its content.
 """
 
 import mimetypes
@@ -10,6 +12,8 @@ from pathlib import Path
 from fastapi import APIRouter
 from fastapi.responses import FileResponse, JSONResponse
 
+from opencli_daemon.domains.media_creation import media_info
+
 router = APIRouter(prefix="/api/v1", tags=["files"])
 
 # Base directory for all served files
@@ -17,7 +21,7 @@ _OPENCLI_DIR = Path.home() / ".opencli"
 
 
 @router.get("/files/{file_path:path}", response_model=None)
-async def serve_file(file_path: str):
+async def serve_file(file_path: str, info: bool = False):
     """Serve a file from ~/.opencli/{file_path}.
 
     Security: resolved path must be within ~/.opencli/ to prevent traversal.
@@ -37,6 +41,15 @@ async def serve_file(file_path: str):
             content={"error": f"File not found: {file_path}"},
         )
 
+    if info:
+        probed = await media_info.probe(target)
+        if probed is None:
+            return JSONResponse(
+                status_code=415,
+                content={"error": f"Not a readable media file: {file_path}"},
+            )
+        return JSONResponse(content=probed.to_json())
+
     media_type, _ = mimetypes.guess_type(str(target))
     return FileResponse(
         path=str(target),
@@ -3,15 +3,23 @@
 Ported from daemon/lib/api/lora_api.dart.
 """
 
+import base64
 import time
 import uuid
 
 from fastapi import APIRouter, Request
 
+from opencli_daemon.database import blob_store
 from opencli_daemon.database import connection as db
 
 router = APIRouter(prefix="/api/v1", tags=["lora"])
 
+# Preview images live in the blob store; list queries only carry hash + size
+_LORA_COLUMNS = (
+    "id", "name", "type", "path", "trigger_word", "weight", "tags", "created_at",
+    "preview_hash", "preview_size",
+)
+
 
 # ── LoRA Registry ────────────────────────────────────────────────────────────
 
@@ -20,17 +28,21 @@ router = APIRouter(prefix="/api/v1", tags=["lora"])
 async def list_loras(type: str | None = None) -> dict:
     if type:
         rows = await db.list_rows("lora_registry", where="type = ?", params=(type,),
-                                  order_by="created_at DESC")
+                                  order_by="created_at DESC", columns=_LORA_COLUMNS)
     else:
-        rows = await db.list_rows("lora_registry", order_by="created_at DESC")
+        rows = await db.list_rows("lora_registry", order_by="created_at DESC",
+                                  columns=_LORA_COLUMNS)
     return {"loras": rows}
 
 
 @router.get("/loras/{lora_id}")
-async def get_lora(lora_id: str) -> dict:
-    row = await db.get_row("lora_registry", "id", lora_id)
+async def get_lora(lora_id: str, include_preview: bool = True) -> dict:
+    row = await db.get_row("lora_registry", "id", lora_id, columns=_LORA_COLUMNS)
     if row is None:
         return {"error": f"LoRA not found: {lora_id}"}
+    if include_preview:
+        preview = await blob_store.get_blob(row.get("preview_hash"))
+        row["preview_base64"] = base64.b64encode(preview).decode() if preview else None
     return {"lora": row}
 
 
@@ -39,6 +51,13 @@ async def create_lora(request: Request) -> dict:
     body = await request.json()
     lid = body.get("id", str(uuid.uuid4()))
     now = int(time.time() * 1000)
+    preview_hash, preview_size = None, None
+    if body.get("preview_base64"):
+        preview = blob_store.decode_inline_blob(body["preview_base64"], True)
+        if preview is None:
+            return {"success": False, "error": "Invalid preview_base64"}
+        preview_hash, preview_size = await blob_store.put_blob(preview)
+    old = await db.get_row("lora_registry", "id", lid, columns=("preview_hash",))
     await db.upsert_row("lora_registry", {
         "id": lid,
         "name": body.get("name", ""),
@@ -46,16 +65,22 @@ async def create_lora(request: Request) -> dict:
         "path": body.get("path", ""),
         "trigger_word": body.get("trigger_word", ""),
         "weight": body.get("weight", 0.7),
-        "preview_base64": body.get("preview_base64"),
+        "preview_hash": preview_hash,
+        "preview_size": preview_size,
         "tags": body.get("tags", "[]") if isinstance(body.get("tags"), str) else str(body.get("tags", "[]")),
         "created_at": now,
     })
+    if old:
+        await blob_store.release_blobs(old["preview_hash"])
     return {"success": True, "id": lid}
 
 
 @router.delete("/loras/{lora_id}")
 async def delete_lora(lora_id: str) -> dict:
+    old = await db.get_row("lora_registry", "id", lora_id, columns=("preview_hash",))
     deleted = await db.delete_row("lora_registry", "id", lora_id)
+    if old:
+        await blob_store.release_blobs(old["preview_hash"])
     return {"success": deleted}
 
 
@@ -1,17 +1,21 @@
-"""Pipeline REST API — CRUD + execute + node catalog.
+"""Pipeline REST API — CRUD + execute + async jobs + run history + node catalog.
 
 Ported from daemon/lib/pipeline/pipeline_api.dart.
 """
 
+import asyncio
 import json
 import time
 import uuid
 from typing import Any
 
 from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
 
-from opencli_daemon.pipeline import store, executor
-from opencli_daemon.pipeline.definition import PipelineDefinition
+from opencli_daemon.pipeline import store, run_store, worker_pool
+from opencli_daemon.pipeline.job_queue import QueueFullError, TERMINAL_STATUSES, get_job_queue
+from opencli_daemon.pipeline.definition import MAP_NODE_TYPE, PipelineDefinition
+from opencli_daemon.utils import ffmpeg_scheduler, tracing
 
 router = APIRouter(prefix="/api/v1", tags=["pipelines"])
 
@@ -22,6 +26,188 @@ async def list_pipelines() -> dict:
     return {"pipelines": pipelines}
 
 
+# Job and run-history routes are declared before /pipelines/{pipeline_id}
+# so the literal path segments win.
+
+# Long-poll ceiling for GET /pipelines/jobs/{run_id}/result?wait=
+_MAX_WAIT_S = 300
+_SSE_KEEPALIVE_S = 15
+
+
+@router.get("/pipelines/jobs")
+async def list_jobs() -> dict:
+    queue = get_job_queue()
+    return {"jobs": [j.to_json() for j in queue.list_jobs()], "queue": queue.stats()}
+
+
+@router.get("/pipelines/jobs/{run_id}")
+async def get_job_status(run_id: str) -> dict:
+    queue = get_job_queue()
+    job = queue.get(run_id)
+    if job is None:
+        # Not in memory (finished long ago or before a restart) — use run history
+        run = await run_store.get_run(run_id, include_nodes=False)
+        if run is None:
+            return {"success": False, "error": f"Job not found: {run_id}"}
+        return {"success": True, "job": {"run_id": run_id, "pipeline_id": run["pipeline_id"],
+                                         "status": run["status"]}}
+    return {"success": True, "job": {**job.to_json(), "position": queue.position(job)}}
+
+
+@router.get("/pipelines/jobs/{run_id}/result")
+async def get_job_result(run_id: str, wait: float = 0) -> dict:
+    """Return the run result; ?wait=N long-polls up to N seconds for completion."""
+    queue = get_job_queue()
+    job = queue.get(run_id)
+    if job is None:
+        run = await run_store.get_run(run_id)
+        if run is None:
+            return {"success": False, "error": f"Job not found: {run_id}"}
+        return {"success": True, "status": run["status"], "run": run}
+
+    if job.status not in TERMINAL_STATUSES and wait > 0:
+        await queue.wait_for(run_id, min(wait, _MAX_WAIT_S))
+    if job.status not in TERMINAL_STATUSES:
+        return {"success": True, "status": job.status, "done": False,
+                "progress": job.progress}
+    return {"success": True, "status": job.status, "done": True, "result": job.result}
+
+
+@router.get("/pipelines/jobs/{run_id}/events", response_model=None)
+async def stream_job_events(run_id: str):
+    """Server-sent events: progress updates, then a final 'done' event."""
+    job = get_job_queue().get(run_id)
+    if job is None:
+        return {"success": False, "error": f"Job not found: {run_id}"}
+
+    events: asyncio.Queue = asyncio.Queue()
+    job.subscribers.append(events)
+
+    async def _stream():
+        try:
+            yield f"event: status\ndata: {json.dumps(job.to_json())}\n\n"
+            if job.status in TERMINAL_STATUSES:
+                yield f"event: done\ndata: {json.dumps(job.to_json())}\n\n"
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), _SSE_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                name = event.pop("event", "message")
+                yield f"event: {name}\ndata: {json.dumps(event, default=str)}\n\n"
+                if name == "done":
+                    return
+        finally:
+            job.subscribers.remove(events)
+
+    return StreamingResponse(_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/pipelines/jobs/{run_id}/cancel")
+async def cancel_job(run_id: str) -> dict:
+    if get_job_queue().cancel(run_id):
+        return {"success": True, "message": "Cancellation requested"}
+    return {"success": False, "error": "No active job with that run_id"}
+
+
+@router.get("/pipelines/workers")
+async def get_workers() -> dict:
+    pool = worker_pool.get_pool()
+    if pool is None:
+        return {"enabled": False, "workers": []}
+    return {"enabled": True, **pool.stats()}
+
+
+@router.get("/pipelines/ffmpeg")
+async def get_ffmpeg_queue() -> dict:
+    """FFmpeg scheduler: running jobs, queue depth and wait times per priority class."""
+    return ffmpeg_scheduler.get_scheduler().stats()
+
+
+@router.get("/pipelines/node-stats")
+async def get_node_stats(task_type: str | None = None) -> dict:
+    return {"stats": await run_store.node_duration_stats(task_type)}
+
+
+@router.get("/pipelines/runs/{run_id}")
+async def get_pipeline_run(run_id: str) -> dict:
+    run = await run_store.get_run(run_id)
+    if run is None:
+        return {"error": f"Run not found: {run_id}"}
+    return {"success": True, "run": run}
+
+
+@router.get("/pipelines/runs/{run_id}/trace")
+async def get_pipeline_run_trace(run_id: str, format: str = "chrome") -> dict:
+    """Span timeline of a run: ?format=chrome (trace-event JSON), otlp or raw."""
+    trace = await asyncio.to_thread(tracing.load_trace, run_id)
+    if trace is None:
+        return {"success": False, "error": f"No trace for run: {run_id}"}
+    if format == "otlp":
+        return tracing.to_otlp(trace)
+    if format == "raw":
+        return trace
+    return tracing.to_chrome(trace)
+
+
+@router.get("/pipelines/runs")
+async def list_all_runs(status: str | None = None, limit: int = 50) -> dict:
+    """List recent runs; ?status=interrupted lists the resumable ones."""
+    runs = await run_store.list_runs(status=status, limit=max(1, min(limit, 500)))
+    return {"runs": runs}
+
+
+@router.post("/pipelines/runs/{run_id}/resume")
+async def resume_pipeline_run(run_id: str) -> dict:
+    """Resume an interrupted (or failed) run, reusing nodes whose outputs
+    are still on disk and unchanged.
+
+    The resumed run is queued like POST /pipelines/{id}/run; poll or
+    stream the returned run_id.
+    """
+    run = await run_store.get_run(run_id, include_nodes=False)
+    if run is None:
+        return {"success": False, "error": f"Run not found: {run_id}"}
+    if run["status"] in ("running", "completed", "resumed"):
+        return {"success": False, "error": f"Run is {run['status']}, nothing to resume"}
+
+    pipeline = await store.get_pipeline(run["pipeline_id"])
+    if pipeline is None:
+        return {"success": False, "error": f"Pipeline not found: {run['pipeline_id']}"}
+
+    from opencli_daemon.api.unified_server import app
+    registry = app.state.domain_registry
+
+    completed = await run_store.load_node_results(run_id, validate=True)
+    queue = get_job_queue()
+    # No await from here to submit: a concurrent resume of this run sees this job
+    if any(j.options.get("parent_run_id") == run_id and j.status in ("queued", "running")
+           for j in queue.list_jobs()):
+        return {"success": False, "error": f"Run {run_id} is already being resumed"}
+    try:
+        job = queue.submit(
+            pipeline, registry,
+            override_params=run["params"],
+            on_progress=_make_progress_callback(pipeline.id),
+            parent_run_id=run_id,
+            resume_results=completed,
+        )
+    except QueueFullError as e:
+        return {"success": False, "error": str(e)}
+    await run_store.set_run_status(run_id, "resumed")
+    return {"success": True, "run_id": job.run_id, "status": job.status,
+            "position": queue.position(job), "reused_nodes": sorted(completed)}
+
+
+@router.get("/pipelines/{pipeline_id}/runs")
+async def list_pipeline_runs(pipeline_id: str, limit: int = 50) -> dict:
+    runs = await run_store.list_runs(pipeline_id, limit=max(1, min(limit, 500)))
+    return {"runs": runs}
+
+
 @router.get("/pipelines/{pipeline_id}")
 async def get_pipeline(pipeline_id: str) -> dict:
     pipeline = await store.get_pipeline(pipeline_id)
@@ -76,6 +262,20 @@ def _make_progress_callback(pipeline_id: str):
     return on_progress
 
 
+async def _run_queued(pipeline: PipelineDefinition, **options: Any) -> dict:
+    """Run through the job queue (bounded, prioritised) and wait for the result.
+
+    Backs the synchronous run routes, kept for clients that predate /submit.
+    """
+    from opencli_daemon.api.unified_server import app
+    try:
+        job = get_job_queue().submit(pipeline, app.state.domain_registry, **options)
+    except QueueFullError as e:
+        return {"success": False, "error": str(e)}
+    await job.done.wait()
+    return job.result
+
+
 @router.post("/pipelines/{pipeline_id}/run")
 async def run_pipeline(pipeline_id: str, request: Request) -> dict:
     body = await request.json() if await request.body() else {}
@@ -85,15 +285,58 @@ async def run_pipeline(pipeline_id: str, request: Request) -> dict:
     if pipeline is None:
         return {"success": False, "error": f"Pipeline not found: {pipeline_id}"}
 
-    from opencli_daemon.api.unified_server import app
-    registry = app.state.domain_registry
-
-    result = await executor.execute_pipeline(
-        pipeline, registry,
+    return await _run_queued(
+        pipeline,
         override_params=override_params,
         on_progress=_make_progress_callback(pipeline_id),
     )
-    return result
+
+
+@router.post("/pipelines/{pipeline_id}/submit")
+async def submit_pipeline(pipeline_id: str, request: Request) -> dict:
+    """Queue a run and return its run_id immediately.
+
+    Body: {parameters, priority, start_from_node, previous_results, run_id}
+    (run_id here names the earlier run to load previous_results from).
+    """
+    body = await request.json() if await request.body() else {}
+
+    pipeline = await store.get_pipeline(pipeline_id)
+    if pipeline is None:
+        return {"success": False, "error": f"Pipeline not found: {pipeline_id}"}
+
+    start_from_node = body.get("start_from_node")
+    previous_results = body.get("previous_results", {})
+    source_run_id = body.get("run_id")
+    if start_from_node:
+        if start_from_node not in {n.id for n in pipeline.nodes}:
+            return {"success": False, "error": f"Node not found: {start_from_node}"}
+        if not previous_results:
+            source_run_id = source_run_id or await run_store.latest_run_id(pipeline_id)
+            if source_run_id:
+                previous_results = await run_store.load_node_results(source_run_id)
+
+    try:
+        priority = int(body.get("priority", 0))
+    except (TypeError, ValueError):
+        return {"success": False, "error": f"Invalid priority: {body.get('priority')!r}"}
+
+    from opencli_daemon.api.unified_server import app
+    queue = get_job_queue()
+    try:
+        job = queue.submit(
+            pipeline, app.state.domain_registry,
+            priority=priority,
+            override_params=body.get("parameters", {}),
+            start_from_node=start_from_node,
+            previous_results=previous_results,
+            parent_run_id=source_run_id if start_from_node else None,
+            on_progress=_make_progress_callback(pipeline_id),
+        )
+    except QueueFullError as e:
+        return {"success": False, "error": str(e)}
+    return {"success": True, "run_id": job.run_id, "status": job.status,
+            "position": queue.position(job)}
 
 
 @router.post("/pipelines/{pipeline_id}/run-from/{node_id}")
@@ -101,6 +344,7 @@ async def run_pipeline_from_node(pipeline_id: str, node_id: str, request: Reques
     body = await request.json() if await request.body() else {}
     override_params = body.get("parameters", {})
     previous_results = body.get("previous_results", {})
+    source_run_id = body.get("run_id")
 
     pipeline = await store.get_pipeline(pipeline_id)
     if pipeline is None:
@@ -111,17 +355,21 @@ async def run_pipeline_from_node(pipeline_id: str, node_id: str, request: Reques
     if node_id not in node_ids:
         return {"success": False, "error": f"Node not found: {node_id}"}
 
-    from opencli_daemon.api.unified_server import app
-    registry = app.state.domain_registry
+    # Load upstream results server-side when the client doesn't send them:
+    # from the given run_id, else from the pipeline's latest recorded run.
+    if not previous_results:
+        source_run_id = source_run_id or await run_store.latest_run_id(pipeline_id)
+        if source_run_id:
+            previous_results = await run_store.load_node_results(source_run_id)
 
-    result = await executor.execute_pipeline(
-        pipeline, registry,
+    return await _run_queued(
+        pipeline,
         override_params=override_params,
         start_from_node=node_id,
         previous_results=previous_results,
         on_progress=_make_progress_callback(pipeline_id),
+        parent_run_id=source_run_id,
     )
-    return result
 
 
 @router.get("/nodes/video-catalog")
@@ -274,4 +522,17 @@ async def get_node_catalog() -> dict:
                     "outputs": [{"id": "output", "label": "Output"}],
                 },
             })
+    # Built-in fan-out node: runs its subgraph once per item of params.items
+    catalog.append({
+        "type": MAP_NODE_TYPE,
+        "domain": "pipeline",
+        "domain_name": "Pipeline",
+        "label": "Map",
+        "icon": "call_split",
+        "color_hex": 0xFF607D8B,
+        "ports": {
+            "inputs": [{"id": "input", "label": "Items"}],
+            "outputs": [{"id": "output", "label": "Results"}],
+        },
+    })
     return {"catalog": catalog}
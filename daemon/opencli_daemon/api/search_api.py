@@ -0,0 +1,88 @@
+"""Full-text search API — GET /api/v1/search.
+
+Queries the FTS5 indexes maintained by database triggers over generation
+history prompts, chat messages, asset titles and pipeline name/description.
+"""
+
+import re
+
+from fastapi import APIRouter
+
+from opencli_daemon.database import connection as db
+
+router = APIRouter(prefix="/api/v1", tags=["search"])
+
+_SNIPPET_OPEN = "<mark>"
+_SNIPPET_CLOSE = "</mark>"
+_SNIPPET_TOKENS = 12
+
+# type -> SELECT producing (type, id, title, snippet, created_at, rank)
+_SOURCES = {
+    "history": f"""
+        SELECT 'history' AS type, t.id AS id, t.mode AS title,
+               snippet(history_fts, 0, '{_SNIPPET_OPEN}', '{_SNIPPET_CLOSE}', '…', {_SNIPPET_TOKENS}) AS snippet,
+               t.created_at AS created_at, bm25(history_fts) AS rank
+        FROM history_fts JOIN generation_history t ON t.rowid = history_fts.rowid
+        WHERE history_fts MATCH :q""",
+    "chat": f"""
+        SELECT 'chat' AS type, t.id AS id, CASE t.is_user WHEN 1 THEN 'user' ELSE 'assistant' END AS title,
+               snippet(chat_fts, 0, '{_SNIPPET_OPEN}', '{_SNIPPET_CLOSE}', '…', {_SNIPPET_TOKENS}) AS snippet,
+               t.timestamp AS created_at, bm25(chat_fts) AS rank
+        FROM chat_fts JOIN chat_messages t ON t.rowid = chat_fts.rowid
+        WHERE chat_fts MATCH :q""",
+    "assets": f"""
+        SELECT 'assets' AS type, t.id AS id, t.title AS title,
+               snippet(assets_fts, 0, '{_SNIPPET_OPEN}', '{_SNIPPET_CLOSE}', '…', {_SNIPPET_TOKENS}) AS snippet,
+               t.created_at AS created_at, bm25(assets_fts) AS rank
+        FROM assets_fts JOIN assets t ON t.rowid = assets_fts.rowid
+        WHERE assets_fts MATCH :q""",
+    "pipelines": f"""
+        SELECT 'pipelines' AS type, t.id AS id, t.name AS title,
+               snippet(pipelines_fts, -1, '{_SNIPPET_OPEN}', '{_SNIPPET_CLOSE}', '…', {_SNIPPET_TOKENS}) AS snippet,
+               t.updated_at AS created_at, bm25(pipelines_fts, 2.0, 1.0) AS rank
+        FROM pipelines_fts JOIN pipelines t ON t.rowid = pipelines_fts.rowid
+        WHERE pipelines_fts MATCH :q""",
+}
+
+
+def build_match_query(q: str) -> str:
+    """Turn free-form user input into a safe FTS5 MATCH expression.
+
+    Each whitespace-separated term is quoted (so punctuation can't trigger
+    FTS syntax errors) and the last term gets a prefix wildcard so results
+    update while the user is still typing.
+    """
+    terms = [t for t in re.split(r"\s+", q.strip()) if t]
+    if not terms:
+        return ""
+    quoted = ['"' + t.replace('"', '""') + '"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+@router.get("/search")
+async def search(q: str = "", types: str = "", limit: int = 20, offset: int = 0) -> dict:
+    match = build_match_query(q)
+    limit = max(1, min(limit, 100))
+    offset = max(0, offset)
+    if not match:
+        return {"query": q, "results": [], "total": 0, "limit": limit, "offset": offset}
+
+    wanted = [t.strip() for t in types.split(",") if t.strip()] if types else list(_SOURCES)
+    unknown = [t for t in wanted if t not in _SOURCES]
+    if unknown:
+        return {"error": f"Unknown search types: {', '.join(unknown)}"}
+
+    union = " UNION ALL ".join(_SOURCES[t] for t in wanted)
+    rows = await db.raw_query(
+        f"SELECT * FROM ({union}) ORDER BY rank LIMIT :limit OFFSET :offset",
+        {"q": match, "limit": limit, "offset": offset},
+    )
+    count = await db.raw_query(f"SELECT COUNT(*) AS c FROM ({union})", {"q": match})
+    return {
+        "query": q,
+        "results": rows,
+        "total": count[0]["c"] if count else 0,
+        "limit": limit,
+        "offset": offset,
+    }
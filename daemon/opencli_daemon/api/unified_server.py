@@ -45,6 +45,8 @@ async def _startup() -> None:
 
 @app.on_event("shutdown")
 async def _shutdown() -> None:
+    from opencli_daemon.pipeline import worker_pool
+    await worker_pool.stop_pool()
     await db.close_db()
 
 
@@ -39,6 +39,7 @@ def _register_routers() -> None:
     from opencli_daemon.api.websocket_manager import router as ws_router
     from opencli_daemon.api.execute_api import router as execute_router
     from opencli_daemon.api.files_api import router as files_router
+    from opencli_daemon.api.search_api import router as search_router
 
     app.include_router(config_router)
     app.include_router(storage_router)
@@ -50,6 +51,7 @@ def _register_routers() -> None:
     app.include_router(ws_router)
     app.include_router(execute_router)
     app.include_router(files_router)
+    app.include_router(search_router)
 
 
 def _register_domains() -> None:
@@ -305,9 +307,25 @@ async def start_daemon(port: int = 9529, ws_port: int = 9876, status_port: int =
     await db.get_db()
     print("[Daemon] Database ready")
 
+    # Work left 'running' by a previous process was interrupted by the restart
+    from opencli_daemon.episode import store as episode_store
+    from opencli_daemon.pipeline import run_store
+    for ep in await episode_store.mark_interrupted_episodes():
+        print(f"[Daemon] Episode {ep['id']} was interrupted — "
+              f"resume via POST /api/v1/episodes/{ep['id']}/resume")
+    for run in await run_store.mark_interrupted_runs():
+        print(f"[Daemon] Pipeline run {run['id']} was interrupted — "
+              f"resume via POST /api/v1/pipelines/runs/{run['id']}/resume")
+
     # 2. Domains
     _register_domains()
 
+    # Worker processes for pipeline nodes (pipeline.workers.enabled)
+    from opencli_daemon.pipeline import worker_pool
+    pool = await worker_pool.start_pool()
+    if pool is not None:
+        print(f"[Daemon] Pipeline worker coordinator on {pool.host}:{pool.port}")
+
     # 3. API routers
     _register_routers()
     print("[Daemon] API routers registered")
@@ -335,6 +353,9 @@ async def start_daemon(port: int = 9529, ws_port: int = 9876, status_port: int =
     print(f"  - Status: http://localhost:{status_port}/status")
     print(f"  - Health: http://localhost:{port}/health")
 
+    # Indexes and other deferred migrations build while the servers run
+    db.start_deferred_migrations()
+
     # Run all three servers concurrently
     await asyncio.gather(
         server.serve(),
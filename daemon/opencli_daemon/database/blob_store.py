@@ -0,0 +1,97 @@
+"""Content-addressed blob store for large binary columns.
+
+Blobs live under ~/.opencli/blobs/<aa>/<sha256> and the database keeps only
+the hex digest and byte size, so list queries never drag image/embedding
+bytes through the aiosqlite thread.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+from pathlib import Path
+from typing import Any
+
+_HOME = Path(os.environ.get("HOME", "."))
+BLOB_DIR = _HOME / ".opencli" / "blobs"
+
+# Every (table, column) holding a blob digest; unreferenced blobs are deleted
+BLOB_REFS = (
+    ("character_references", "reference_image_hash"),
+    ("character_references", "embedding_hash"),
+    ("lora_registry", "preview_hash"),
+)
+
+
+def blob_path(digest: str) -> Path:
+    """Return the on-disk path for a blob digest (the file may not exist)."""
+    return BLOB_DIR / digest[:2] / digest
+
+
+def put_blob_sync(data: bytes) -> tuple[str, int]:
+    """Store *data* and return (sha256 hex digest, size). Idempotent."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = blob_path(digest)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp name first so readers never see a partial blob
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return digest, len(data)
+
+
+def get_blob_sync(digest: str | None) -> bytes | None:
+    if not digest:
+        return None
+    path = blob_path(digest)
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+async def put_blob(data: bytes) -> tuple[str, int]:
+    """Store *data* off the event loop. Returns (digest, size)."""
+    return await asyncio.to_thread(put_blob_sync, data)
+
+
+async def get_blob(digest: str | None) -> bytes | None:
+    """Load a blob by digest off the event loop. Returns None if missing."""
+    if not digest:
+        return None
+    return await asyncio.to_thread(get_blob_sync, digest)
+
+
+async def release_blobs(*digests: str | None) -> None:
+    """Delete the blobs in *digests* that no row references any more.
+
+    Call after the row that held them was deleted or re-pointed.
+    """
+    # connection imports migrations, which import this module
+    from opencli_daemon.database import connection as db
+
+    refs = " UNION ALL ".join(f"SELECT 1 FROM {table} WHERE {col} = ?" for table, col in BLOB_REFS)
+    for digest in {d for d in digests if d}:
+        rows = await db.raw_query(f"SELECT EXISTS({refs}) AS used", (digest,) * len(BLOB_REFS))
+        if not rows[0]["used"]:
+            await asyncio.to_thread(blob_path(digest).unlink, missing_ok=True)
+
+
+def decode_inline_blob(value: Any, is_b64: bool) -> bytes | None:
+    """Normalize an inline BLOB/base64 value to raw bytes (None if unusable)."""
+    if value is None or value == "":
+        return None
+    if is_b64 and isinstance(value, str):
+        if value.startswith("data:") and "," in value:
+            value = value.split(",", 1)[1]
+        try:
+            return base64.b64decode(value)
+        except (binascii.Error, ValueError):
+            return None
+    if isinstance(value, str):
+        return value.encode()
+    return bytes(value)
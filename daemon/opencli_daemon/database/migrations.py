@@ -0,0 +1,678 @@
+"""Declarative, versioned schema migrations.
+
+Every schema change is a ``Migration`` in ``MIGRATIONS``. The runner records
+each applied version in ``schema_migrations`` together with a checksum of its
+definition and how long it took, so edits to already-shipped migrations are
+detected on startup instead of silently diverging between user databases.
+
+Long data migrations use ``MigrationContext.batched`` which walks a table in
+rowid ranges and commits between batches: other queries queued on the shared
+aiosqlite connection interleave with the migration instead of waiting behind
+one giant statement. Migrations marked ``deferred`` (pure optimizations such
+as new indexes) are applied in the background after the daemon is serving.
+
+Dry run (``python -m opencli_daemon.database.migrations --dry-run``) applies
+pending migrations inside a transaction, samples the first batches of any
+batched step to extrapolate its full duration, and rolls everything back.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import inspect
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Union
+
+import aiosqlite
+
+from . import blob_store
+
+StepFn = Callable[["MigrationContext"], Awaitable[None]]
+Step = Union[str, StepFn]
+ProgressCallback = Callable[[dict[str, Any]], Union[None, Awaitable[None]]]
+
+DRY_RUN_SAMPLE_BATCHES = 3
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema version. Steps are SQL scripts or ``async fn(ctx)``.
+
+    Steps must be idempotent: batched steps commit as they go, so a daemon
+    killed mid-migration re-runs the whole migration on next start.
+    """
+
+    version: int
+    description: str
+    steps: tuple[Step, ...] = ()
+    # Deferred migrations must be optional for correctness (e.g. indexes);
+    # they run in the background once the daemon is up.
+    deferred: bool = False
+
+    @property
+    def checksum(self) -> str:
+        h = hashlib.sha256(f"{self.version}:{self.description}".encode())
+        for step in self.steps:
+            if isinstance(step, str):
+                h.update(" ".join(step.split()).encode())
+            else:
+                try:
+                    h.update(inspect.getsource(step).encode())
+                except (OSError, TypeError):
+                    h.update(step.__qualname__.encode())
+        return h.hexdigest()[:16]
+
+
+@dataclass
+class MigrationContext:
+    db: aiosqlite.Connection
+    migration: Migration
+    dry_run: bool = False
+    on_progress: ProgressCallback | None = None
+    # Dry-run extrapolated seconds for batched steps (added to measured time)
+    estimated_extra_s: float = 0.0
+    notes: list[str] = field(default_factory=list)
+
+    async def report(self, done: int, total: int, message: str = "") -> None:
+        data = {
+            "version": self.migration.version,
+            "description": self.migration.description,
+            "done": done,
+            "total": total,
+            "message": message,
+        }
+        if self.on_progress:
+            res = self.on_progress(data)
+            if inspect.isawaitable(res):
+                await res
+
+    async def script(self, sql: str) -> None:
+        """Execute a multi-statement SQL script statement by statement.
+
+        Unlike ``executescript`` this never issues an implicit COMMIT, so it
+        can be rolled back during a dry run.
+        """
+        for stmt in split_sql(sql):
+            await self.db.execute(stmt)
+
+    async def columns(self, table: str) -> set[str]:
+        cursor = await self.db.execute(f"PRAGMA table_info({table})")
+        return {r[1] for r in await cursor.fetchall()}
+
+    async def add_column(self, table: str, column: str, decl: str) -> bool:
+        """ALTER TABLE ADD COLUMN if the column is missing. Returns True if added."""
+        if column in await self.columns(table):
+            return False
+        await self.db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        return True
+
+    async def create_index(self, name: str, table: str, columns: str) -> None:
+        """Create an index as its own committed step, timed and reported."""
+        cursor = await self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+        )
+        if await cursor.fetchone():
+            return
+        started = time.perf_counter()
+        await self.db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+        if not self.dry_run:
+            await self.db.commit()
+        self.notes.append(f"{name}: {int((time.perf_counter() - started) * 1000)}ms")
+        await asyncio.sleep(0)
+
+    async def batched(
+        self,
+        table: str,
+        handle: Callable[[list[aiosqlite.Row]], Awaitable[None]],
+        *,
+        columns: str = "*",
+        where: str = "",
+        batch_size: int = 500,
+    ) -> int:
+        """Walk *table* in rowid order, calling *handle* per batch of rows.
+
+        Commits after every batch (except in dry run) and yields to the event
+        loop. In dry run only the first few batches are processed and the
+        remaining time is extrapolated from the total row count.
+        """
+        cond = f" AND ({where})" if where else ""
+        cursor = await self.db.execute(f"SELECT COUNT(*) FROM {table} WHERE 1=1{cond}")
+        total = (await cursor.fetchone())[0]
+        done = 0
+        last_rowid = -1
+        batches = 0
+        started = time.perf_counter()
+        while True:
+            cursor = await self.db.execute(
+                f"SELECT rowid AS _rowid, {columns} FROM {table} "
+                f"WHERE rowid > ?{cond} ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size),
+            )
+            rows = await cursor.fetchall()
+            if not rows:
+                break
+            await handle(rows)
+            last_rowid = rows[-1][0]
+            done += len(rows)
+            batches += 1
+            if not self.dry_run:
+                await self.db.commit()
+            await self.report(done, total, f"{table}: {done}/{total} rows")
+            await asyncio.sleep(0)
+            if self.dry_run and batches >= DRY_RUN_SAMPLE_BATCHES and done < total:
+                elapsed = time.perf_counter() - started
+                self.estimated_extra_s += elapsed / done * (total - done)
+                self.notes.append(f"{table}: sampled {done}/{total} rows")
+                break
+        return done
+
+
+def split_sql(script: str) -> list[str]:
+    """Split a SQL script into complete statements (trigger bodies stay whole)."""
+    statements: list[str] = []
+    buf = ""
+    for part in script.split(";"):
+        buf += part + ";"
+        if sqlite3.complete_statement(buf):
+            stmt = buf.strip()
+            if stmt.strip(";").strip():
+                statements.append(stmt)
+            buf = ""
+    return statements
+
+
+# ── Migration definitions ────────────────────────────────────────────────────
+
+
+_V1_INITIAL = """
+    CREATE TABLE IF NOT EXISTS pipelines (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        description TEXT DEFAULT '',
+        nodes TEXT NOT NULL,
+        edges TEXT NOT NULL,
+        parameters TEXT DEFAULT '[]',
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS paired_devices (
+        device_id TEXT PRIMARY KEY,
+        device_name TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        paired_at INTEGER NOT NULL,
+        last_seen INTEGER NOT NULL,
+        shared_secret TEXT NOT NULL,
+        permissions TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS pending_issues (
+        id TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        body TEXT NOT NULL,
+        labels TEXT DEFAULT '[]',
+        fingerprint TEXT NOT NULL,
+        created_at INTEGER NOT NULL,
+        reported INTEGER DEFAULT 0,
+        remote_id TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_issues_fingerprint
+        ON pending_issues(fingerprint);
+
+    CREATE TABLE IF NOT EXISTS file_metadata (
+        id TEXT PRIMARY KEY,
+        filename TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        content_type TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        uploaded_at INTEGER NOT NULL,
+        metadata TEXT DEFAULT '{}'
+    );
+    CREATE INDEX IF NOT EXISTS idx_files_content_type
+        ON file_metadata(content_type);
+
+    CREATE TABLE IF NOT EXISTS generation_history (
+        id TEXT PRIMARY KEY,
+        mode TEXT NOT NULL,
+        prompt TEXT NOT NULL,
+        provider TEXT NOT NULL,
+        style TEXT DEFAULT '',
+        result_type TEXT NOT NULL,
+        thumbnail TEXT,
+        created_at INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS assets (
+        id TEXT PRIMARY KEY,
+        type TEXT NOT NULL,
+        title TEXT NOT NULL,
+        url TEXT NOT NULL,
+        thumbnail TEXT,
+        provider TEXT,
+        style TEXT,
+        created_at INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS status_events (
+        id TEXT PRIMARY KEY,
+        type TEXT NOT NULL,
+        source TEXT DEFAULT '',
+        content TEXT NOT NULL,
+        task_type TEXT,
+        status TEXT,
+        result TEXT,
+        created_at INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_events_created
+        ON status_events(created_at);
+
+    CREATE TABLE IF NOT EXISTS chat_messages (
+        id TEXT PRIMARY KEY,
+        content TEXT NOT NULL,
+        is_user INTEGER NOT NULL,
+        timestamp INTEGER NOT NULL,
+        status TEXT DEFAULT 'completed',
+        task_type TEXT,
+        result TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_chat_timestamp
+        ON chat_messages(timestamp);
+"""
+
+_V2_EPISODES = """
+    CREATE TABLE IF NOT EXISTS episodes (
+        id TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        synopsis TEXT DEFAULT '',
+        script TEXT NOT NULL,
+        status TEXT DEFAULT 'draft',
+        progress REAL DEFAULT 0,
+        output_path TEXT,
+        pipeline_id TEXT,
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_episodes_status ON episodes(status);
+
+    CREATE TABLE IF NOT EXISTS character_references (
+        id TEXT PRIMARY KEY,
+        episode_id TEXT,
+        character_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        visual_description TEXT DEFAULT '',
+        reference_image BLOB,
+        embedding BLOB,
+        default_voice TEXT DEFAULT 'zh-CN-XiaoxiaoNeural',
+        created_at INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_charref_episode
+        ON character_references(episode_id);
+    CREATE INDEX IF NOT EXISTS idx_charref_character
+        ON character_references(character_id);
+"""
+
+_V3_LORA = """
+    CREATE TABLE IF NOT EXISTS lora_registry (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        type TEXT NOT NULL DEFAULT 'style',
+        path TEXT NOT NULL,
+        trigger_word TEXT DEFAULT '',
+        weight REAL DEFAULT 0.7,
+        preview_base64 TEXT,
+        tags TEXT DEFAULT '[]',
+        created_at INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_lora_type ON lora_registry(type);
+
+    CREATE TABLE IF NOT EXISTS generation_recipes (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        description TEXT DEFAULT '',
+        image_model TEXT DEFAULT 'animagine_xl',
+        video_model TEXT DEFAULT 'local_v3',
+        quality TEXT DEFAULT 'standard',
+        lora_ids TEXT DEFAULT '[]',
+        controlnet_type TEXT DEFAULT 'lineart_anime',
+        controlnet_scale REAL DEFAULT 0.7,
+        ip_adapter_scale REAL DEFAULT 0.6,
+        color_grade TEXT DEFAULT '',
+        export_platform TEXT DEFAULT '',
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+"""
+
+
+async def _add_pipeline_id_to_episodes(ctx: MigrationContext) -> None:
+    await ctx.add_column("episodes", "pipeline_id", "TEXT")
+
+
+# FTS5 indexes: (fts table, content table, indexed columns)
+_FTS_TABLES = [
+    ("history_fts", "generation_history", ("prompt",)),
+    ("chat_fts", "chat_messages", ("content",)),
+    ("assets_fts", "assets", ("title",)),
+    ("pipelines_fts", "pipelines", ("name", "description")),
+]
+
+
+async def _create_search_index(ctx: MigrationContext) -> None:
+    # External-content FTS5 tables kept in sync by triggers on the source tables
+    for i, (fts, table, cols) in enumerate(_FTS_TABLES):
+        col_list = ", ".join(cols)
+        new_vals = ", ".join(f"new.{c}" for c in cols)
+        old_vals = ", ".join(f"old.{c}" for c in cols)
+        await ctx.script(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {col_list}, content='{table}', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {col_list}) VALUES (new.rowid, {new_vals});
+            END;
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {col_list})
+                    VALUES ('delete', old.rowid, {old_vals});
+            END;
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {col_list})
+                    VALUES ('delete', old.rowid, {old_vals});
+                INSERT INTO {fts}(rowid, {col_list}) VALUES (new.rowid, {new_vals});
+            END;
+        """)
+        # Backfill rows that existed before the index was created
+        await ctx.db.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        await ctx.report(i + 1, len(_FTS_TABLES), f"indexed {table}")
+
+
+# (table, inline column, hash column, size column, stored as base64 text)
+_BLOB_COLUMNS = [
+    ("character_references", "reference_image", "reference_image_hash", "reference_image_size", False),
+    ("character_references", "embedding", "embedding_hash", "embedding_size", False),
+    ("lora_registry", "preview_base64", "preview_hash", "preview_size", True),
+]
+
+
+async def _move_blobs_to_store(ctx: MigrationContext) -> None:
+    # Add hash/size columns, then move existing inline bytes into the blob store
+    for table, inline_col, hash_col, size_col, is_b64 in _BLOB_COLUMNS:
+        await ctx.add_column(table, hash_col, "TEXT")
+        await ctx.add_column(table, size_col, "INTEGER")
+
+        async def _move(rows: list, table=table, inline_col=inline_col,
+                        hash_col=hash_col, size_col=size_col, is_b64=is_b64) -> None:
+            for row in rows:
+                data = blob_store.decode_inline_blob(row[inline_col], is_b64)
+                if data is None:
+                    continue
+                if ctx.dry_run:
+                    digest, size = hashlib.sha256(data).hexdigest(), len(data)
+                else:
+                    digest, size = await blob_store.put_blob(data)
+                await ctx.db.execute(
+                    f"UPDATE {table} SET {hash_col} = ?, {size_col} = ?, {inline_col} = NULL "
+                    f"WHERE rowid = ?",
+                    (digest, size, row["_rowid"]),
+                )
+
+        await ctx.batched(table, _move, columns=inline_col,
+                          where=f"{inline_col} IS NOT NULL", batch_size=50)
+
+
+async def _create_listing_indexes(ctx: MigrationContext) -> None:
+    # Indexes backing the ORDER BY of the list endpoints
+    await ctx.create_index("idx_history_created", "generation_history", "created_at")
+    await ctx.create_index("idx_assets_created", "assets", "created_at")
+    await ctx.create_index("idx_pipelines_updated", "pipelines", "updated_at")
+    await ctx.create_index("idx_episodes_updated", "episodes", "updated_at")
+    await ctx.create_index("idx_charref_episode_created",
+                           "character_references", "episode_id, created_at")
+    await ctx.create_index("idx_recipes_updated", "generation_recipes", "updated_at")
+
+
+_V8_PIPELINE_RUNS = """
+    CREATE TABLE IF NOT EXISTS pipeline_runs (
+        id TEXT PRIMARY KEY,
+        pipeline_id TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'running',
+        params TEXT DEFAULT '{}',
+        start_from_node TEXT,
+        parent_run_id TEXT,
+        started_at INTEGER NOT NULL,
+        finished_at INTEGER,
+        duration_ms INTEGER,
+        error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_runs_pipeline
+        ON pipeline_runs(pipeline_id, started_at);
+
+    CREATE TABLE IF NOT EXISTS pipeline_node_runs (
+        run_id TEXT NOT NULL REFERENCES pipeline_runs(id) ON DELETE CASCADE,
+        node_id TEXT NOT NULL,
+        task_type TEXT NOT NULL,
+        status TEXT NOT NULL,
+        started_at INTEGER,
+        finished_at INTEGER,
+        duration_ms INTEGER,
+        params_hash TEXT,
+        result TEXT,
+        artifacts TEXT DEFAULT '[]',
+        error TEXT,
+        PRIMARY KEY (run_id, node_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_node_runs_task
+        ON pipeline_node_runs(task_type, finished_at);
+"""
+
+
+async def _add_episode_checkpoint(ctx: MigrationContext) -> None:
+    # JSON manifest of finished phase artifacts, used to resume after a crash
+    await ctx.add_column("episodes", "checkpoint", "TEXT")
+
+
+async def _add_node_work_units(ctx: MigrationContext) -> None:
+    # Param-derived size of each node's work (frames × steps × megapixels …),
+    # the regressor of the scheduler's per-task-type duration model
+    await ctx.add_column("pipeline_node_runs", "work_units", "REAL")
+
+
+_V11_MEDIA_INFO = """
+    CREATE TABLE IF NOT EXISTS media_info (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        probe TEXT NOT NULL,
+        keyframes TEXT,
+        probed_at INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_media_info_probed ON media_info(probed_at);
+"""
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "Initial schema with 9 tables", (_V1_INITIAL,)),
+    Migration(2, "Episode system: episodes + character_references tables", (_V2_EPISODES,)),
+    Migration(3, "LoRA registry + generation recipes tables", (_V3_LORA,)),
+    Migration(4, "Add pipeline_id to episodes for pipeline-based generation",
+              (_add_pipeline_id_to_episodes,)),
+    Migration(5, "FTS5 search index over history, chat, assets and pipelines",
+              (_create_search_index,)),
+    Migration(6, "Move character/LoRA blobs into content-addressed blob store",
+              (_move_blobs_to_store,)),
+    Migration(7, "Indexes for list endpoint ordering", (_create_listing_indexes,),
+              deferred=True),
+    Migration(8, "Pipeline run history with per-node results and timings",
+              (_V8_PIPELINE_RUNS,)),
+    Migration(9, "Episode generation checkpoints for crash recovery",
+              (_add_episode_checkpoint,)),
+    Migration(10, "Work units on node runs for duration estimates",
+              (_add_node_work_units,)),
+    Migration(11, "ffprobe metadata cache keyed by path, size and mtime",
+              (_V11_MEDIA_INFO,)),
+]
+
+LATEST_VERSION = max(m.version for m in MIGRATIONS)
+
+
+# ── Runner ───────────────────────────────────────────────────────────────────
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+async def _ensure_migrations_table(db: aiosqlite.Connection) -> None:
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            applied_at INTEGER NOT NULL,
+            description TEXT
+        )
+    """)
+    cursor = await db.execute("PRAGMA table_info(schema_migrations)")
+    existing = {r[1] for r in await cursor.fetchall()}
+    if "checksum" not in existing:
+        await db.execute("ALTER TABLE schema_migrations ADD COLUMN checksum TEXT")
+    if "duration_ms" not in existing:
+        await db.execute("ALTER TABLE schema_migrations ADD COLUMN duration_ms INTEGER")
+    await db.commit()
+
+
+async def applied_migrations(db: aiosqlite.Connection) -> dict[int, str | None]:
+    """Return {version: checksum} for every applied migration."""
+    await _ensure_migrations_table(db)
+    cursor = await db.execute("SELECT version, checksum FROM schema_migrations")
+    return {int(r[0]): r[1] for r in await cursor.fetchall()}
+
+
+async def verify_checksums(
+    db: aiosqlite.Connection, migrations: list[Migration] = MIGRATIONS,
+) -> list[int]:
+    """Warn about applied migrations whose definition changed since they ran.
+
+    Rows recorded before checksums existed are backfilled. Returns the list of
+    mismatched versions.
+    """
+    applied = await applied_migrations(db)
+    mismatched = []
+    for m in migrations:
+        if m.version not in applied:
+            continue
+        recorded = applied[m.version]
+        if recorded is None:
+            await db.execute(
+                "UPDATE schema_migrations SET checksum = ? WHERE version = ?",
+                (m.checksum, m.version),
+            )
+        elif recorded != m.checksum:
+            mismatched.append(m.version)
+            print(
+                f"[Database] Warning: migration {m.version} ({m.description}) "
+                f"changed after it was applied (checksum {recorded} != {m.checksum})"
+            )
+    await db.commit()
+    return mismatched
+
+
+async def migrate(
+    db: aiosqlite.Connection,
+    migrations: list[Migration] = MIGRATIONS,
+    *,
+    include_deferred: bool = True,
+    dry_run: bool = False,
+    on_progress: ProgressCallback | None = None,
+) -> list[dict[str, Any]]:
+    """Apply pending migrations in version order. Returns a per-migration report."""
+    applied = await applied_migrations(db)
+    pending = sorted(
+        (m for m in migrations
+         if m.version not in applied and (include_deferred or not m.deferred)),
+        key=lambda m: m.version,
+    )
+
+    report: list[dict[str, Any]] = []
+    if dry_run:
+        # One transaction around everything so later migrations see earlier ones
+        await db.commit()
+        await db.execute("BEGIN")
+    try:
+        for m in pending:
+            ctx = MigrationContext(db, m, dry_run=dry_run, on_progress=on_progress)
+            started = time.perf_counter()
+            for step in m.steps:
+                if isinstance(step, str):
+                    await ctx.script(step)
+                else:
+                    await step(ctx)
+            duration_ms = int((time.perf_counter() - started) * 1000)
+
+            if not dry_run:
+                await db.execute(
+                    "INSERT OR REPLACE INTO schema_migrations "
+                    "(version, applied_at, description, checksum, duration_ms) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (m.version, _now_ms(), m.description, m.checksum, duration_ms),
+                )
+                await db.commit()
+                print(f"[Database] Applied migration {m.version}: {m.description} ({duration_ms}ms)")
+
+            report.append({
+                "version": m.version,
+                "description": m.description,
+                "deferred": m.deferred,
+                "duration_ms": duration_ms,
+                "estimated_ms": duration_ms + int(ctx.estimated_extra_s * 1000),
+                "notes": ctx.notes,
+            })
+    except Exception:
+        await db.rollback()
+        raise
+    if dry_run:
+        await db.rollback()
+    return report
+
+
+async def run_deferred(db: aiosqlite.Connection) -> None:
+    """Apply deferred migrations in the background; failures are non-fatal."""
+    try:
+        await migrate(db, include_deferred=True)
+    except Exception as e:
+        print(f"[Database] Deferred migration failed: {e}")
+
+
+def main() -> None:
+    from . import connection
+
+    parser = argparse.ArgumentParser(description="OpenCLI database migrations")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="time pending migrations, then roll back")
+    parser.add_argument("--db", default=str(connection.DB_PATH))
+    args = parser.parse_args()
+
+    async def _run() -> None:
+        db = await aiosqlite.connect(args.db)
+        db.row_factory = aiosqlite.Row
+        await db.execute("PRAGMA recursive_triggers=ON")
+        try:
+            report = await migrate(
+                db, dry_run=args.dry_run,
+                on_progress=lambda p: print(f"  [{p['version']}] {p['message']}"),
+            )
+        finally:
+            await db.close()
+        if not report:
+            print("No pending migrations")
+        for r in report:
+            label = "would take ~" if args.dry_run else "took "
+            print(f"v{r['version']} {r['description']}: {label}{r['estimated_ms']}ms")
+            for note in r["notes"]:
+                print(f"    {note}")
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,13 @@
 Ported from daemon/lib/domains/domain.dart.
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import Any, Callable, Awaitable, Union
 
+from opencli_daemon.utils.cancellation import OperationCancelled
+
 
 @dataclass
 class DomainDisplayConfig:
@@ -67,6 +70,30 @@ class TaskDomain(ABC):
         """Execute with optional progress reporting. Default delegates to execute_task."""
         return await self.execute_task(task_type, task_data)
 
+    @property
+    def batch_task_types(self) -> set[str]:
+        """Task types whose execute_batch beats one execute_task per item."""
+        return set()
+
+    async def execute_batch(
+        self, task_type: str, items: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """Execute several tasks of one type; results are returned in order.
+
+        Default runs execute_task concurrently. Override for task types listed
+        in batch_task_types (e.g. to load a model once for the whole batch).
+        """
+        results = await asyncio.gather(
+            *(self.execute_task(task_type, data) for data in items), return_exceptions=True,
+        )
+        out = []
+        for r in results:
+            # Cancellation propagates rather than being reported per item
+            if isinstance(r, (OperationCancelled, asyncio.CancelledError)):
+                raise r
+            out.append({"success": False, "error": str(r)} if isinstance(r, BaseException) else r)
+        return out
+
     async def initialize(self) -> None:
         pass
 
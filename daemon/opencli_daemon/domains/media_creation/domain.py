@@ -16,12 +16,37 @@ from ..base import TaskDomain, DomainDisplayConfig, ProgressCallback
 from . import local_inference
 from . import remote_inference
 from . import tts_registry
-from .ffmpeg_runner import run_ffmpeg
+from .ffmpeg_runner import FFmpegProgress, FFmpegProgressCallback, run_ffmpeg
+from opencli_daemon.utils import cancellation
+from opencli_daemon.utils.cancellation import OperationCancelled
 
 _HOME = os.environ.get("HOME", ".")
 _OUTPUT_DIR = Path(_HOME) / ".opencli" / "output"
 
 
+def _ffmpeg_progress(on_progress: ProgressCallback | None, label: str,
+                     start: float = 0, end: float = 95) -> FFmpegProgressCallback | None:
+    """Map FFmpeg progress reports onto *on_progress*, spanning start..end percent."""
+    if not on_progress:
+        return None
+
+    async def _report(p: FFmpegProgress) -> None:
+        fraction = p.fraction
+        message = f"{label} {p.out_time:.1f}s"
+        if p.duration:
+            message += f" / {p.duration:.1f}s"
+        if p.speed:
+            message += f" ({p.speed:.1f}x)"
+        await on_progress({
+            "progress": round(start + (end - start) * (fraction or 0), 1),
+            "status_message": message,
+            "ffmpeg": {"frame": p.frame, "fps": p.fps, "out_time": round(p.out_time, 3),
+                       "speed": p.speed},
+        })
+
+    return _report
+
+
 class MediaCreationDomain(TaskDomain):
     id = "media_creation"
     name = "Media Creation"
@@ -59,6 +84,7 @@ class MediaCreationDomain(TaskDomain):
         "media_scene_assembly",
         "media_lut_colorgrade",
         "media_platform_encode",
+        "media_post_process",
     ]
 
     display_configs = {
@@ -122,6 +148,45 @@ class MediaCreationDomain(TaskDomain):
         await self._register_result_asset(task_type, result, task_data)
         return result
 
+    # One infer.py process per image batch; concurrent edge-tts sessions
+    batch_task_types = {"media_local_generate_image", "media_tts_synthesize"}
+
+    async def execute_batch(
+        self, task_type: str, items: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        if task_type == "media_local_generate_image":
+            inference = await self._get_inference_backend()
+            if inference is not local_inference:
+                return await super().execute_batch(task_type, items)
+            _OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+            results = await local_inference.generate_image_batch([
+                {"prompt": d.get("prompt", ""), "model": d.get("model", "animagine_xl"),
+                 "width": d.get("width", 1024), "height": d.get("height", 1024),
+                 "steps": d.get("steps", 25)}
+                for d in items
+            ])
+            for r in results:
+                r["domain"] = "media_creation"
+                r["card_type"] = "media"
+                r["inference_backend"] = "local"
+        elif task_type == "media_tts_synthesize":
+            # tts_registry caps the edge-tts sessions in flight
+            async def _one(data: dict) -> dict:
+                try:
+                    return await self._tts_synthesize(data)
+                except OperationCancelled:
+                    raise
+                except Exception as e:
+                    return {"success": False, "error": str(e), "domain": "media_creation"}
+
+            results = list(await asyncio.gather(*(_one(d) for d in items)))
+        else:
+            return await super().execute_batch(task_type, items)
+
+        for r, data in zip(results, items):
+            await self._register_result_asset(task_type, r, data)
+        return results
+
     async def _dispatch_task(
         self,
         task_type: str,
@@ -220,18 +285,22 @@ class MediaCreationDomain(TaskDomain):
             elif task_type == "media_scene_transition":
                 return await self._scene_transition(task_data)
             elif task_type == "media_video_assembly":
-                return await self._video_assembly(task_data)
+                return await self._video_assembly(task_data, on_progress)
 
             # ── Pipeline episode nodes ─────────────────────────────
             elif task_type == "media_scene_assembly":
                 return await self._scene_assembly(task_data)
             elif task_type == "media_lut_colorgrade":
-                return await self._lut_colorgrade(task_data)
+                return await self._lut_colorgrade(task_data, on_progress)
             elif task_type == "media_platform_encode":
-                return await self._platform_encode(task_data)
+                return await self._platform_encode(task_data, on_progress)
+            elif task_type == "media_post_process":
+                return await self._post_process(task_data, on_progress)
 
             return {"success": False, "error": f"Unknown task: {task_type}", "domain": "media_creation"}
 
+        except OperationCancelled:
+            raise
         except Exception as e:
             return {"success": False, "error": str(e), "domain": "media_creation"}
 
@@ -267,10 +336,11 @@ class MediaCreationDomain(TaskDomain):
             "-vf", vf,
             "-t", str(duration), "-c:v", "libx264", "-pix_fmt", "yuv420p",
             output,
-        ], timeout=120.0)
+        ], timeout=120.0, on_progress=_ffmpeg_progress(on_progress, f"Applying {effect}", 20),
+            duration=float(duration))
 
         if rc != 0:
-            return {"success": False, "error": f"FFmpeg error: {stderr[:500]}", "domain": "media_creation"}
+            return {"success": False, "error": f"FFmpeg error: {stderr[-500:]}", "domain": "media_creation"}
 
         return {
             "success": True, "path": output, "effect": effect,
@@ -305,10 +375,11 @@ class MediaCreationDomain(TaskDomain):
             "-y", *inputs,
             "-filter_complex", f"{filter_complex}{last}format=yuv420p[out]",
             "-map", "[out]", "-c:v", "libx264", output,
-        ], timeout=120.0)
+        ], timeout=120.0, on_progress=_ffmpeg_progress(on_progress, "Rendering slideshow"),
+            duration=float(duration_per * len(images) - (len(images) - 1)))
 
         if rc != 0:
-            return {"success": False, "error": f"FFmpeg error: {stderr[:500]}", "domain": "media_creation"}
+            return {"success": False, "error": f"FFmpeg error: {stderr[-500:]}", "domain": "media_creation"}
 
         return {"success": True, "path": output, "count": len(images),
                 "domain": "media_creation", "card_type": "media"}
@@ -331,12 +402,22 @@ class MediaCreationDomain(TaskDomain):
         if on_progress:
             await on_progress({"progress": 5, "status_message": "Submitting to Replicate..."})
 
-        job_id = await provider.submit(prompt, image_url=image_url)
-
+        job_id = await cancellation.cancellable(provider.submit(prompt, image_url=image_url))
+        try:
+            return await self._poll_replicate(provider, job_id, on_progress)
+        except OperationCancelled:
+            # Stop the remote prediction so it doesn't keep billing GPU time
+            try:
+                await provider.cancel(job_id)
+            except Exception:
+                pass
+            raise
+
+    async def _poll_replicate(self, provider, job_id: str, on_progress: ProgressCallback | None) -> dict:
         # Poll loop
         for i in range(72):  # 72 * 5s = 6 min timeout
-            await asyncio.sleep(5)
-            status = await provider.poll(job_id)
+            await cancellation.sleep(5)
+            status = await cancellation.cancellable(provider.poll(job_id))
 
             if on_progress:
                 await on_progress({"progress": min(90, 10 + i * 2), "status_message": f"Generating... ({status['status']})"})
@@ -345,7 +426,11 @@ class MediaCreationDomain(TaskDomain):
                 output_url = status.get("output_url", "")
                 if output_url:
                     dest = str(_OUTPUT_DIR / f"ai_video_{int(time.time() * 1000)}.mp4")
-                    await provider.download(output_url, dest)
+                    try:
+                        await cancellation.cancellable(provider.download(output_url, dest))
+                    except OperationCancelled:
+                        cancellation.remove_partial(dest)
+                        raise
                     try:
                         with open(dest, "rb") as f:
                             vid_b64 = base64.b64encode(f.read()).decode()
@@ -450,9 +535,14 @@ class MediaCreationDomain(TaskDomain):
     # ── TTS ───────────────────────────────────────────────────────────────
 
     async def _tts_synthesize(self, data: dict) -> dict:
+        """Speech for ``text``, or for ``lines`` ([{text, voice?}]) synthesized per line.
+
+        ``include_base64`` adds the audio inline; otherwise only its path is returned.
+        """
         text = data.get("text", "")
-        voice = data.get("voice", "zh-CN-XiaoxiaoNeural")
+        voice = data.get("voice") or tts_registry.DEFAULT_VOICE
         provider = data.get("provider", "edge_tts")
+        include_base64 = bool(data.get("include_base64"))
 
         if provider == "elevenlabs":
             from opencli_daemon.config import load_config, get_nested
@@ -460,9 +550,20 @@ class MediaCreationDomain(TaskDomain):
             api_key = get_nested(config, "ai_video.api_keys.elevenlabs", "")
             result = await tts_registry.synthesize_elevenlabs(
                 text, voice_id=data.get("voice_id", voice), api_key=api_key,
+                include_base64=include_base64,
             )
         else:
-            result = await tts_registry.synthesize_edge_tts(text, voice=voice)
+            rate = data.get("rate") or "+0%"
+            pitch = data.get("pitch") or "+0Hz"
+            if isinstance(data.get("lines"), list) and data["lines"]:
+                result = await tts_registry.synthesize_dialogue(
+                    data["lines"], voice=voice, rate=rate, pitch=pitch,
+                    include_base64=include_base64,
+                )
+            else:
+                result = await tts_registry.synthesize_edge_tts(
+                    text, voice=voice, rate=rate, pitch=pitch, include_base64=include_base64,
+                )
 
         result["domain"] = "media_creation"
         return result
@@ -482,7 +583,7 @@ class MediaCreationDomain(TaskDomain):
             "-c:a", "libmp3lame", output,
         ])
         if rc != 0:
-            return {"success": False, "error": stderr[:500], "domain": "media_creation"}
+            return {"success": False, "error": stderr[-500:], "domain": "media_creation"}
         return {"success": True, "path": output, "domain": "media_creation"}
 
     async def _subtitle_overlay(self, data: dict) -> dict:
@@ -497,7 +598,7 @@ class MediaCreationDomain(TaskDomain):
             output,
         ])
         if rc != 0:
-            return {"success": False, "error": stderr[:500], "domain": "media_creation"}
+            return {"success": False, "error": stderr[-500:], "domain": "media_creation"}
         return {"success": True, "path": output, "domain": "media_creation"}
 
     async def _scene_transition(self, data: dict) -> dict:
@@ -516,29 +617,26 @@ class MediaCreationDomain(TaskDomain):
             "-c:v", "libx264", "-c:a", "aac", output,
         ])
         if rc != 0:
-            return {"success": False, "error": stderr[:500], "domain": "media_creation"}
+            return {"success": False, "error": stderr[-500:], "domain": "media_creation"}
         return {"success": True, "path": output, "domain": "media_creation"}
 
-    async def _video_assembly(self, data: dict) -> dict:
+    async def _video_assembly(self, data: dict, on_progress: ProgressCallback | None = None) -> dict:
+        from opencli_daemon.episode import ffmpeg_composer
         clips = data.get("clips", [])
         if not clips:
             return {"success": False, "error": "No clips to assemble", "domain": "media_creation"}
 
         output = str(_OUTPUT_DIR / f"assembled_{int(time.time() * 1000)}.mp4")
-
-        # Write concat file
-        concat_file = str(_OUTPUT_DIR / f"concat_{int(time.time() * 1000)}.txt")
-        with open(concat_file, "w") as f:
-            for clip in clips:
-                f.write(f"file '{clip}'\n")
-
-        _, stderr, rc = await run_ffmpeg([
-            "-y", "-f", "concat", "-safe", "0", "-i", concat_file,
-            "-c:v", "libx264", "-c:a", "aac", output,
-        ])
-        if rc != 0:
-            return {"success": False, "error": stderr[:500], "domain": "media_creation"}
-        return {"success": True, "path": output, "count": len(clips), "domain": "media_creation"}
+        # Stream-copies compatible clips; only transition windows are re-encoded
+        result = await ffmpeg_composer.concat_videos(
+            clips, output,
+            transition=data.get("transition", ""),
+            transition_duration=float(data.get("transition_duration", 0.5)),
+            on_progress=_ffmpeg_progress(on_progress, "Assembling"),
+        )
+        result["count"] = len(clips)
+        result["domain"] = "media_creation"
+        return result
 
     # ── Pipeline episode nodes ────────────────────────────────────────────
 
@@ -560,7 +658,7 @@ class MediaCreationDomain(TaskDomain):
         result["domain"] = "media_creation"
         return result
 
-    async def _lut_colorgrade(self, data: dict) -> dict:
+    async def _lut_colorgrade(self, data: dict, on_progress: ProgressCallback | None = None) -> dict:
         """Apply LUT color grading to a video."""
         from opencli_daemon.episode import ffmpeg_composer
         video_path = data.get("video_path", "")
@@ -577,11 +675,13 @@ class MediaCreationDomain(TaskDomain):
         if not lut_path or not Path(lut_path).exists():
             return {"success": False, "error": f"LUT file not found: {lut_path}", "domain": "media_creation"}
 
-        result = await ffmpeg_composer.apply_lut(video_path, lut_path)
+        result = await ffmpeg_composer.apply_lut(
+            video_path, lut_path, on_progress=_ffmpeg_progress(on_progress, "Grading"),
+        )
         result["domain"] = "media_creation"
         return result
 
-    async def _platform_encode(self, data: dict) -> dict:
+    async def _platform_encode(self, data: dict, on_progress: ProgressCallback | None = None) -> dict:
         """Re-encode video for a specific platform."""
         from opencli_daemon.episode import ffmpeg_composer
         video_path = data.get("video_path", "")
@@ -590,6 +690,35 @@ class MediaCreationDomain(TaskDomain):
         if not video_path or not Path(video_path).exists():
             return {"success": False, "error": "Video file not found", "domain": "media_creation"}
 
-        result = await ffmpeg_composer.encode_for_platform(video_path, platform)
+        result = await ffmpeg_composer.encode_for_platform(
+            video_path, platform, on_progress=_ffmpeg_progress(on_progress, f"Encoding for {platform}"),
+        )
+        result["domain"] = "media_creation"
+        return result
+
+    async def _post_process(self, data: dict, on_progress: ProgressCallback | None = None) -> dict:
+        """Mux, LUT grade, subtitles and platform encode in a single ffmpeg pass."""
+        from opencli_daemon.episode import ffmpeg_composer
+        video_path = data.get("video_path", "")
+        lut_name = data.get("lut_name", "")
+        lut_path = data.get("lut_path", "")
+
+        if not video_path or not Path(video_path).exists():
+            return {"success": False, "error": "Video file not found", "domain": "media_creation"}
+        if not lut_path and lut_name:
+            lut_path = str(Path(_HOME) / ".opencli" / "luts" / f"{lut_name}.cube")
+        if lut_path and not Path(lut_path).exists():
+            return {"success": False, "error": f"LUT file not found: {lut_path}", "domain": "media_creation"}
+
+        result = await ffmpeg_composer.render_post(
+            video_path,
+            audio_path=data.get("audio_path", ""),
+            lut_path=lut_path,
+            subtitle_path=data.get("subtitle_path", ""),
+            burn_subtitles=bool(data.get("burn_subtitles", True)),
+            platform=data.get("platform", ""),
+            intermediates=data.get("intermediates") or None,
+            on_progress=_ffmpeg_progress(on_progress, "Post-processing"),
+        )
         result["domain"] = "media_creation"
         return result
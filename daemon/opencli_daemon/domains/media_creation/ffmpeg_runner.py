@@ -1,15 +1,122 @@
 """Async FFmpeg subprocess runner.
 
 Replaces Dart's Process.run for FFmpeg commands.
+
+run_ffmpeg streams the process's pipes instead of buffering them: stderr
+is kept in a bounded tail (STDERR_TAIL_BYTES) however long the encode,
+and with on_progress the command gets ``-progress pipe:1`` and each
+progress block is parsed into an FFmpegProgress (frame, fps, out_time,
+speed) for the caller.
 """
 
 import asyncio
+import inspect
+import logging
+import os
 import shutil
-from typing import Sequence
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Sequence, Union
+
+from opencli_daemon.utils import cancellation, ffmpeg_scheduler, tracing
+from opencli_daemon.utils.cancellation import CancelToken, OperationCancelled
 
+logger = logging.getLogger(__name__)
 
 _ffmpeg_path: str | None = None
 
+# Bytes of stderr kept per run (the end is where FFmpeg reports errors)
+STDERR_TAIL_BYTES = 64 * 1024
+
+
+@dataclass
+class FFmpegProgress:
+    """One ``-progress`` report."""
+
+    frame: int = 0
+    fps: float = 0.0
+    out_time: float = 0.0          # seconds of output written
+    speed: float | None = None     # × realtime
+    total_size: int = 0
+    done: bool = False             # the final report (progress=end)
+    duration: float | None = None  # expected output seconds, if the caller knew
+
+    @property
+    def fraction(self) -> float | None:
+        """Share of *duration* written (None when it isn't known)."""
+        if self.done:
+            return 1.0
+        if not self.duration:
+            return None
+        return max(0.0, min(1.0, self.out_time / self.duration))
+
+    @classmethod
+    def parse(cls, fields: dict[str, str], duration: float | None = None) -> "FFmpegProgress":
+        def _num(key: str, kind: type = float) -> Any:
+            value = fields.get(key, "").strip().rstrip("x")
+            try:
+                return kind(value)
+            except ValueError:
+                return None
+
+        # out_time_us is microseconds (out_time_ms is too, despite its name)
+        micros = _num("out_time_us", int) or _num("out_time_ms", int) or 0
+        return cls(
+            frame=_num("frame", int) or 0,
+            fps=_num("fps") or 0.0,
+            out_time=max(0, micros) / 1e6,
+            speed=_num("speed"),
+            total_size=_num("total_size", int) or 0,
+            done=fields.get("progress") == "end",
+            duration=duration,
+        )
+
+
+FFmpegProgressCallback = Callable[[FFmpegProgress], Union[None, Awaitable[None]]]
+
+
+class _Tail:
+    """The last *limit* bytes written to it."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.buf = bytearray()
+        self.dropped = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.buf += chunk
+        excess = len(self.buf) - self.limit
+        if excess > 0:
+            del self.buf[:excess]
+            self.dropped += excess
+
+    def text(self) -> str:
+        return self.buf.decode(errors="replace")
+
+
+async def _pump(stream: asyncio.StreamReader, tail: _Tail) -> None:
+    while chunk := await stream.read(65536):
+        tail.write(chunk)
+
+
+async def _read_progress(stream: asyncio.StreamReader, duration: float | None,
+                         on_progress: FFmpegProgressCallback) -> None:
+    fields: dict[str, str] = {}
+    while line := await stream.readline():
+        key, sep, value = line.decode(errors="replace").strip().partition("=")
+        if not sep:
+            continue
+        fields[key] = value
+        if key == "progress":
+            # A block ends with progress=continue|end
+            try:
+                result = on_progress(FFmpegProgress.parse(fields, duration))
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                # Progress is advisory; keep draining so FFmpeg never blocks on the pipe
+                logger.warning("FFmpeg progress callback failed: %s", e)
+            fields = {}
+
 
 def get_ffmpeg() -> str:
     """Find FFmpeg binary path."""
@@ -23,35 +130,93 @@ def get_ffprobe() -> str:
     return shutil.which("ffprobe") or "ffprobe"
 
 
-async def run_ffmpeg(args: Sequence[str], *, timeout: float = 300.0) -> tuple[str, str, int]:
-    """Run an FFmpeg command. Returns (stdout, stderr, returncode)."""
+async def run_ffmpeg(
+    args: Sequence[str],
+    *,
+    timeout: float = 300.0,
+    cancel_token: CancelToken | None = None,
+    priority: int | None = None,
+    on_progress: FFmpegProgressCallback | None = None,
+    duration: float | None = None,
+) -> tuple[str, str, int]:
+    """Run an FFmpeg command. Returns (stdout, stderr, returncode).
+
+    The job waits for a slot in the FFmpeg scheduler (at *priority*,
+    default: the bound class, see ffmpeg_scheduler) and runs with the
+    threads it is granted; *timeout* counts from the start of the process.
+
+    With *on_progress* FFmpeg reports progress on stdout, and the callback
+    gets an FFmpegProgress per report (about twice a second); *duration*,
+    the expected output length, gives it a fraction. stdout and stderr are
+    returned as their last STDERR_TAIL_BYTES.
+
+    On timeout or cancellation (explicit token or the one bound to the
+    current task) FFmpeg is killed and a half-written output file — the
+    last argument, if it did not exist before — is removed.
+    """
+    output = args[-1] if args and not str(args[-1]).startswith("-") else None
+    output_existed = bool(output) and os.path.exists(output)
+    args = list(args)
+    if on_progress:
+        args = ["-progress", "pipe:1", "-nostats", *args]
+    async with ffmpeg_scheduler.get_scheduler().job(priority, cancel_token) as threads:
+        return await _run_ffmpeg(ffmpeg_scheduler.with_threads(args, threads),
+                                 output, output_existed, timeout, cancel_token, threads,
+                                 on_progress, duration)
+
+
+async def _run_ffmpeg(args: list[str], output: str | None, output_existed: bool,
+                      timeout: float, cancel_token: CancelToken | None, threads: int,
+                      on_progress: FFmpegProgressCallback | None,
+                      duration: float | None) -> tuple[str, str, int]:
     cmd = [get_ffmpeg(), *args]
-    proc = await asyncio.create_subprocess_exec(
-        *cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    try:
-        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
-    except asyncio.TimeoutError:
-        proc.kill()
-        await proc.communicate()
-        raise TimeoutError(f"FFmpeg timed out after {timeout}s")
-    return stdout.decode(), stderr.decode(), proc.returncode
+    stdout, stderr = _Tail(STDERR_TAIL_BYTES), _Tail(STDERR_TAIL_BYTES)
+    with tracing.span("ffmpeg", output=os.path.basename(str(output or "")),
+                      threads=threads) as span:
+        with tracing.span("spawn"):
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+
+        async def _io() -> None:
+            reader = (_read_progress(proc.stdout, duration, on_progress) if on_progress
+                      else _pump(proc.stdout, stdout))
+            await asyncio.gather(reader, _pump(proc.stderr, stderr))
+            await proc.wait()
+
+        try:
+            await cancellation.supervise(proc, _io(), timeout=timeout, token=cancel_token)
+        except (TimeoutError, OperationCancelled, asyncio.CancelledError) as e:
+            if not output_existed:
+                cancellation.remove_partial(output)
+            if isinstance(e, TimeoutError):
+                raise TimeoutError(f"FFmpeg timed out after {timeout}s")
+            raise
+        if span:
+            span.set(returncode=proc.returncode, stderr_dropped=stderr.dropped)
+    return stdout.text(), stderr.text(), proc.returncode
 
 
-async def run_ffprobe(args: Sequence[str], *, timeout: float = 30.0) -> tuple[str, str, int]:
+async def run_ffprobe(
+    args: Sequence[str],
+    *,
+    timeout: float = 30.0,
+    cancel_token: CancelToken | None = None,
+) -> tuple[str, str, int]:
     """Run an FFprobe command."""
     cmd = [get_ffprobe(), *args]
-    proc = await asyncio.create_subprocess_exec(
-        *cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    try:
-        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
-    except asyncio.TimeoutError:
-        proc.kill()
-        await proc.communicate()
-        raise TimeoutError(f"FFprobe timed out after {timeout}s")
+    with tracing.span("ffprobe"):
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        try:
+            stdout, stderr = await cancellation.communicate(proc, timeout=timeout, token=cancel_token)
+        except TimeoutError:
+            raise TimeoutError(f"FFprobe timed out after {timeout}s")
     return stdout.decode(), stderr.decode(), proc.returncode
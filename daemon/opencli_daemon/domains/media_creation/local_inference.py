@@ -15,6 +15,10 @@ import os
 from pathlib import Path
 from typing import Any
 
+from opencli_daemon.utils import cancellation, tracing
+from opencli_daemon.utils.cancellation import CancelToken, OperationCancelled
+from . import media_info
+
 logger = logging.getLogger(__name__)
 
 _INFERENCE_DIR = Path(__file__).resolve().parents[4] / "local-inference"
@@ -22,33 +26,80 @@ _INFER_SCRIPT = _INFERENCE_DIR / "infer.py"
 _VENV_PYTHON = _INFERENCE_DIR / ".venv" / "bin" / "python"
 _MODELS_DIR = Path(os.environ.get("HOME", ".")) / ".opencli" / "models"
 
+# Actions that read params["video_path"] and need its frame rate
+_VIDEO_ACTIONS = {"upscale_video", "upscale_video_path", "interpolate", "interpolate_video"}
+
 
 def _is_available() -> bool:
     """Check if local inference environment is set up."""
     return _VENV_PYTHON.exists() and _INFER_SCRIPT.exists()
 
 
-async def run_inference(action: str, params: dict[str, Any]) -> dict[str, Any]:
+async def run_inference(
+    action: str,
+    params: dict[str, Any],
+    *,
+    cancel_token: CancelToken | None = None,
+) -> dict[str, Any]:
     """Run an inference action via subprocess (non-blocking).
 
     Spawns local-inference/.venv/bin/python infer.py with JSON stdin.
     Reads stdout/stderr concurrently to prevent pipe deadlock.
+
+    Cancellation (explicit token or the one bound to the current task)
+    kills infer.py and its children and removes a partial ``output_path``.
+
+    The phases infer.py reports (model load, diffusion, encode) become
+    spans of the current trace.
+
+    Video actions get ``fps`` from the daemon's MediaInfo cache so
+    infer.py doesn't probe the file again.
     """
     if not _is_available():
         return {"success": False, "error": "Local inference not set up. Run setup.sh in local-inference/"}
 
+    if action in _VIDEO_ACTIONS and params.get("video_path") and not params.get("fps"):
+        info = await media_info.probe(params["video_path"])
+        if info and info.fps:
+            params = {**params, "fps": info.fps}
+
+    with tracing.span(f"inference {action}"):
+        return await _run_inference(action, params, cancel_token)
+
+
+def _trace_phases(marks: Any) -> None:
+    """Turn infer.py's [[phase, epoch_s], ...] marks into spans."""
+    if not isinstance(marks, list):
+        return
+    for (name, start), (_, end) in zip(marks, marks[1:]):
+        tracing.add_span(f"infer {name}", int(start * 1e9), int(end * 1e9))
+
+
+async def _run_inference(
+    action: str,
+    params: dict[str, Any],
+    cancel_token: CancelToken | None,
+) -> dict[str, Any]:
     payload = json.dumps({"action": action, **params})
 
     try:
-        proc = await asyncio.create_subprocess_exec(
-            str(_VENV_PYTHON), str(_INFER_SCRIPT),
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=str(_INFERENCE_DIR),
-        )
+        with tracing.span("spawn"):
+            proc = await asyncio.create_subprocess_exec(
+                str(_VENV_PYTHON), str(_INFER_SCRIPT),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=str(_INFERENCE_DIR),
+                start_new_session=True,
+            )
 
-        stdout_data, stderr_data = await proc.communicate(input=payload.encode())
+        try:
+            stdout_data, stderr_data = await cancellation.communicate(
+                proc, payload.encode(), token=cancel_token,
+            )
+        except (OperationCancelled, asyncio.CancelledError):
+            cancellation.remove_partial(params.get("output_path"))
+            raise
 
         if stderr_data:
             logger.debug("infer.py stderr: %s", stderr_data.decode(errors="replace")[-500:])
@@ -70,6 +121,8 @@ async def run_inference(action: str, params: dict[str, Any]) -> dict[str, Any]:
         except json.JSONDecodeError:
             return {"success": False, "error": f"Invalid JSON from inference: {result_line[:200]}"}
 
+        _trace_phases(result.pop("_phases", None))
+
         # Normalize: if result has no 'success' key, infer from 'error'
         if "success" not in result:
             result["success"] = "error" not in result
@@ -78,6 +131,8 @@ async def run_inference(action: str, params: dict[str, Any]) -> dict[str, Any]:
 
     except asyncio.TimeoutError:
         return {"success": False, "error": "Inference timed out"}
+    except OperationCancelled:
+        raise
     except Exception as e:
         return {"success": False, "error": f"Inference error: {e}"}
 
@@ -101,6 +156,26 @@ async def generate_image(
     })
 
 
+async def generate_image_batch(items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Generate several images in one infer.py process (each model loads once).
+
+    *items* hold generate_image keyword arguments; results come back in order.
+    """
+    result = await run_inference("batch", {"items": [
+        {"action": "generate_image", "model": "animagine_xl", "width": 1024,
+         "height": 1024, "steps": 25, **item}
+        for item in items
+    ]})
+    results = result.get("results")
+    if not result.get("success") or not isinstance(results, list) or len(results) != len(items):
+        error = result.get("error") or "Batch inference returned no per-item results"
+        return [{"success": False, "error": error} for _ in items]
+    for r in results:
+        if "success" not in r:
+            r["success"] = "error" not in r
+    return results
+
+
 async def generate_video(
     prompt: str = "",
     image_base64: str = "",
@@ -0,0 +1,302 @@
+"""Media metadata service — one ffprobe per file version.
+
+probe() runs ``ffprobe -show_streams -show_format`` on a file and returns
+a typed MediaInfo (duration, format, per-stream codec / size / fps /
+sample rate). Results are cached by (path, size, mtime_ns): in memory
+(LRU, MAX_MEMORY_ENTRIES) and in the media_info table, so a file is
+probed once per version across restarts and a rewritten file is probed
+again. Concurrent probes of the same file share one ffprobe.
+
+keyframes() adds the video keyframe times (packet flags, no decoding),
+cached alongside the probe; the concat planner cuts clips at them.
+
+Used by the episode composer, subtitle timing, inference params (fps)
+and GET /api/v1/files/{path}?info=1.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from opencli_daemon.database import connection as db
+from .ffmpeg_runner import run_ffprobe
+
+logger = logging.getLogger(__name__)
+
+MAX_MEMORY_ENTRIES = 512
+# Rows kept in media_info (pruned by age every PRUNE_EVERY stores)
+MAX_DB_ROWS = 5000
+PRUNE_EVERY = 100
+
+FileKey = tuple[str, int, int]
+
+
+def _float(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value: Any) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate(rate: str | None) -> float | None:
+    """Frames per second from an ffprobe rate such as ``24000/1001``."""
+    num, _, den = str(rate or "").partition("/")
+    try:
+        fps = float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return fps if fps > 0 else None
+
+
+@dataclass
+class StreamInfo:
+    index: int
+    codec_type: str
+    codec_name: str | None = None
+    profile: str | None = None
+    width: int | None = None
+    height: int | None = None
+    pix_fmt: str | None = None
+    r_frame_rate: str | None = None
+    avg_frame_rate: str | None = None
+    sample_rate: int | None = None
+    channels: int | None = None
+    duration: float | None = None
+    nb_frames: int | None = None
+    bit_rate: int | None = None
+    attached_pic: bool = False
+    raw: dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def fps(self) -> float | None:
+        return parse_rate(self.r_frame_rate) or parse_rate(self.avg_frame_rate)
+
+    @classmethod
+    def from_probe(cls, data: dict[str, Any]) -> "StreamInfo":
+        return cls(
+            index=_int(data.get("index")) or 0,
+            codec_type=data.get("codec_type") or "",
+            codec_name=data.get("codec_name"),
+            profile=data.get("profile"),
+            width=_int(data.get("width")),
+            height=_int(data.get("height")),
+            pix_fmt=data.get("pix_fmt"),
+            r_frame_rate=data.get("r_frame_rate"),
+            avg_frame_rate=data.get("avg_frame_rate"),
+            sample_rate=_int(data.get("sample_rate")),
+            channels=_int(data.get("channels")),
+            duration=_float(data.get("duration")),
+            nb_frames=_int(data.get("nb_frames")),
+            bit_rate=_int(data.get("bit_rate")),
+            attached_pic=bool((data.get("disposition") or {}).get("attached_pic")),
+            raw=data,
+        )
+
+    def to_json(self) -> dict[str, Any]:
+        return {k: v for k, v in self.__dict__.items() if k != "raw" and v is not None}
+
+
+@dataclass
+class MediaInfo:
+    path: str
+    size: int
+    mtime_ns: int
+    duration: float | None
+    format_name: str | None
+    bit_rate: int | None
+    streams: list[StreamInfo]
+
+    @property
+    def video(self) -> StreamInfo | None:
+        """First video stream that isn't cover art."""
+        return next((s for s in self.streams
+                     if s.codec_type == "video" and not s.attached_pic), None)
+
+    @property
+    def audio(self) -> StreamInfo | None:
+        return next((s for s in self.streams if s.codec_type == "audio"), None)
+
+    @property
+    def fps(self) -> float | None:
+        return self.video.fps if self.video else None
+
+    @classmethod
+    def from_probe(cls, key: FileKey, data: dict[str, Any]) -> "MediaInfo":
+        fmt = data.get("format") or {}
+        return cls(
+            path=key[0], size=key[1], mtime_ns=key[2],
+            duration=_float(fmt.get("duration")),
+            format_name=fmt.get("format_name"),
+            bit_rate=_int(fmt.get("bit_rate")),
+            streams=[StreamInfo.from_probe(s) for s in data.get("streams") or []],
+        )
+
+    def to_json(self) -> dict[str, Any]:
+        video, audio = self.video, self.audio
+        return {
+            "path": self.path, "size": self.size, "duration": self.duration,
+            "format_name": self.format_name, "bit_rate": self.bit_rate,
+            "width": video.width if video else None,
+            "height": video.height if video else None,
+            "fps": self.fps,
+            "sample_rate": audio.sample_rate if audio else None,
+            "streams": [s.to_json() for s in self.streams],
+        }
+
+
+# (path, size, mtime_ns) → (MediaInfo, keyframes or None)
+_memory: "OrderedDict[FileKey, tuple[MediaInfo, list[float] | None]]" = OrderedDict()
+_inflight: dict[tuple[FileKey, bool], asyncio.Future] = {}
+_stores = 0
+
+
+def file_key(path: str | os.PathLike) -> FileKey | None:
+    """(absolute path, size, mtime_ns) of *path*, or None if it isn't a file."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+def _remember(key: FileKey, info: MediaInfo, keyframes: list[float] | None) -> None:
+    _memory[key] = (info, keyframes)
+    _memory.move_to_end(key)
+    while len(_memory) > MAX_MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+async def _load(key: FileKey) -> tuple[MediaInfo, list[float] | None] | None:
+    try:
+        rows = await db.raw_query(
+            "SELECT probe, keyframes FROM media_info WHERE path = ? AND size = ? AND mtime_ns = ?",
+            key,
+        )
+    except Exception as e:
+        logger.warning("media_info lookup failed: %s", e)
+        return None
+    if not rows:
+        return None
+    try:
+        info = MediaInfo.from_probe(key, json.loads(rows[0]["probe"]))
+        keyframes = json.loads(rows[0]["keyframes"]) if rows[0]["keyframes"] else None
+    except (ValueError, TypeError):
+        return None
+    return info, keyframes
+
+
+async def _store(key: FileKey, info: MediaInfo, keyframes: list[float] | None) -> None:
+    global _stores
+    try:
+        await db.upsert_row("media_info", {
+            "path": key[0], "size": key[1], "mtime_ns": key[2],
+            "probe": json.dumps({
+                "format": {"duration": info.duration, "format_name": info.format_name,
+                           "bit_rate": info.bit_rate},
+                "streams": [s.raw for s in info.streams],
+            }),
+            "keyframes": json.dumps(keyframes) if keyframes is not None else None,
+            "probed_at": int(time.time() * 1000),
+        })
+        _stores += 1
+        if _stores % PRUNE_EVERY == 0:
+            await db.execute(
+                "DELETE FROM media_info WHERE rowid NOT IN ("
+                "SELECT rowid FROM media_info ORDER BY probed_at DESC LIMIT ?)", (MAX_DB_ROWS,),
+            )
+    except Exception as e:
+        logger.warning("media_info store failed: %s", e)
+
+
+async def _run_probe(path: str) -> dict[str, Any] | None:
+    try:
+        out, _, rc = await run_ffprobe([
+            "-v", "error", "-of", "json", "-show_streams", "-show_format", path,
+        ])
+    except OSError as e:  # ffprobe missing
+        logger.warning("ffprobe failed on %s: %s", path, e)
+        return None
+    if rc != 0:
+        return None
+    with contextlib.suppress(ValueError):
+        return json.loads(out or "{}")
+    return None
+
+
+async def _run_keyframes(path: str) -> list[float]:
+    # Packet flags need no decoding: "K" marks keyframes
+    try:
+        out, _, rc = await run_ffprobe([
+            "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path,
+        ], timeout=120.0)
+    except OSError as e:
+        logger.warning("ffprobe failed on %s: %s", path, e)
+        return []
+    keyframes = []
+    for line in out.splitlines() if rc == 0 else []:
+        pts, _, flags = line.partition(",")
+        if "K" in flags:
+            with contextlib.suppress(ValueError):
+                keyframes.append(float(pts))
+    return sorted(keyframes)
+
+
+async def _resolve(key: FileKey, want_keyframes: bool) -> tuple[MediaInfo, list[float] | None] | None:
+    cached = _memory.get(key) or await _load(key)
+    if cached and (cached[1] is not None or not want_keyframes):
+        _remember(key, *cached)
+        return cached
+    if cached:
+        info = cached[0]
+    else:
+        data = await _run_probe(key[0])
+        if data is None:
+            return None
+        info = MediaInfo.from_probe(key, data)
+    keyframes = await _run_keyframes(key[0]) if want_keyframes and info.video else None
+    _remember(key, info, keyframes)
+    await _store(key, info, keyframes)
+    return info, keyframes
+
+
+async def _get(path: str | os.PathLike, want_keyframes: bool) -> tuple[MediaInfo, list[float] | None] | None:
+    key = file_key(path)
+    if key is None:
+        return None
+    cached = _memory.get(key)
+    if cached and (cached[1] is not None or not want_keyframes):
+        _memory.move_to_end(key)
+        return cached
+    # Concurrent callers for the same file version share one probe
+    flight = (key, want_keyframes)
+    if flight not in _inflight:
+        future = asyncio.ensure_future(_resolve(key, want_keyframes))
+        _inflight[flight] = future
+        future.add_done_callback(lambda _: _inflight.pop(flight, None))
+    return await asyncio.shield(_inflight[flight])
+
+
+async def probe(path: str | os.PathLike) -> MediaInfo | None:
+    """Metadata of *path* (None if it is missing or ffprobe can't read it)."""
+    got = await _get(path, False)
+    return got[0] if got else None
+
+
+async def keyframes(path: str | os.PathLike) -> list[float] | None:
+    """Video keyframe times of *path* in seconds (None if unreadable)."""
+    got = await _get(path, True)
+    return got[1] if got else None
@@ -27,3 +27,6 @@ class AIVideoProvider(ABC):
     async def download(self, url: str, dest_path: str) -> str:
         """Download result to dest_path. Returns local path."""
         ...
+
+    async def cancel(self, job_id: str) -> None:
+        """Ask the provider to stop a submitted job (best effort)."""
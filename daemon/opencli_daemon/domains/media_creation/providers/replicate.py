@@ -57,6 +57,14 @@ class ReplicateProvider(AIVideoProvider):
             else:
                 return {"status": "running", "progress": 50}
 
+    async def cancel(self, job_id: str) -> None:
+        async with httpx.AsyncClient(timeout=15.0) as client:
+            resp = await client.post(
+                f"{self._base_url}/predictions/{job_id}/cancel",
+                headers=self._headers(),
+            )
+            resp.raise_for_status()
+
     async def download(self, url: str, dest_path: str) -> str:
         async with httpx.AsyncClient(timeout=120.0, follow_redirects=True) as client:
             resp = await client.get(url)
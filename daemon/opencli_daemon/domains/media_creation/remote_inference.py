@@ -10,6 +10,8 @@ from typing import Any
 import httpx
 
 from opencli_daemon.config import load_config, get_nested
+from opencli_daemon.utils import cancellation
+from opencli_daemon.utils.cancellation import CancelToken, OperationCancelled
 
 logger = logging.getLogger(__name__)
 
@@ -49,8 +51,17 @@ async def get_health() -> dict[str, Any]:
         return {"status": "unreachable", "error": str(e)}
 
 
-async def run_inference(action: str, params: dict[str, Any]) -> dict[str, Any]:
-    """Send inference request to remote Colab server."""
+async def run_inference(
+    action: str,
+    params: dict[str, Any],
+    *,
+    cancel_token: CancelToken | None = None,
+) -> dict[str, Any]:
+    """Send inference request to remote Colab server.
+
+    Cancellation drops the in-flight request instead of waiting out the
+    10-minute read timeout.
+    """
     url = _get_colab_url()
     if not url:
         return {"success": False, "error": "Colab URL not configured. Set inference.colab_url in config."}
@@ -59,7 +70,9 @@ async def run_inference(action: str, params: dict[str, Any]) -> dict[str, Any]:
 
     try:
         async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
-            resp = await client.post(f"{url}/infer", json=payload)
+            resp = await cancellation.cancellable(
+                client.post(f"{url}/infer", json=payload), cancel_token,
+            )
             resp.raise_for_status()
             result = resp.json()
 
@@ -72,6 +85,8 @@ async def run_inference(action: str, params: dict[str, Any]) -> dict[str, Any]:
         return {"success": False, "error": "Remote inference timed out (10 min limit)"}
     except httpx.HTTPStatusError as e:
         return {"success": False, "error": f"Remote server error: {e.response.status_code}"}
+    except OperationCancelled:
+        raise
     except Exception as e:
         return {"success": False, "error": f"Remote inference error: {e}"}
 
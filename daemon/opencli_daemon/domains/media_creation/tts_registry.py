@@ -2,11 +2,26 @@
 
 Ported from daemon/lib/domains/media_creation/tts/.
 Direct Python import for Edge TTS (no subprocess needed).
+
+Edge TTS output is cached on disk by (text, voice, rate, pitch), so
+re-rendering an episode only synthesizes changed lines, and concurrent
+sessions are capped process-wide. Results carry the file path;
+audio_base64 is only encoded when asked for (include_base64 / audio_base64()).
+
+Config (~/.opencli/config.yaml):
+    tts:
+      concurrency: 4       # edge-tts sessions in flight
+      cache_max_mb: 500    # least recently used files evicted beyond this
 """
 
 import asyncio
 import base64
+import contextlib
+import hashlib
+import json
 import os
+import secrets
+import shutil
 import tempfile
 import time
 from pathlib import Path
@@ -14,39 +29,179 @@ from typing import Any
 
 import httpx
 
+from opencli_daemon.config import load_config, get_nested
+from opencli_daemon.utils import cancellation
+from opencli_daemon.utils.cancellation import OperationCancelled
+from . import media_info
+
+_HOME = Path(os.environ.get("HOME", "."))
+TTS_CACHE_DIR = _HOME / ".opencli" / "cache" / "tts"
+
+DEFAULT_VOICE = "zh-CN-XiaoxiaoNeural"
+DEFAULT_CONCURRENCY = 4
+DEFAULT_CACHE_MAX_MB = 500
+
+_sessions: asyncio.Semaphore | None = None
+
+
+def _session_limit() -> asyncio.Semaphore:
+    global _sessions
+    if _sessions is None:
+        limit = int(get_nested(load_config(), "tts.concurrency", DEFAULT_CONCURRENCY))
+        _sessions = asyncio.Semaphore(max(1, limit))
+    return _sessions
+
+
+def _cache_path(*key: Any) -> Path:
+    digest = hashlib.sha256(json.dumps(key, ensure_ascii=False).encode()).hexdigest()
+    return TTS_CACHE_DIR / f"{digest}.mp3"
+
+
+def _cache_hit(path: Path) -> bool:
+    try:
+        if path.stat().st_size == 0:
+            return False
+        os.utime(path)  # recency for eviction
+        return True
+    except OSError:
+        return False
+
+
+def _cache_store(path: Path, data: bytes | None = None, source: Path | None = None) -> None:
+    """Atomically place *data* (or move *source*) at *path*, then evict old entries."""
+    TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.stem}.{secrets.token_hex(4)}.part")
+    if source is not None:
+        shutil.move(str(source), tmp)
+    else:
+        tmp.write_bytes(data or b"")
+    os.replace(tmp, path)
+    _prune_cache()
+
+
+def _prune_cache() -> None:
+    max_bytes = float(get_nested(load_config(), "tts.cache_max_mb", DEFAULT_CACHE_MAX_MB)) * 1024 * 1024
+    entries = []
+    total = 0
+    for f in TTS_CACHE_DIR.glob("*.mp3"):
+        with contextlib.suppress(OSError):
+            st = f.stat()
+            entries.append((st.st_mtime, st.st_size, f))
+            total += st.st_size
+    for _, size, f in sorted(entries):
+        if total <= max_bytes:
+            break
+        with contextlib.suppress(OSError):
+            f.unlink()
+            total -= size
+
+
+def audio_base64(result: dict) -> str:
+    """Base64 of a TTS result's audio file, for callers that need it inline."""
+    with open(result["path"], "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+
+def _edge_result(path: Path, voice: str, cached: bool, include_base64: bool) -> dict:
+    result = {"success": True, "path": str(path), "voice": voice, "format": "mp3",
+              "cached": cached}
+    if include_base64:
+        result["audio_base64"] = audio_base64(result)
+    return result
+
+
+async def synthesize_edge_tts(
+    text: str,
+    voice: str = DEFAULT_VOICE,
+    rate: str = "+0%",
+    pitch: str = "+0Hz",
+    include_base64: bool = False,
+    **kwargs: Any,
+) -> dict:
+    """Synthesize speech using edge-tts (free, no API key).
+
+    The returned path lives in the TTS cache; copy it before modifying it.
+    """
+    path = _cache_path("edge", text, voice, rate, pitch)
+    if _cache_hit(path):
+        return _edge_result(path, voice, True, include_base64)
 
-async def synthesize_edge_tts(text: str, voice: str = "zh-CN-XiaoxiaoNeural", **kwargs: Any) -> dict:
-    """Synthesize speech using edge-tts (free, no API key)."""
     try:
         import edge_tts
     except ImportError:
         return {"success": False, "error": "edge-tts not installed (pip install edge-tts)"}
 
-    output_path = Path(tempfile.mkdtemp()) / f"tts_{int(time.time() * 1000)}.mp3"
+    async with _session_limit():
+        # Another caller may have synthesized it while we waited
+        if _cache_hit(path):
+            return _edge_result(path, voice, True, include_base64)
+        work_dir = Path(tempfile.mkdtemp())
+        output_path = work_dir / f"tts_{int(time.time() * 1000)}.mp3"
+        try:
+            communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch)
+            await cancellation.cancellable(communicate.save(str(output_path)))
+            _cache_store(path, source=output_path)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return {"success": False, "error": f"Edge TTS error: {e}"}
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return _edge_result(path, voice, False, include_base64)
 
-    try:
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(str(output_path))
-
-        with open(output_path, "rb") as f:
-            audio_bytes = f.read()
-
-        audio_b64 = base64.b64encode(audio_bytes).decode()
-        return {
-            "success": True,
-            "audio_base64": audio_b64,
-            "path": str(output_path),
-            "voice": voice,
-            "format": "mp3",
-        }
-    except Exception as e:
-        return {"success": False, "error": f"Edge TTS error: {e}"}
+
+async def synthesize_dialogue(
+    lines: list[dict[str, Any]],
+    voice: str = DEFAULT_VOICE,
+    rate: str = "+0%",
+    pitch: str = "+0Hz",
+    include_base64: bool = False,
+) -> dict:
+    """Synthesize each line ({text, voice?}) concurrently, then join them into one file.
+
+    Lines are cached individually, so editing one line of a scene only
+    re-synthesizes that line. The result's ``lines`` lists the per-line files
+    with their measured ``duration`` (seconds, None if unreadable), and
+    ``duration`` is the joined track's length — the lines play back to back.
+    """
+    lines = [line for line in lines if str(line.get("text") or "").strip()]
+    if not lines:
+        return {"success": False, "error": "No dialogue text"}
+    voices = [line.get("voice") or voice for line in lines]
+    parts = await asyncio.gather(*(
+        synthesize_edge_tts(line["text"], voice=v, rate=rate, pitch=pitch)
+        for line, v in zip(lines, voices)
+    ))
+    for part in parts:
+        if not part.get("success"):
+            return part
+
+    # Probed together; media_info caches each file version's length
+    probes = await asyncio.gather(*(media_info.probe(part["path"]) for part in parts))
+    line_info = [{"text": line["text"], "voice": v, "path": part["path"],
+                  "duration": info.duration if info else None}
+                 for line, v, part, info in zip(lines, voices, parts, probes)]
+    if len(parts) == 1:
+        path = Path(parts[0]["path"])
+    else:
+        path = _cache_path("dialogue", [p["path"] for p in parts])
+        if not _cache_hit(path):
+            # edge-tts writes headerless MP3 frames in one fixed format,
+            # so the parts concatenate byte-wise into a valid stream
+            data = b"".join(Path(p["path"]).read_bytes() for p in parts)
+            _cache_store(path, data=data)
+    result = _edge_result(path, voices[0], all(p.get("cached") for p in parts), include_base64)
+    result["lines"] = line_info
+    durations = [line["duration"] for line in line_info]
+    result["duration"] = sum(durations) if None not in durations else None
+    return result
 
 
 async def synthesize_elevenlabs(
     text: str,
     voice_id: str = "21m00Tcm4TlvDq8ikWAM",
     api_key: str = "",
+    include_base64: bool = False,
     **kwargs: Any,
 ) -> dict:
     """Synthesize speech using ElevenLabs API (paid)."""
@@ -57,7 +212,7 @@ async def synthesize_elevenlabs(
 
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(
+            resp = await cancellation.cancellable(client.post(
                 f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
                 headers={"xi-api-key": api_key},
                 json={
@@ -65,21 +220,25 @@ async def synthesize_elevenlabs(
                     "model_id": "eleven_multilingual_v2",
                     "voice_settings": {"stability": 0.5, "similarity_boost": 0.75},
                 },
-            )
+            ))
             if resp.status_code != 200:
                 return {"success": False, "error": f"ElevenLabs error: {resp.status_code}"}
 
             with open(output_path, "wb") as f:
                 f.write(resp.content)
 
-            audio_b64 = base64.b64encode(resp.content).decode()
-            return {
+            result = {
                 "success": True,
-                "audio_base64": audio_b64,
                 "path": str(output_path),
                 "voice_id": voice_id,
                 "format": "mp3",
             }
+            if include_base64:
+                result["audio_base64"] = base64.b64encode(resp.content).decode()
+            return result
+    except OperationCancelled:
+        shutil.rmtree(output_path.parent, ignore_errors=True)
+        raise
     except Exception as e:
         return {"success": False, "error": f"ElevenLabs error: {e}"}
 
@@ -6,6 +6,8 @@ Ported from daemon/lib/domains/domain_registry.dart.
 from typing import Any
 
 from .base import TaskDomain, DomainDisplayConfig
+from opencli_daemon.utils import tracing
+from opencli_daemon.utils.cancellation import CancelToken, use_token
 
 
 class DomainRegistry:
@@ -38,22 +40,48 @@ class DomainRegistry:
         return task_type in self._by_task_type
 
     async def execute_task(
-        self, task_type: str, task_data: dict[str, Any]
+        self, task_type: str, task_data: dict[str, Any], *, cancel_token: CancelToken | None = None
     ) -> dict[str, Any]:
+        """Dispatch to the owning domain.
+
+        cancel_token is bound for the duration of the call, so subprocesses,
+        polls and TTS started by the domain abort when it is cancelled.
+        """
         domain = self._by_task_type.get(task_type)
         if domain is None:
             return {"success": False, "error": f"No domain handles task type: {task_type}"}
-        return await domain.execute_task(task_type, task_data)
+        with use_token(cancel_token), tracing.span(f"task {task_type}", domain=domain.id):
+            return await domain.execute_task(task_type, task_data)
 
     async def execute_task_with_progress(
-        self, task_type: str, task_data: dict[str, Any], *, on_progress=None
+        self, task_type: str, task_data: dict[str, Any], *, on_progress=None,
+        cancel_token: CancelToken | None = None,
     ) -> dict[str, Any]:
         domain = self._by_task_type.get(task_type)
         if domain is None:
             return {"success": False, "error": f"No domain handles task type: {task_type}"}
-        return await domain.execute_task_with_progress(
-            task_type, task_data, on_progress=on_progress
-        )
+        with use_token(cancel_token):
+            return await domain.execute_task_with_progress(
+                task_type, task_data, on_progress=on_progress
+            )
+
+    def supports_batch(self, task_type: str) -> bool:
+        """True if the owning domain implements a real execute_batch for *task_type*."""
+        domain = self._by_task_type.get(task_type)
+        return domain is not None and task_type in domain.batch_task_types
+
+    async def execute_batch(
+        self, task_type: str, items: list[dict[str, Any]], *,
+        cancel_token: CancelToken | None = None,
+    ) -> list[dict[str, Any]]:
+        """Dispatch a batch of same-type tasks; one result per item, in order."""
+        domain = self._by_task_type.get(task_type)
+        if domain is None:
+            return [{"success": False, "error": f"No domain handles task type: {task_type}"}
+                    for _ in items]
+        with use_token(cancel_token), tracing.span(f"batch {task_type}", domain=domain.id,
+                                                   items=len(items)):
+            return await domain.execute_batch(task_type, items)
 
     def get_display_config(self, task_type: str) -> DomainDisplayConfig | None:
         domain = self._by_task_type.get(task_type)
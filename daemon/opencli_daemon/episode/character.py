@@ -65,5 +65,5 @@ async def apply_consistency(
         "prompt": enhanced_prompt,
         "applied": True,
         "character_name": char.get("name", ""),
-        "embedding_available": char.get("embedding") is not None,
+        "embedding_available": char.get("embedding_hash") is not None,
     }
@@ -0,0 +1,98 @@
+"""Episode generation checkpoints.
+
+The generator records every finished artifact (keyframe, clip, TTS audio,
+assembled scene, concat/post outputs) in a small JSON manifest stored in
+episodes.checkpoint. Artifacts are keyed by a fingerprint of their inputs
+("clip:<hash of keyframe key, prompt, model, frames>"), so a later
+generation — after a crash, or after the script was edited — reuses every
+artifact whose inputs are unchanged and whose file still exists with the
+recorded size. Only changed scenes and what follows them are rebuilt.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any
+
+from . import store
+
+
+def artifact_key(kind: str, *inputs: Any) -> str:
+    """Checkpoint key for a *kind* artifact built from *inputs* (JSON-able)."""
+    raw = json.dumps(inputs, sort_keys=True, default=str, ensure_ascii=False)
+    return f"{kind}:{hashlib.sha256(raw.encode()).hexdigest()[:16]}"
+
+
+class EpisodeCheckpoint:
+    """Artifact manifest for one episode generation."""
+
+    def __init__(self, episode_id: str, data: dict[str, Any] | None = None) -> None:
+        self.episode_id = episode_id
+        self.data = data or {"artifacts": {}}
+
+    @classmethod
+    async def load(cls, episode_id: str) -> "EpisodeCheckpoint":
+        """Load the stored manifest (empty if there is none or it is unreadable)."""
+        row = await store.get_episode_checkpoint(episode_id)
+        data = None
+        if row:
+            try:
+                data = json.loads(row)
+            except json.JSONDecodeError:
+                data = None
+        if not isinstance(data, dict) or not isinstance(data.get("artifacts"), dict):
+            data = None
+        return cls(episode_id, data)
+
+    @property
+    def options(self) -> dict[str, Any]:
+        """Options of the last generation (defaults for POST /episodes/{id}/resume)."""
+        return self.data.setdefault("options", {})
+
+    def reset(self) -> None:
+        """Forget all artifacts (forces a full re-render)."""
+        self.data = {"options": self.options, "artifacts": {}}
+
+    def retain(self, keys: set[str]) -> list[str]:
+        """Drop artifacts not in *keys*; returns their paths no kept artifact uses."""
+        artifacts = self.data["artifacts"]
+        dropped = {artifacts.pop(k)["path"] for k in [k for k in artifacts if k not in keys]}
+        return sorted(dropped - {entry["path"] for entry in artifacts.values()})
+
+    def paths(self) -> set[str]:
+        """Paths of all recorded artifacts."""
+        return {entry["path"] for entry in self.data["artifacts"].values()}
+
+    def get(self, key: str) -> str | None:
+        """Return the artifact path for *key* if it is still valid on disk."""
+        entry = self.data["artifacts"].get(key)
+        if not entry:
+            return None
+        try:
+            if os.path.getsize(entry["path"]) == entry["size"]:
+                return entry["path"]
+        except OSError:
+            pass
+        return None
+
+    def meta(self, key: str) -> dict[str, Any]:
+        """Metadata recorded with *key* ({} if none)."""
+        entry = self.data["artifacts"].get(key) or {}
+        return entry.get("meta") or {}
+
+    async def put(self, key: str, path: str, meta: dict[str, Any] | None = None) -> None:
+        """Record a finished artifact (with optional JSON-able *meta*) and persist the manifest."""
+        if not path:
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        entry: dict[str, Any] = {"path": path, "size": size}
+        if meta:
+            entry["meta"] = meta
+        self.data["artifacts"][key] = entry
+        await self.save()
+
+    async def save(self) -> None:
+        await store.save_episode_checkpoint(self.episode_id, json.dumps(self.data))
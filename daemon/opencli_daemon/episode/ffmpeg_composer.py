@@ -2,14 +2,42 @@
 
 Ported from daemon/lib/episode/ffmpeg_composer.dart (752 lines).
 Handles: audio mixing, subtitle overlay, transitions, video concat, LUT grading.
+
+render_post runs the episode tail — mux, LUT grade, subtitles, platform
+encode — as one filtergraph and one encode; intermediate files are only
+written (as extra outputs of the same run) when asked for.
+
+concat_videos avoids re-encoding whatever it can: clips are probed, the
+ones whose streams differ from the majority are normalized once (cached
+next to the source), and the rest is stream-copied with the concat
+demuxer. With transitions only the windows around each cut — from the
+last keyframe before the transition to the first keyframe after it — are
+re-encoded, then spliced between the copied clip bodies. Encoded runs
+longer than MIN_GROUP_S are split into groups joined by short transition
+windows, and all of them are encoded in parallel ffmpeg processes.
+
+Config (~/.opencli/config.yaml):
+    ffmpeg:
+      segment_workers: 4   # parallel segment encodes (default: half the cores, max 4)
 """
 
+import asyncio
+import contextlib
+import hashlib
+import inspect
+import json
 import os
+import shutil
 import time
+from collections import Counter
 from pathlib import Path
 from typing import Any
 
-from opencli_daemon.domains.media_creation.ffmpeg_runner import run_ffmpeg
+from opencli_daemon.config import load_config, get_nested
+from opencli_daemon.domains.media_creation.ffmpeg_runner import (
+    FFmpegProgress, FFmpegProgressCallback, run_ffmpeg,
+)
+from opencli_daemon.domains.media_creation import media_info
 
 _OUTPUT_DIR = Path(os.environ.get("HOME", ".")) / ".opencli" / "output"
 
@@ -27,7 +55,6 @@ async def mix_audio(
 
     if not music_path:
         # Just copy voice
-        import shutil
         shutil.copy2(voice_path, output_path)
         return {"success": True, "path": output_path}
 
@@ -38,17 +65,295 @@ async def mix_audio(
         "-c:a", "libmp3lame", output_path,
     ])
     if rc != 0:
-        return {"success": False, "error": stderr[:500]}
+        return {"success": False, "error": stderr[-500:]}
     return {"success": True, "path": output_path}
 
 
+# Stream parameters that must match for a stream-copy concat
+_VIDEO_KEYS = ("codec_name", "profile", "width", "height", "pix_fmt", "r_frame_rate")
+_AUDIO_KEYS = ("codec_name", "sample_rate", "channels")
+
+# Codecs the composer can re-encode windows into (and that MP4 copies cleanly)
+_VIDEO_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+
+# Encoded runs are split into groups of at least this many seconds
+MIN_GROUP_S = 20.0
+
+# Episode-length encodes (concat segments, the post pass) run far past
+# run_ffmpeg's 5-minute default; cancellation still stops them
+ENCODE_TIMEOUT_S = 6 * 3600.0
+
+
+def _segment_workers() -> int:
+    default = max(1, min(4, (os.cpu_count() or 2) // 2))
+    return max(1, int(get_nested(load_config(), "ffmpeg.segment_workers", default)))
+
+
+async def _probe_clip(path: str, with_keyframes: bool = False) -> dict[str, Any] | None:
+    """Duration, stream parameters and video keyframe times of *path* (None if unreadable).
+
+    Keyframes (a packet scan of the whole clip) are only listed with
+    *with_keyframes*; only transition splicing cuts at them.
+    """
+    info = await media_info.probe(path)
+    if info is None or info.video is None or not info.duration or info.duration <= 0:
+        return None
+    keyframes = (await media_info.keyframes(path) or []) if with_keyframes else []
+    video, audio = info.video, info.audio
+    return {
+        "duration": info.duration,
+        "video": {k: video.raw.get(k) for k in _VIDEO_KEYS},
+        "audio": {k: audio.raw.get(k) for k in _AUDIO_KEYS} if audio else None,
+        "keyframes": keyframes,
+    }
+
+
+def _fps(rate: str | None) -> float:
+    num, _, den = str(rate or "24").partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 24.0
+
+
+def _target_format(probes: list[dict[str, Any]]) -> tuple[dict, dict | None]:
+    """The (video, audio) parameters the output uses: the majority by duration."""
+    weight: Counter = Counter()
+    for p in probes:
+        weight[json.dumps(p["video"], sort_keys=True)] += p["duration"]
+    video = json.loads(weight.most_common(1)[0][0])
+    if video["codec_name"] not in _VIDEO_ENCODERS or video.get("pix_fmt") not in ("yuv420p", "yuvj420p"):
+        video = {**video, "codec_name": "h264", "profile": "High", "pix_fmt": "yuv420p"}
+
+    audio_weight: Counter = Counter()
+    for p in probes:
+        if p["audio"]:
+            audio_weight[json.dumps(p["audio"], sort_keys=True)] += p["duration"]
+    audio = json.loads(audio_weight.most_common(1)[0][0]) if audio_weight else None
+    if audio and audio["codec_name"] != "aac":
+        audio = {**audio, "codec_name": "aac"}
+    return video, audio
+
+
+def _encode_args(video: dict, audio: dict | None) -> list[str]:
+    """Encoder options producing streams that concat-copy with *video* / *audio* clips."""
+    args = ["-c:v", _VIDEO_ENCODERS[video["codec_name"]], "-pix_fmt", video["pix_fmt"],
+            "-r", str(video["r_frame_rate"])]
+    if video["codec_name"] == "h264" and video.get("profile"):
+        args += ["-profile:v", str(video["profile"]).lower().replace("constrained ", "")]
+    if audio:
+        args += ["-c:a", "aac", "-ar", str(audio["sample_rate"]), "-ac", str(audio["channels"])]
+    return args
+
+
+def _fit_filter(video: dict) -> str:
+    w, h = video["width"], video["height"]
+    return (f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+            f"pad={w}:{h}:-1:-1:color=black,setsar=1,fps={video['r_frame_rate']},"
+            f"format={video['pix_fmt']}")
+
+
+# Normalized copies cached next to their source clips (see _normalize)
+NORM_CACHE_GLOB = "*.norm-*.mp4"
+
+
+async def _normalize(path: str, probe: dict, video: dict, audio: dict | None) -> str | None:
+    """*path* re-encoded (only the mismatched streams) to the target format, cached beside it.
+
+    The cache file is ``<stem>.norm-<digest>.mp4``; NORM_CACHE_GLOB matches them.
+    """
+    digest = hashlib.sha256(json.dumps([video, audio], sort_keys=True).encode()).hexdigest()[:10]
+    src = Path(path)
+    out = src.with_name(f"{src.stem}.norm-{digest}.mp4")
+    with contextlib.suppress(OSError):
+        if out.stat().st_mtime >= src.stat().st_mtime and out.stat().st_size > 0:
+            return str(out)
+
+    args = ["-y", "-i", path]
+    if audio and not probe["audio"]:
+        layout = "mono" if str(audio["channels"]) == "1" else "stereo"
+        args += ["-f", "lavfi", "-i", f"anullsrc=r={audio['sample_rate']}:cl={layout}"]
+    args += ["-map", "0:v:0"]
+    if probe["video"] == video:
+        args += ["-c:v", "copy"]
+    else:
+        args += ["-vf", _fit_filter(video), *_encode_args(video, None)]
+    if audio:
+        args += ["-map", "0:a:0" if probe["audio"] else "1:a:0", "-shortest"]
+        if probe["audio"] == audio:
+            args += ["-c:a", "copy"]
+        else:
+            args += ["-c:a", "aac", "-ar", str(audio["sample_rate"]), "-ac", str(audio["channels"])]
+    # Encoded under a temporary name so a failed run never leaves a cache hit behind
+    tmp = out.with_name(f".{out.stem}.{os.getpid()}.part.mp4")
+    _, _, rc = await run_ffmpeg([*args, str(tmp)])
+    if rc != 0:
+        with contextlib.suppress(OSError):
+            tmp.unlink()
+        return None
+    os.replace(tmp, out)
+    return str(out)
+
+
+def _concat_line(path: str) -> str:
+    return "file '" + path.replace("'", "'\\''") + "'"
+
+
+async def _concat_copy(entries: list[tuple[str, float | None, float | None]], output_path: str,
+                       work_dir: Path) -> tuple[str, int]:
+    """Stream-copy (path, inpoint, outpoint) pieces into *output_path*."""
+    list_file = work_dir / "concat.txt"
+    lines = []
+    for path, inpoint, outpoint in entries:
+        lines.append(_concat_line(path))
+        if inpoint:
+            lines.append(f"inpoint {inpoint:.6f}")
+        if outpoint is not None:
+            lines.append(f"outpoint {outpoint:.6f}")
+    list_file.write_text("\n".join(lines) + "\n")
+    _, stderr, rc = await run_ffmpeg([
+        "-y", "-f", "concat", "-safe", "0", "-i", str(list_file),
+        "-map", "0", "-c", "copy", "-movflags", "+faststart", output_path,
+    ], timeout=ENCODE_TIMEOUT_S)
+    return stderr, rc
+
+
+def _xfade_graph(lengths: list[float], transition: str, duration: float,
+                 has_audio: bool) -> tuple[str, str, str | None]:
+    """filter_complex chaining inputs 0..n-1 (already trimmed to *lengths*) with xfades."""
+    # xfade needs matching time bases; clips from different muxers differ
+    parts = [f"[{i}:v]settb=AVTB,setpts=PTS-STARTPTS[s{i}]" for i in range(len(lengths))]
+    if has_audio:
+        parts += [f"[{i}:a]asetpts=PTS-STARTPTS[t{i}]" for i in range(len(lengths))]
+    video, audio = "[s0]", "[t0]"
+    elapsed = lengths[0]
+    for i in range(1, len(lengths)):
+        offset = max(0.0, elapsed - duration)
+        parts.append(f"{video}[s{i}]xfade=transition={transition}:"
+                     f"duration={duration:.3f}:offset={offset:.3f}[v{i}]")
+        video = f"[v{i}]"
+        if has_audio:
+            parts.append(f"{audio}[t{i}]acrossfade=d={duration:.3f}[a{i}]")
+            audio = f"[a{i}]"
+        elapsed = offset + lengths[i]
+    return ";".join(parts), video, audio if has_audio else None
+
+
+async def _encode_run(run: list[tuple[str, float, float]], output: str, transition: str,
+                      duration: float, video: dict, audio: dict | None,
+                      on_progress: FFmpegProgressCallback | None = None) -> tuple[str, int]:
+    """Encode clip ranges (path, start, end) joined by transitions into one segment."""
+    inputs = []
+    for path, start, end in run:
+        if start > 0:
+            inputs += ["-ss", f"{start:.6f}"]
+        inputs += ["-t", f"{end - start:.6f}", "-i", path]
+    graph, v_out, a_out = _xfade_graph([end - start for _, start, end in run],
+                                       transition, duration, audio is not None)
+    maps = ["-map", v_out] + (["-map", a_out] if a_out else [])
+    _, stderr, rc = await run_ffmpeg([
+        "-y", *inputs, "-filter_complex", graph, *maps,
+        *_encode_args(video, audio), output,
+    ], timeout=ENCODE_TIMEOUT_S, on_progress=on_progress)
+    return stderr, rc
+
+
+def _splice_plan(probes: list[dict[str, Any]], duration: float) -> list[tuple]:
+    """Split the clips into copied bodies and re-encoded transition runs.
+
+    Each clip is cut at keyframes into head (up to the first keyframe at or
+    after the incoming transition), body and tail (from the last keyframe
+    leaving room for the outgoing transition). Bodies are copied; a tail,
+    the following head, and any clip with no body in between form one
+    encoded run. Returns ("copy", i, start, end) / ("encode", [(i, start, end), ...]).
+    """
+    n = len(probes)
+    pieces: list[tuple] = []
+    run: list[tuple[int, float, float]] = []
+    for i, p in enumerate(probes):
+        d, keys = p["duration"], p["keyframes"]
+        head = 0.0 if i == 0 else next((k for k in keys if k >= duration), d)
+        tail = d if i == n - 1 else max((k for k in keys if k <= d - duration), default=0.0)
+        if head < tail:
+            if i > 0:
+                run.append((i, 0.0, head))
+                pieces.append(("encode", run))
+            pieces.append(("copy", i, head, tail))
+            run = [(i, tail, d)] if i < n - 1 else []
+        else:
+            run.append((i, 0.0, d))
+    if run:
+        pieces.append(("encode", run))
+    return pieces
+
+
+def _split_run(run: list[tuple[str, float, float]], duration: float,
+               parts: int) -> list[list[tuple[str, float, float]]]:
+    """Cut an encoded run into up to *parts* groups that can be encoded independently.
+
+    At each cut the last *duration* seconds of one clip and the first of
+    the next become their own two-input transition window, so the groups
+    and windows concatenate back into exactly the original run. Cuts only
+    fall between clips long enough to lose *duration* and still fade.
+    """
+    if parts <= 1 or len(run) < 3:
+        return [run]
+    items = list(run)
+    target = sum(end - start for _, start, end in items) / parts
+    pieces: list[list[tuple[str, float, float]]] = []
+    group: list[tuple[str, float, float]] = []
+    length = 0.0
+    cuts = 0
+    for k, (path, start, end) in enumerate(items):
+        group.append((path, start, end))
+        length += end - start
+        if k + 1 >= len(items) or cuts >= parts - 1 or length < target:
+            continue
+        nxt_path, nxt_start, nxt_end = items[k + 1]
+        if end - start < 2 * duration + 0.01 or nxt_end - nxt_start < 2 * duration + 0.01:
+            continue
+        group[-1] = (path, start, end - duration)
+        pieces.append(group)
+        pieces.append([(path, end - duration, end), (nxt_path, nxt_start, nxt_start + duration)])
+        items[k + 1] = (nxt_path, nxt_start + duration, nxt_end)
+        group, length = [], 0.0
+        cuts += 1
+    if group:
+        pieces.append(group)
+    return pieces
+
+
+async def _notify(on_progress: FFmpegProgressCallback | None, progress: FFmpegProgress) -> None:
+    if on_progress:
+        result = on_progress(progress)
+        if inspect.isawaitable(result):
+            await result
+
+
+async def _probe_duration(path: str) -> float | None:
+    info = await media_info.probe(path)
+    return info.duration if info else None
+
+
 async def concat_videos(
     clip_paths: list[str],
     output_path: str = "",
     transition: str = "",
     transition_duration: float = 0.5,
+    workers: int | None = None,
+    on_progress: FFmpegProgressCallback | None = None,
 ) -> dict[str, Any]:
-    """Concatenate video clips, optionally with transitions."""
+    """Concatenate video clips, optionally with transitions.
+
+    Compatible clips are stream-copied; mismatched ones are normalized once.
+    With a transition only the windows around each cut are re-encoded, by
+    up to *workers* (default: ffmpeg.segment_workers) parallel ffmpeg
+    processes. The result's ``copied`` / ``encoded`` report seconds of
+    video by path taken, ``segments`` the number of encodes.
+
+    *on_progress* gets the re-encoding's combined progress across the
+    segments (out_time summed, duration their total), then a final report.
+    """
     if not clip_paths:
         return {"success": False, "error": "No clips to concatenate"}
 
@@ -57,49 +362,94 @@ async def concat_videos(
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
 
     if len(clip_paths) == 1:
-        import shutil
         shutil.copy2(clip_paths[0], output_path)
         return {"success": True, "path": output_path}
 
-    if not transition:
-        # Simple concat via concat demuxer
-        concat_file = str(_OUTPUT_DIR / f"clist_{int(time.time() * 1000)}.txt")
-        with open(concat_file, "w") as f:
-            for p in clip_paths:
-                f.write(f"file '{p}'\n")
-
-        _, stderr, rc = await run_ffmpeg([
-            "-y", "-f", "concat", "-safe", "0", "-i", concat_file,
-            "-c:v", "libx264", "-c:a", "aac", output_path,
-        ])
-    else:
-        # xfade transitions
-        inputs = []
-        for p in clip_paths:
-            inputs.extend(["-i", p])
-
-        # Build xfade chain
-        fc_parts = []
-        for i in range(len(clip_paths) - 1):
-            src = f"[{i}]" if i == 0 else f"[v{i}]"
-            offset = max(0, (i + 1) * 3 - transition_duration)  # rough estimate
-            fc_parts.append(
-                f"{src}[{i+1}]xfade=transition={transition}:"
-                f"duration={transition_duration}:offset={offset}[v{i+1}]"
-            )
-
-        last = f"[v{len(clip_paths) - 1}]"
-        fc = ";".join(fc_parts) + f";{last}format=yuv420p[out]"
-
-        _, stderr, rc = await run_ffmpeg([
-            "-y", *inputs,
-            "-filter_complex", fc,
-            "-map", "[out]", "-c:v", "libx264", output_path,
-        ])
+    probes = await asyncio.gather(*(_probe_clip(p, bool(transition)) for p in clip_paths))
+    if any(p is None for p in probes):
+        bad = [path for path, p in zip(clip_paths, probes) if p is None]
+        return {"success": False, "error": f"Cannot read clip(s): {', '.join(bad)}"}
 
-    if rc != 0:
-        return {"success": False, "error": stderr[:500]}
-    return {"success": True, "path": output_path}
+    video, audio = _target_format(probes)
+    clips = list(clip_paths)
+    normalized = 0
+    for i, p in enumerate(probes):
+        if p["video"] != video or p["audio"] != audio:
+            out = await _normalize(clips[i], p, video, audio)
+            if out is None:
+                return {"success": False, "error": f"Failed to normalize {clips[i]}"}
+            clips[i] = out
+            probes[i] = await _probe_clip(out, bool(transition))
+            normalized += 1
+            if probes[i] is None:
+                return {"success": False, "error": f"Failed to normalize {clip_paths[i]}"}
+
+    work_dir = Path(output_path).with_name(f".{Path(output_path).stem}.parts")
+    work_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        if not transition:
+            stderr, rc = await _concat_copy([(c, None, None) for c in clips], output_path, work_dir)
+            if rc != 0:
+                return {"success": False, "error": stderr[-500:]}
+            copied = sum(p["duration"] for p in probes)
+            await _notify(on_progress, FFmpegProgress(out_time=copied, duration=copied, done=True))
+            return {"success": True, "path": output_path, "normalized": normalized,
+                    "copied": round(copied, 3), "encoded": 0.0}
+
+        # Never fade for longer than half the shortest clip
+        duration = min(transition_duration, min(p["duration"] for p in probes) / 2)
+        workers = workers or _segment_workers()
+        entries: list[tuple[str, float | None, float | None]] = []
+        jobs: list[tuple[str, list[tuple[str, float, float]]]] = []
+        copied = encoded = 0.0
+        for piece in _splice_plan(probes, duration):
+            if piece[0] == "copy":
+                _, i, start, end = piece
+                entries.append((clips[i], start or None,
+                                None if end >= probes[i]["duration"] else end))
+                copied += end - start
+                continue
+            run = [(clips[i], start, end) for i, start, end in piece[1]]
+            run_length = sum(end - start for _, start, end in run)
+            encoded += run_length
+            for group in _split_run(run, duration, min(workers, int(run_length // MIN_GROUP_S))):
+                segment = str(work_dir / f"segment_{len(jobs):04d}.mp4")
+                jobs.append((segment, group))
+                entries.append((segment, None, None))
+
+        limit = asyncio.Semaphore(workers)
+        written: dict[str, FFmpegProgress] = {}
+        # Each segment's output is its ranges less the fades inside it
+        total = sum(sum(end - start for _, start, end in group) - (len(group) - 1) * duration
+                    for _, group in jobs)
+
+        async def _encode(segment: str, group: list[tuple[str, float, float]]) -> tuple[str, int]:
+            async def _report(progress: FFmpegProgress) -> None:
+                written[segment] = progress
+                await _notify(on_progress, FFmpegProgress(
+                    frame=sum(p.frame for p in written.values()),
+                    fps=sum(p.fps for p in written.values()),
+                    out_time=sum(p.out_time for p in written.values()),
+                    total_size=sum(p.total_size for p in written.values()),
+                    duration=total,
+                ))
+
+            async with limit:
+                return await _encode_run(group, segment, transition, duration, video, audio,
+                                         _report if on_progress else None)
+
+        for stderr, rc in await asyncio.gather(*(_encode(seg, group) for seg, group in jobs)):
+            if rc != 0:
+                return {"success": False, "error": stderr[-500:]}
+        stderr, rc = await _concat_copy(entries, output_path, work_dir)
+        if rc != 0:
+            return {"success": False, "error": stderr[-500:]}
+        await _notify(on_progress, FFmpegProgress(out_time=total, duration=total, done=True))
+        return {"success": True, "path": output_path, "normalized": normalized,
+                "copied": round(copied, 3), "encoded": round(encoded, 3),
+                "segments": len(jobs)}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
 
 
 async def mux_video_audio(
@@ -107,66 +457,171 @@ async def mux_video_audio(
     audio_path: str,
     output_path: str = "",
 ) -> dict[str, Any]:
-    """Mux video + audio into final output."""
+    """Mux video + audio into final output.
+
+    The output is as long as the video: shorter audio is padded with
+    silence (a longer track is cut at the end of the video).
+    """
     if not output_path:
         output_path = str(_OUTPUT_DIR / f"muxed_{int(time.time() * 1000)}.mp4")
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
 
     _, stderr, rc = await run_ffmpeg([
         "-y", "-i", video_path, "-i", audio_path,
-        "-c:v", "copy", "-c:a", "aac", "-shortest",
+        "-map", "0:v:0", "-map", "1:a:0",
+        "-c:v", "copy", "-af", "apad", "-c:a", "aac", "-shortest",
         output_path,
     ])
     if rc != 0:
-        return {"success": False, "error": stderr[:500]}
+        return {"success": False, "error": stderr[-500:]}
     return {"success": True, "path": output_path}
 
 
+# Export presets for encode_for_platform / render_post
+PLATFORM_PRESETS = {
+    "youtube": {"w": 1920, "h": 1080, "fps": 24, "bitrate": "12M"},
+    "tiktok": {"w": 1080, "h": 1920, "fps": 30, "bitrate": "8M"},
+    "ecommerce": {"w": 720, "h": 1280, "fps": 30, "bitrate": "6M"},
+}
+
+
+def _filter_path(path: str) -> str:
+    """Quote a file path as a filter option value inside a filtergraph."""
+    # A literal quote closes the quoting, escapes the quote at both levels, reopens
+    return "'" + path.replace("\\", "/").replace("'", "'\\\\''") + "'"
+
+
+def _post_graph(lut_path: str, preset: dict | None, subtitle_path: str,
+                tap_graded: bool) -> tuple[str, list[str]]:
+    """Filtergraph for the post chain: lut3d → platform scale/pad/fps → burned subtitles.
+
+    Returns the graph and its output labels, ``[vout]`` last; with
+    *tap_graded* the graded picture is also split out as ``[graded]``.
+    """
+    chain: list[str] = []
+    outputs: list[str] = []
+    if lut_path:
+        chain.append(f"lut3d={_filter_path(lut_path)}")
+        if tap_graded:
+            chain.append("split=2[graded][post]")
+            outputs.append("[graded]")
+    if preset:
+        chain.append(f"scale={preset['w']}:{preset['h']}:force_original_aspect_ratio=decrease,"
+                     f"pad={preset['w']}:{preset['h']}:-1:-1:color=black,setsar=1,"
+                     f"fps={preset['fps']}")
+    if subtitle_path:
+        chain.append(f"subtitles=filename={_filter_path(subtitle_path)}")
+    chain.append("format=yuv420p")
+    graph = "[0:v]"
+    for step in chain:
+        if step.startswith("split"):
+            graph += step + ";[post]"
+        else:
+            graph += step + ","
+    outputs.append("[vout]")
+    return graph.rstrip(",") + "[vout]", outputs
+
+
+async def render_post(
+    video_path: str,
+    output_path: str = "",
+    *,
+    audio_path: str = "",
+    lut_path: str = "",
+    subtitle_path: str = "",
+    burn_subtitles: bool = True,
+    platform: str = "",
+    intermediates: dict[str, str] | None = None,
+    on_progress: FFmpegProgressCallback | None = None,
+) -> dict[str, Any]:
+    """Mux, grade, subtitle and platform-encode *video_path* in one ffmpeg pass.
+
+    The requested steps become a single filtergraph and a single encode, so
+    the video is decoded once and never re-encoded between steps. Soft
+    subtitles (burn_subtitles=False) are added as a mov_text track.
+    *intermediates* maps step names to paths for artifacts that are wanted
+    on their own — "muxed" (source video + audio_path, stream-copied) and
+    "graded" (after the LUT, before scaling) — and are written as extra
+    outputs of the same run; nothing else is materialized. *on_progress*
+    gets the encode's FFmpegProgress reports.
+    """
+    preset = PLATFORM_PRESETS.get(platform, PLATFORM_PRESETS["youtube"]) if platform else None
+    intermediates = {k: v for k, v in (intermediates or {}).items() if v}
+    if not output_path:
+        output_path = str(_OUTPUT_DIR / f"{platform or 'post'}_{int(time.time() * 1000)}.mp4")
+    for path in (output_path, *intermediates.values()):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    args = ["-y", "-i", video_path]
+    if audio_path:
+        args += ["-i", audio_path]
+    audio_map = "1:a:0" if audio_path else "0:a?"
+    # Source audio is already AAC in MP4; only external tracks are encoded
+    audio_codec = ["-c:a", "aac"] if audio_path else ["-c:a", "copy"]
+    soft_subs = bool(subtitle_path) and not burn_subtitles
+    if soft_subs:
+        args += ["-i", subtitle_path]
+
+    steps = [step for step, wanted in (
+        ("mux", audio_path), ("lut", lut_path), ("subtitles", subtitle_path), ("encode", platform),
+    ) if wanted]
+    filtered = bool(lut_path or preset or (subtitle_path and burn_subtitles))
+    tap_graded = "graded" in intermediates and bool(lut_path)
+    if filtered:
+        graph, labels = _post_graph(lut_path, preset, subtitle_path if burn_subtitles else "",
+                                    tap_graded)
+        args += ["-filter_complex", graph]
+        if tap_graded:
+            args += ["-map", labels[0], "-map", audio_map, "-c:v", "libx264",
+                     "-pix_fmt", "yuv420p", *audio_codec, "-shortest", intermediates["graded"]]
+    if "muxed" in intermediates and audio_path:
+        args += ["-map", "0:v:0", "-map", audio_map, "-c:v", "copy", *audio_codec,
+                 "-shortest", intermediates["muxed"]]
+
+    args += ["-map", "[vout]" if filtered else "0:v:0", "-map", audio_map]
+    if soft_subs:
+        args += ["-map", f"{2 if audio_path else 1}:s:0", "-c:s", "mov_text"]
+    if filtered:
+        args += ["-c:v", "libx264"]
+        if preset:
+            args += ["-b:v", preset["bitrate"]]
+    else:
+        args += ["-c:v", "copy"]
+    args += [*(["-c:a", "aac"] if preset else audio_codec), "-shortest",
+             "-movflags", "+faststart", output_path]
+
+    duration = await _probe_duration(video_path) if on_progress else None
+    _, stderr, rc = await run_ffmpeg(args, timeout=ENCODE_TIMEOUT_S, on_progress=on_progress,
+                                     duration=duration)
+    if rc != 0:
+        return {"success": False, "error": stderr[-500:]}
+    result = {"success": True, "path": output_path, "steps": steps,
+              "intermediates": {k: v for k, v in intermediates.items()
+                                if k != "graded" or tap_graded}}
+    if platform:
+        result["platform"] = platform
+    return result
+
+
 async def apply_lut(
     video_path: str,
     lut_path: str,
     output_path: str = "",
+    on_progress: FFmpegProgressCallback | None = None,
 ) -> dict[str, Any]:
     """Apply a LUT color grade to video."""
     if not output_path:
         output_path = str(_OUTPUT_DIR / f"graded_{int(time.time() * 1000)}.mp4")
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-
-    _, stderr, rc = await run_ffmpeg([
-        "-y", "-i", video_path,
-        "-vf", f"lut3d='{lut_path}'",
-        "-c:v", "libx264", "-c:a", "copy", output_path,
-    ])
-    if rc != 0:
-        return {"success": False, "error": stderr[:500]}
-    return {"success": True, "path": output_path}
+    return await render_post(video_path, output_path, lut_path=lut_path, on_progress=on_progress)
 
 
 async def encode_for_platform(
     video_path: str,
     platform: str = "youtube",
     output_path: str = "",
+    on_progress: FFmpegProgressCallback | None = None,
 ) -> dict[str, Any]:
     """Re-encode video for a specific platform."""
-    presets = {
-        "youtube": {"w": 1920, "h": 1080, "fps": 24, "bitrate": "12M"},
-        "tiktok": {"w": 1080, "h": 1920, "fps": 30, "bitrate": "8M"},
-        "ecommerce": {"w": 720, "h": 1280, "fps": 30, "bitrate": "6M"},
-    }
-    preset = presets.get(platform, presets["youtube"])
-
     if not output_path:
         output_path = str(_OUTPUT_DIR / f"{platform}_{int(time.time() * 1000)}.mp4")
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-
-    _, stderr, rc = await run_ffmpeg([
-        "-y", "-i", video_path,
-        "-vf", f"scale={preset['w']}:{preset['h']}:force_original_aspect_ratio=decrease,"
-               f"pad={preset['w']}:{preset['h']}:-1:-1:color=black",
-        "-r", str(preset["fps"]),
-        "-b:v", preset["bitrate"],
-        "-c:v", "libx264", "-c:a", "aac", output_path,
-    ])
-    if rc != 0:
-        return {"success": False, "error": stderr[:500]}
-    return {"success": True, "path": output_path, "platform": platform}
+    return await render_post(video_path, output_path, platform=platform, on_progress=on_progress)
@@ -2,12 +2,35 @@
 
 Ported from daemon/lib/episode/episode_generator.dart (1334 lines).
 Phases: images → videos (batched) → TTS → subtitles → audio mix
-        → scene assembly → final concat → post-processing → LUT → encode
+        → scene assembly → final concat → post-processing
+        → LUT + subtitles + encode (one ffmpeg pass)
+
+Dialogue is synthesized (or read from the checkpoint) before anything
+else: each scene with dialogue is fitted to its measured voice length, so
+the clip is rendered as long as the voice plus a short tail instead of
+being cut or padded at the mux. Subtitles follow the measured per-line
+durations on a timeline built from the probed clip lengths.
+
+In streaming mode (the default) phases 1–6 run per scene instead: each
+scene goes keyframe → clip → mux as soon as its inputs are ready, and only
+the concat and post steps wait for all scenes.
+
+Config (~/.opencli/config.yaml):
+    episode:
+      streaming: true        # false = phase-by-phase
+      gpu_concurrency: 1     # keyframes + clips in flight (0 = unlimited)
+      ffmpeg_concurrency: 2  # scene muxes in flight
+      keep_intermediates: [] # ["graded"] also writes the graded master
+      fit_to_voice: true     # false = keep the script's scene durations
+      voice_tail_s: 0.75     # silence after a scene's last line (covers the crossfade)
+(TTS sessions are capped by tts.concurrency, see tts_registry.py.)
 """
 
 import asyncio
 import base64
+import contextlib
 import json
+import math
 import os
 import time
 from pathlib import Path
@@ -16,14 +39,31 @@ from typing import Any, Awaitable, Callable, Union
 from .script import EpisodeScript, EpisodeScene
 from .subtitles import generate_ass
 from . import ffmpeg_composer, store, character
-from opencli_daemon.domains.media_creation import local_inference, remote_inference, tts_registry
+from .checkpoint import EpisodeCheckpoint, artifact_key
+from opencli_daemon.domains.media_creation import (
+    local_inference, media_info, remote_inference, tts_registry,
+)
 from opencli_daemon.config import load_config, get_nested
+from opencli_daemon.pipeline.scheduling import PrioritySlots
+from opencli_daemon.utils import ffmpeg_scheduler
+from opencli_daemon.utils.cancellation import (
+    CancelToken, OperationCancelled, bind_token, unbind_token,
+)
 
 _HOME = os.environ.get("HOME", ".")
 _OUTPUT_DIR = Path(_HOME) / ".opencli" / "output" / "episodes"
 
 ProgressCallback = Callable[[dict[str, Any]], Union[None, Awaitable[None]]]
 
+# Scene transition of the final concat (subtitles allow for the overlap)
+TRANSITION = "fade"
+TRANSITION_S = 0.5
+
+# Fitted scene lengths are rounded up to this step, so a small change in
+# a line's voice doesn't change the clip's fingerprint
+FIT_STEP_S = 0.5
+MIN_SCENE_S = 2.0
+
 
 async def _get_inference():
     """Return the best available inference module (remote Colab or local)."""
@@ -39,6 +79,76 @@ async def _get_inference():
     return local_inference
 
 
+def _fit_to_voice(planned: float, voice: float | None) -> float:
+    """Scene length for a dialogue track of *voice* seconds (*planned* without one)."""
+    config = load_config()
+    if not voice or not get_nested(config, "episode.fit_to_voice", True):
+        return planned
+    tail = float(get_nested(config, "episode.voice_tail_s", 0.75))
+    return max(MIN_SCENE_S, math.ceil((voice + tail) / FIT_STEP_S) * FIT_STEP_S)
+
+
+async def _stream_scenes(
+    todo: list[set[str]],
+    keyframe: Callable[[int], Awaitable[str]],
+    clip: Callable[[int, str], Awaitable[str]],
+    voice: Callable[[int], Awaitable[str]],
+    assemble: Callable[[int, str, str], Awaitable[str]],
+    progress: Callable[..., Awaitable[None]],
+) -> tuple[list[str], list[str]]:
+    """Run every scene keyframe → clip → mux concurrently; (clips, assembled) in scene order.
+
+    *todo* holds the steps ("keyframe", "clip", "scene") each scene still
+    needs; the others only look up their checkpointed artifact. *voice*
+    waits for a scene's dialogue track ("" if none) and may refine its
+    todo; only the scene's clip waits for it, so keyframes start at once.
+    Keyframes and clips share the GPU slots and muxes the FFmpeg slots;
+    contended slots go to the earliest scene so scenes finish roughly in
+    order. Progress spreads the remaining steps over phases 1–6.
+    """
+    config = load_config()
+    gpu = PrioritySlots(int(get_nested(config, "episode.gpu_concurrency", 1)))
+    ffmpeg = PrioritySlots(int(get_nested(config, "episode.ffmpeg_concurrency", 2)))
+
+    count = len(todo)
+    done = 0
+
+    async def _step(label: str, i: int) -> None:
+        nonlocal done
+        done += 1
+        # Recounted: a scene's todo can shrink once its voice is measured
+        position = min(1.0, done / max(1, sum(len(t) for t in todo))) * 6
+        phase = min(6, int(position) + 1)
+        await progress(phase, f"{label} {i+1}/{count}", (position - (phase - 1)) * 100)
+
+    async def _run(i: int, kind: str, label: str, slots: PrioritySlots | None,
+                   fn: Callable[..., Awaitable[str]], *args: Any) -> str:
+        if kind not in todo[i]:
+            return await fn(i, *args)  # checkpoint lookup only
+        async with slots.acquire(-i) if slots else contextlib.nullcontext():
+            path = await fn(i, *args)
+        await _step(label, i)
+        return path
+
+    async def _scene(i: int) -> tuple[str, str]:
+        kf = await _run(i, "keyframe", "Keyframe", gpu, keyframe)
+        audio = await voice(i)
+        clip_path = await _run(i, "clip", "Clip", gpu, clip, kf)
+        scene_path = await _run(i, "scene", "Scene", ffmpeg, assemble, clip_path, audio)
+        return clip_path, scene_path
+
+    scenes = [asyncio.create_task(_scene(i)) for i in range(count)]
+    try:
+        results = await asyncio.gather(*scenes)
+    finally:
+        # A failed or cancelled scene stops the rest
+        pending = [t for t in scenes if not t.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    return [c for c, _ in results], [a for _, a in results]
+
+
 async def generate_episode(
     episode_id: str,
     script: EpisodeScript,
@@ -50,16 +160,79 @@ async def generate_episode(
     color_grade: str = "",
     export_platform: str = "",
     cancelled: Callable[[], bool] | None = None,
+    resume: bool = False,
+    cancel_token: CancelToken | None = None,
+    streaming: bool | None = None,
+    seed: int | None = None,
+    force: bool = False,
+    burn_subtitles: bool = False,
 ) -> dict[str, Any]:
-    """Generate a complete episode from script."""
+    """Generate a complete episode from script.
+
+    Every finished artifact is checkpointed to episodes.checkpoint under a
+    fingerprint of its inputs (scene fields, character descriptions, voices,
+    models, quality, seed). Regenerating — to resume an interrupted attempt
+    or after editing the script — reuses every artifact whose inputs are
+    unchanged and whose file still validates, so only changed scenes, the
+    concat and the post steps are redone; progress covers just that work.
+    force discards the checkpoint first. (resume is accepted for API
+    compatibility; reuse no longer depends on it.)
+
+    cancel_token is bound for the whole run, so cancelling it kills the
+    in-flight inference subprocess, FFmpeg process or TTS request.
+
+    streaming (default: config episode.streaming, true) runs the scenes
+    through keyframe → clip → mux independently; false keeps the
+    phase-by-phase schedule.
+
+    The LUT grade, burned-in subtitles (burn_subtitles) and platform
+    encode run as a single ffmpeg pass over the concatenated video.
+
+    Scenes with dialogue last as long as their synthesized voice (config
+    episode.fit_to_voice); the per-line durations are kept with the audio
+    checkpoint and time the subtitles. TTS starts with the keyframes;
+    each scene's clip waits only for its own voice.
+    """
     episode_dir = _OUTPUT_DIR / episode_id
     episode_dir.mkdir(parents=True, exist_ok=True)
+    if streaming is None:
+        streaming = bool(get_nested(load_config(), "episode.streaming", True))
 
     total_phases = 10
     scenes = script.scenes
     if not scenes:
         return {"success": False, "error": "No scenes in script"}
 
+    cp = await EpisodeCheckpoint.load(episode_id)
+    if force:
+        cp.reset()
+    cp.options.update({
+        "image_model": image_model, "video_model": video_model, "quality": quality,
+        "color_grade": color_grade, "export_platform": export_platform, "seed": seed,
+        "burn_subtitles": burn_subtitles,
+    })
+    await cp.save()
+
+    # Keys (re)built in this attempt; downstream artifacts can't be reused
+    regenerated: set[str] = set()
+    reused: list[str] = []
+
+    def _reuse(key: str, *deps: str) -> str | None:
+        if any(d in regenerated for d in deps):
+            return None
+        path = cp.get(key)
+        if path:
+            reused.append(key)
+        return path
+
+    async def _record(key: str, path: str, meta: dict[str, Any] | None = None) -> None:
+        regenerated.add(key)
+        await cp.put(key, path, meta)
+
+    def _artifact_path(key: str, suffix: str) -> str:
+        kind, digest = key.split(":", 1)
+        return str(episode_dir / f"{kind}_{digest}{suffix}")
+
     async def _progress(phase: int, msg: str, pct: float = 0) -> None:
         overall = ((phase - 1) / total_phases + pct / total_phases / 100) * 100
         if on_progress:
@@ -75,22 +248,77 @@ async def generate_episode(
         except Exception:
             pass  # Non-critical; don't block generation
 
+    def _ffmpeg_progress(phase: int, label: str) -> Callable[[Any], Awaitable[None]]:
+        """Report an FFmpeg job's progress within *phase* (at most once per percent)."""
+        last = [-1.0]
+
+        async def _report(p: Any) -> None:
+            pct = (p.fraction or 0) * 100
+            if pct - last[0] < 1 and not p.done:
+                return
+            last[0] = pct
+            speed = f" ({p.speed:.1f}x)" if p.speed else ""
+            await _progress(phase, f"{label} {pct:.0f}%{speed}", pct)
+
+        return _report
+
     def _check_cancelled() -> bool:
+        if cancel_token and cancel_token.cancelled:
+            return True
         return cancelled() if cancelled else False
 
+    def _raise_if_cancelled() -> None:
+        if _check_cancelled():
+            raise OperationCancelled("Cancelled")
+
+    # Dialogue still being synthesized, by scene
+    voice_tasks: dict[int, asyncio.Task[tuple[str, list[float | None] | None]]] = {}
+    bound = bind_token(cancel_token)
+    # Episode encodes queue behind interactive FFmpeg work
+    priority = ffmpeg_scheduler.bind_priority(ffmpeg_scheduler.BATCH)
     try:
         # Resolve inference backend (Colab GPU or local)
         inference = await _get_inference()
         backend_name = "Colab GPU" if inference is remote_inference else "local"
 
-        # ── Phase 1: Generate keyframe images ────────────────────
-        await _progress(1, f"Generating keyframe images ({backend_name})...")
-        keyframe_paths: list[str] = []
-
-        for i, scene in enumerate(scenes):
-            if _check_cancelled():
-                return {"success": False, "error": "Cancelled"}
-
+        # ── Dialogue: its measured length fits each scene's clip ──
+        def _cached_voice(lines: list[dict[str, Any]]) -> tuple[str, list[float | None] | None] | None:
+            """A checkpointed dialogue track and its per-line durations ("", None without lines)."""
+            if not lines:
+                return "", None
+            key = artifact_key("audio", lines)
+            durations = cp.meta(key).get("lines")
+            cached = _reuse(key) if durations is not None else None
+            return (cached, durations) if cached else None
+
+        async def _synthesize(lines: list[dict[str, Any]]) -> tuple[str, list[float | None] | None]:
+            _raise_if_cancelled()
+            # Per-line synthesis (cached per line), joined into the scene's track
+            result = await tts_registry.synthesize_dialogue(lines)
+            if not (result.get("success") and result.get("path")):
+                return "", None
+            # synthesize_dialogue skips blank lines; they take no time
+            spoken = iter(result.get("lines") or [])
+            durations = [next(spoken, {}).get("duration") if str(line["text"]).strip() else 0.0
+                         for line in lines]
+            await _record(artifact_key("audio", lines), result["path"], {"lines": durations})
+            return result["path"], durations
+
+        scene_lines = [[{"text": line.text, "voice": script.voice_for(line)} for line in scene.dialogue]
+                       for scene in scenes]
+        voices = [_cached_voice(lines) for lines in scene_lines]
+        # TTS is network-bound: start it now, alongside the GPU work; only a
+        # scene's clip waits for its voice (concurrency bounded by tts_registry)
+        voice_tasks.update({i: asyncio.create_task(_synthesize(lines))
+                            for i, lines in enumerate(scene_lines) if voices[i] is None})
+        if voice_tasks:
+            await _progress(1, f"Synthesizing dialogue for {len(voice_tasks)} scenes...")
+
+        # ── Fingerprint every scene's artifacts ──────────────────
+        kf_size = (1280, 720) if quality != "draft" else (512, 288)
+        seed_kwargs = {"seed": seed} if seed is not None else {}
+        plans: list[dict[str, Any]] = []
+        for scene, lines in zip(scenes, scene_lines):
             prompt = scene.visual_prompt or scene.description
             # Apply character consistency
             for line in scene.dialogue:
@@ -98,198 +326,336 @@ async def generate_episode(
                     prompt, line.character_id, episode_id
                 )
                 prompt = char_result["prompt"]
+            plans.append({
+                "prompt": prompt, "lines": lines,
+                "keyframe": artifact_key("keyframe", prompt, image_model, kf_size, seed),
+                "audio": artifact_key("audio", lines) if lines else None,
+            })
+
+        def _needs(p: dict[str, Any]) -> set[str]:
+            """Work a fitted scene still needs; an unchanged scene needs none."""
+            needed: set[str] = set()
+            if not cp.get(p["scene"]):
+                if p["audio"]:
+                    needed.add("scene")
+                if not cp.get(p["clip"]):
+                    needed.add("clip")
+                    if not cp.get(p["keyframe"]):
+                        needed.add("keyframe")
+            return needed
+
+        def _fit_plan(i: int) -> None:
+            """Fingerprint scene *i*'s clip and scene once its voice is known."""
+            p = plans[i]
+            durations = voices[i][1]
+            # Only a fully measured track can fit the scene
+            voice = sum(durations) if durations and None not in durations else None
+            duration = _fit_to_voice(scenes[i].duration_seconds, voice)
+            frames = max(8, int(duration * 4))
+            clip_key = artifact_key("clip", p["keyframe"], scenes[i].visual_prompt or scenes[i].description,
+                                    video_model, frames, duration)
+            p.update({
+                "frames": frames, "duration": duration, "clip": clip_key,
+                # A scene without dialogue is just its clip
+                "scene": artifact_key("scene", clip_key, p["audio"]) if p["audio"] else clip_key,
+            })
+            todo[i] = _needs(p)
+
+        async def _fit(i: int) -> dict[str, Any]:
+            """Scene *i*'s plan, fitted to its voice (waits for its TTS)."""
+            if "clip" not in plans[i]:
+                voices[i] = await voice_tasks[i]
+                _fit_plan(i)
+            return plans[i]
+
+        async def _voice(i: int) -> str:
+            """Scene *i*'s dialogue track ("" if none), once the scene is fitted to it."""
+            await _fit(i)
+            return voices[i][0]
+
+        # Work each scene still needs. A scene still synthesizing has new
+        # dialogue, so it is re-muxed; its clip (and keyframe, unless
+        # checkpointed) are assumed needed until its voice is measured.
+        todo: list[set[str]] = []
+        for i, p in enumerate(plans):
+            todo.append({"scene", "clip"} | (set() if cp.get(p["keyframe"]) else {"keyframe"}))
+            if voices[i] is not None:
+                _fit_plan(i)
+        dirty = sum(1 for t in todo if t)
+        if dirty < len(scenes):
+            await _progress(1, f"Re-rendering {dirty} of {len(scenes)} scenes "
+                               f"({len(scenes) - dirty} unchanged)")
+
+        # ── Per-scene steps (shared by the phased and streaming schedules) ──
+        # Each returns the reusable artifact, or "" when the step isn't needed.
+
+        async def _keyframe(i: int) -> str:
+            _raise_if_cancelled()
+            p = plans[i]
+            cached = _reuse(p["keyframe"])
+            if cached or "keyframe" not in todo[i]:
+                return cached or ""
 
             result = await inference.generate_image(
-                prompt=prompt,
+                prompt=p["prompt"],
                 model=image_model,
-                width=1280 if quality != "draft" else 512,
-                height=720 if quality != "draft" else 288,
+                width=kf_size[0],
+                height=kf_size[1],
+                **seed_kwargs,
             )
 
+            path = ""
             if result.get("success"):
                 # Save base64 to local file if path is remote or missing
                 local_path = result.get("path", "")
                 if result.get("image_base64") and (not local_path or not Path(local_path).exists()):
-                    local_path = str(episode_dir / f"keyframe_{i:03d}.png")
+                    local_path = _artifact_path(p["keyframe"], ".png")
                     with open(local_path, "wb") as f:
                         f.write(base64.b64decode(result["image_base64"]))
                 if local_path and Path(local_path).exists():
-                    keyframe_paths.append(local_path)
-                else:
-                    keyframe_paths.append("")
-            else:
-                keyframe_paths.append("")
-
-            await _progress(1, f"Keyframe {i+1}/{len(scenes)}", (i + 1) / len(scenes) * 100)
-
-        # ── Phase 2: Generate video clips (batched) ──────────────
-        await _progress(2, "Generating video clips...")
-        clip_paths: list[str] = []
-        batch_size = 3
-
-        for batch_start in range(0, len(scenes), batch_size):
-            if _check_cancelled():
-                return {"success": False, "error": "Cancelled"}
-
-            batch_end = min(batch_start + batch_size, len(scenes))
-            tasks = []
-            for i in range(batch_start, batch_end):
-                kf = keyframe_paths[i] if i < len(keyframe_paths) else ""
-                scene = scenes[i]
-                prompt = scene.visual_prompt or scene.description
-
+                    path = local_path
+            await _record(p["keyframe"], path)
+            return path
+
+        async def _clip(i: int, kf: str) -> str:
+            _raise_if_cancelled()
+            p = await _fit(i)
+            cached = _reuse(p["clip"], p["keyframe"])
+            if cached or "clip" not in todo[i]:
+                return cached or ""
+
+            scene = scenes[i]
+            prompt = scene.visual_prompt or scene.description
+            try:
                 if kf and Path(kf).exists():
-                    tasks.append(inference.generate_video(
+                    r = await inference.generate_video(
                         prompt=prompt, image_path=kf, model=video_model,
-                        frames=max(8, int(scene.duration_seconds * 4)),
-                    ))
+                        frames=p["frames"], **seed_kwargs,
+                    )
                 else:
                     # Ken Burns fallback on keyframe
                     from opencli_daemon.domains.media_creation.domain import MediaCreationDomain
                     mc = MediaCreationDomain()
-                    tasks.append(mc.execute_task("media_animate_photo", {
+                    r = await mc.execute_task("media_animate_photo", {
                         "image_path": kf, "effect": "ken_burns",
-                        "duration": scene.duration_seconds,
-                    }))
-
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            for j, r in enumerate(results):
-                idx = batch_start + j
-                if isinstance(r, Exception):
-                    clip_paths.append("")
-                elif isinstance(r, dict) and r.get("success", True):
-                    # Save base64 video to local file if path is remote
-                    local_path = r.get("path", "")
-                    if r.get("video_base64") and (not local_path or not Path(local_path).exists()):
-                        local_path = str(episode_dir / f"clip_{idx:03d}.mp4")
-                        with open(local_path, "wb") as f:
-                            f.write(base64.b64decode(r["video_base64"]))
-                    if local_path and Path(local_path).exists():
-                        clip_paths.append(local_path)
-                    else:
-                        clip_paths.append("")
-                else:
-                    clip_paths.append("")
-
-            await _progress(2, f"Clips {batch_end}/{len(scenes)}", batch_end / len(scenes) * 100)
-
-        # ── Phase 3: TTS for dialogue ────────────────────────────
-        await _progress(3, "Synthesizing dialogue audio...")
-        scene_audio_paths: list[str] = []
-
-        for i, scene in enumerate(scenes):
-            if _check_cancelled():
-                return {"success": False, "error": "Cancelled"}
-
-            if not scene.dialogue:
-                scene_audio_paths.append("")
-                continue
-
-            # Concatenate all dialogue lines for the scene
-            full_text = " ".join(line.text for line in scene.dialogue)
-            voice = scene.dialogue[0].voice or "zh-CN-XiaoxiaoNeural"
-
-            result = await tts_registry.synthesize_edge_tts(full_text, voice=voice)
-            if result.get("success") and result.get("path"):
-                scene_audio_paths.append(result["path"])
-            else:
-                scene_audio_paths.append("")
-
-            await _progress(3, f"TTS {i+1}/{len(scenes)}", (i + 1) / len(scenes) * 100)
+                        "duration": p["duration"],
+                    })
+            except OperationCancelled:
+                raise
+            except Exception:
+                r = None
+
+            path = ""
+            if isinstance(r, dict) and r.get("success", True):
+                # Save base64 video to local file if path is remote
+                local_path = r.get("path", "")
+                if r.get("video_base64") and (not local_path or not Path(local_path).exists()):
+                    local_path = _artifact_path(p["clip"], ".mp4")
+                    with open(local_path, "wb") as f:
+                        f.write(base64.b64decode(r["video_base64"]))
+                if local_path and Path(local_path).exists():
+                    path = local_path
+            await _record(p["clip"], path)
+            return path
 
-        # ── Phase 4: Generate subtitles ──────────────────────────
-        await _progress(4, "Generating subtitles...")
         ass_path = str(episode_dir / "subtitles.ass")
-        generate_ass(scenes, ass_path)
-
-        # ── Phase 5: Audio mixing (voice + BGM) ─────────────────
-        await _progress(5, "Mixing audio...")
-        mixed_audio_paths: list[str] = []
-        for i, audio_path in enumerate(scene_audio_paths):
-            if audio_path:
-                mixed_audio_paths.append(audio_path)  # No BGM for now
-            else:
-                mixed_audio_paths.append("")
-
-        # ── Phase 6: Scene assembly (video + audio per scene) ────
-        await _progress(6, "Assembling scenes...")
-        assembled_scenes: list[str] = []
-
-        for i, (clip, audio) in enumerate(zip(clip_paths, mixed_audio_paths)):
+        scene_lengths: list[float | None] = []
+
+        async def _subtitles(clips: list[str], overlap: float) -> None:
+            """Write the ASS file on the timeline of the scenes' clips."""
+            if not scene_lengths:
+                # An assembled scene is as long as its clip; no clip, no scene
+                infos = await asyncio.gather(*(media_info.probe(c) for c in clips))
+                scene_lengths.extend(
+                    None if not c else (info.duration if info and info.duration else p["duration"])
+                    for c, info, p in zip(clips, infos, plans))
+            generate_ass(scenes, ass_path, scene_durations=scene_lengths,
+                         line_durations=[durations for _, durations in voices], overlap=overlap)
+
+        async def _assemble(i: int, clip: str, audio: str) -> str:
+            """The scene's clip with its dialogue muxed in ("" if there is no clip)."""
+            p = plans[i]
+            if p["audio"]:
+                cached = _reuse(p["scene"], p["clip"], p["audio"])
+                if cached:
+                    return cached
             if not clip or not Path(clip).exists():
-                continue
-
-            if audio and Path(audio).exists():
-                output = str(episode_dir / f"scene_{i:03d}.mp4")
-                result = await ffmpeg_composer.mux_video_audio(clip, audio, output)
-                if result.get("success"):
-                    assembled_scenes.append(result["path"])
-                else:
-                    assembled_scenes.append(clip)
-            else:
-                assembled_scenes.append(clip)
-
-            await _progress(6, f"Scene {i+1}/{len(scenes)}", (i + 1) / len(scenes) * 100)
+                return ""
+            if not audio or not Path(audio).exists():
+                return clip
+            _raise_if_cancelled()
+            output = _artifact_path(p["scene"], ".mp4")
+            result = await ffmpeg_composer.mux_video_audio(clip, audio, output)
+            if not result.get("success"):
+                return clip
+            await _record(p["scene"], result["path"])
+            return result["path"]
+
+        if streaming:
+            clip_paths, assembled = await _stream_scenes(
+                todo, _keyframe, _clip, _voice, _assemble, _progress,
+            )
+            await _progress(4, "Generating subtitles...")
+            await _subtitles(clip_paths, TRANSITION_S)
+        else:
+            def _count(kind: str) -> int:
+                return max(1, sum(1 for t in todo if kind in t))
+
+            # ── Phase 1: Generate keyframe images ────────────────────
+            await _progress(1, f"Generating keyframe images ({backend_name})...")
+            keyframe_paths: list[str] = []
+            done = 0
+            for i in range(len(scenes)):
+                keyframe_paths.append(await _keyframe(i))
+                if "keyframe" in todo[i]:
+                    done += 1
+                    await _progress(1, f"Keyframe {done}/{_count('keyframe')}",
+                                    done / _count("keyframe") * 100)
+
+            # ── Phase 2: Generate video clips (batched) ──────────────
+            await _progress(2, "Generating video clips...")
+            pending = [i for i in range(len(scenes)) if "clip" in todo[i]]
+            clip_paths = [""] * len(scenes)
+            for i in range(len(scenes)):
+                if "clip" not in todo[i]:
+                    clip_paths[i] = await _clip(i, keyframe_paths[i])
+            batch_size = 3
+            for batch_start in range(0, len(pending), batch_size):
+                batch = pending[batch_start:batch_start + batch_size]
+                for i, path in zip(batch, await asyncio.gather(*(
+                    _clip(i, keyframe_paths[i]) for i in batch
+                ))):
+                    clip_paths[i] = path
+                done = batch_start + len(batch)
+                await _progress(2, f"Clips {done}/{len(pending)}", done / len(pending) * 100)
+
+            # ── Phase 3: TTS for dialogue (running since the start) ──
+            scene_audio_paths = [await _voice(i) for i in range(len(scenes))]
+            voiced = sum(1 for path in scene_audio_paths if path)
+            await _progress(3, f"TTS {voiced}/{voiced}", 100)
+
+            # ── Phase 4: Generate subtitles ──────────────────────────
+            await _progress(4, "Generating subtitles...")
+            await _subtitles(clip_paths, TRANSITION_S)
+
+            # ── Phase 5: Audio mixing (voice + BGM) ─────────────────
+            await _progress(5, "Mixing audio...")
+            mixed_audio_paths = list(scene_audio_paths)  # No BGM for now
+
+            # ── Phase 6: Scene assembly (video + audio per scene) ────
+            await _progress(6, "Assembling scenes...")
+            assembled = []
+            done = 0
+            for i, (clip, audio) in enumerate(zip(clip_paths, mixed_audio_paths)):
+                assembled.append(await _assemble(i, clip, audio))
+                if "scene" in todo[i]:
+                    done += 1
+                    await _progress(6, f"Scene {done}/{_count('scene')}",
+                                    done / _count("scene") * 100)
 
         # ── Phase 7: Final concatenation ─────────────────────────
         await _progress(7, "Concatenating final video...")
-        if not assembled_scenes:
+        parts = [(plans[i]["scene"], path) for i, path in enumerate(assembled) if path]
+        if not parts:
             await store.update_episode_status(episode_id, "failed", 0, "")
             return {"success": False, "error": "No assembled scenes to concatenate"}
+        assembled_scenes = [path for _, path in parts]
 
         raw_output = str(episode_dir / "raw.mp4")
-        concat_result = await ffmpeg_composer.concat_videos(
-            assembled_scenes, raw_output, transition="fade", transition_duration=0.5,
-        )
+        raw_key = artifact_key("raw", [key for key, _ in parts], TRANSITION, TRANSITION_S)
+        cached = _reuse(raw_key, *(key for key, _ in parts))
+        if cached:
+            concat_result = {"success": True, "path": cached}
+        else:
+            concat_result = await ffmpeg_composer.concat_videos(
+                assembled_scenes, raw_output, transition=TRANSITION, transition_duration=TRANSITION_S,
+                on_progress=_ffmpeg_progress(7, "Concatenating"),
+            )
         if not concat_result.get("success"):
             # Fallback: simple concat without transitions
             concat_result = await ffmpeg_composer.concat_videos(
                 assembled_scenes, raw_output,
             )
+            # Scenes no longer overlap
+            await _subtitles(clip_paths, 0.0)
 
         if not concat_result.get("success"):
             await store.update_episode_status(episode_id, "failed", 0, "")
             return {"success": False, "error": concat_result.get("error", "Concat failed")}
 
-        final_path = raw_output
+        final_path = concat_result["path"]
+        final_key = raw_key
+        if not cached:
+            await _record(raw_key, final_path)
 
         # ── Phase 8: Post-processing (upscale + interpolation) ───
         if quality != "draft":
             await _progress(8, "Post-processing (upscale)...")
-            upscale_result = await inference.run_inference("upscale_video", {
-                "video_path": final_path,
-                "output_dir": str(episode_dir),
-            })
-            if upscale_result.get("success") and upscale_result.get("path"):
-                final_path = upscale_result["path"]
+            key = artifact_key("upscaled", final_key)
+            cached = _reuse(key, final_key)
+            if cached:
+                final_path, final_key = cached, key
+            else:
+                upscale_result = await inference.run_inference("upscale_video", {
+                    "video_path": final_path,
+                    "output_dir": str(episode_dir),
+                })
+                if upscale_result.get("success") and upscale_result.get("path"):
+                    final_path, final_key = upscale_result["path"], key
+                    await _record(key, final_path)
         else:
             await _progress(8, "Skipping post-processing (draft mode)")
 
-        # ── Phase 9: LUT color grading ───────────────────────────
-        if color_grade:
-            await _progress(9, f"Applying {color_grade} color grade...")
-            lut_path = Path(_HOME) / ".opencli" / "luts" / f"{color_grade}.cube"
-            if lut_path.exists():
-                lut_result = await ffmpeg_composer.apply_lut(
-                    final_path, str(lut_path),
-                    str(episode_dir / "graded.mp4"),
+        # ── Phases 9–10: grade, subtitles, platform encode (one pass) ──
+        lut_path = Path(_HOME) / ".opencli" / "luts" / f"{color_grade}.cube"
+        grade = color_grade if color_grade and lut_path.exists() else ""
+        subtitles = ass_path if burn_subtitles and Path(ass_path).exists() else ""
+        if grade or export_platform or subtitles:
+            steps = [s for s in (grade and f"{grade} grade", subtitles and "subtitles",
+                                 export_platform and f"{export_platform} encode") if s]
+            await _progress(9, f"Post-processing ({', '.join(steps)}) in one pass...")
+            key = artifact_key("final", final_key, grade, export_platform,
+                               Path(subtitles).read_text() if subtitles else "")
+            cached = _reuse(key, final_key)
+            if cached:
+                final_path, final_key = cached, key
+            else:
+                # A graded master is only written when asked for
+                graded_key = artifact_key("graded", final_key, grade)
+                keep_graded = bool(grade) and "graded" in get_nested(
+                    load_config(), "episode.keep_intermediates", [])
+                post_result = await ffmpeg_composer.render_post(
+                    final_path,
+                    str(episode_dir / f"final_{export_platform or 'master'}.mp4"),
+                    lut_path=str(lut_path) if grade else "",
+                    subtitle_path=subtitles,
+                    platform=export_platform,
+                    intermediates={"graded": _artifact_path(graded_key, ".mp4")} if keep_graded else None,
+                    on_progress=_ffmpeg_progress(9, "Post-processing"),
                 )
-                if lut_result.get("success"):
-                    final_path = lut_result["path"]
-        else:
-            await _progress(9, "Skipping color grading")
-
-        # ── Phase 10: Platform encoding ──────────────────────────
-        if export_platform:
-            await _progress(10, f"Encoding for {export_platform}...")
-            encode_result = await ffmpeg_composer.encode_for_platform(
-                final_path, export_platform,
-                str(episode_dir / f"final_{export_platform}.mp4"),
-            )
-            if encode_result.get("success"):
-                final_path = encode_result["path"]
+                if post_result.get("success"):
+                    final_path, final_key = post_result["path"], key
+                    await _record(key, final_path)
+                    if "graded" in post_result["intermediates"]:
+                        await _record(graded_key, post_result["intermediates"]["graded"])
         else:
-            await _progress(10, "Finalizing...")
+            await _progress(9, "Skipping color grading and platform encoding")
+        await _progress(10, "Finalizing...")
+
+        # Forget artifacts of earlier script versions and delete their files
+        keep = {key for p in plans for key in (p["keyframe"], p["clip"], p["audio"], p["scene"]) if key}
+        keep |= set(regenerated) | set(reused)
+        for stale in cp.retain(keep):
+            if Path(stale).parent == episode_dir:
+                with contextlib.suppress(OSError):
+                    os.remove(stale)
+        # Normalized copies the concat cached beside scenes that are now gone
+        live = {Path(path).stem for path in cp.paths()}
+        for norm in episode_dir.glob(ffmpeg_composer.NORM_CACHE_GLOB):
+            if norm.name.split(".norm-", 1)[0] not in live:
+                with contextlib.suppress(OSError):
+                    norm.unlink()
+        await cp.save()
 
         # Update episode status
         import logging
@@ -306,9 +672,13 @@ async def generate_episode(
             "output_path": final_path,
             "scenes_count": len(scenes),
             "clips_generated": len([c for c in clip_paths if c]),
-            "duration_estimate": sum(s.duration_seconds for s in scenes),
+            "scenes_rerendered": sum(1 for t in todo if t),
+            "artifacts_reused": len(reused),
+            "duration_estimate": sum(p["duration"] for p in plans),
         }
 
+    except OperationCancelled:
+        return {"success": False, "error": "Cancelled"}
     except Exception as e:
         import logging
         logging.getLogger(__name__).error(f"Episode {episode_id} generation failed: {e}", exc_info=True)
@@ -317,3 +687,11 @@ async def generate_episode(
         except Exception:
             pass
         return {"success": False, "error": str(e)}
+    finally:
+        # A failed or cancelled run abandons its outstanding TTS
+        pending = [t for t in voice_tasks.values() if not t.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*voice_tasks.values(), return_exceptions=True)
+        ffmpeg_scheduler.unbind_priority(priority)
+        unbind_token(bound)
@@ -1,17 +1,19 @@
 """Build a PipelineDefinition from an EpisodeScript.
 
-Each scene generates a sub-graph of nodes (keyframe, video, tts, assembly).
-Post-processing nodes run after all scenes complete.
+A single map node runs the per-scene sub-graph (keyframe, video, tts,
+assembly) over all scenes. Post-processing nodes run after all scenes complete.
 """
 
 import uuid
 from typing import Any
 
 from opencli_daemon.pipeline.definition import (
+    MAP_NODE_TYPE,
     PipelineDefinition,
     PipelineNode,
     PipelineEdge,
     PipelineParam,
+    PipelineSubgraph,
 )
 from .script import EpisodeScript
 
@@ -34,139 +36,114 @@ def build_episode_pipeline(
 
     nodes: list[PipelineNode] = []
     edges: list[PipelineEdge] = []
-    assembly_ids: list[str] = []
 
     scenes = script.scenes or []
-
-    for i, scene in enumerate(scenes):
-        prompt = scene.visual_prompt or scene.description
-        y_base = i * 300
-
-        # ── Keyframe node ───────────────────────────────────────
-        kf_id = f"scene_{i}_keyframe"
-        kf_width = 1280 if quality != "draft" else 512
-        kf_height = 720 if quality != "draft" else 288
-        nodes.append(PipelineNode(
-            id=kf_id,
-            type="media_local_generate_image",
-            domain="media_creation",
-            label=f"S{i+1} Keyframe",
-            x=100, y=y_base,
-            params={
-                "prompt": prompt,
-                "model": image_model,
-                "width": kf_width,
-                "height": kf_height,
-            },
-        ))
-
-        # ── Video node ──────────────────────────────────────────
-        vid_id = f"scene_{i}_video"
-        if use_controlnet:
-            vid_type = "media_local_controlnet_video"
-            vid_params = {
-                "prompt": prompt,
-                "reference_image_base64": f"{{{{{kf_id}.image_base64}}}}",
-                "control_type": controlnet_type,
-                "controlnet_scale": controlnet_scale,
-            }
-        else:
-            vid_type = "media_local_generate_video"
-            vid_params = {
-                "prompt": prompt,
-                "image_base64": f"{{{{{kf_id}.image_base64}}}}",
-                "model": video_model,
-                "frames": max(8, int(scene.duration_seconds * 4)),
-            }
-
-        nodes.append(PipelineNode(
-            id=vid_id,
-            type=vid_type,
-            domain="media_creation",
-            label=f"S{i+1} Video",
-            x=400, y=y_base,
-            params=vid_params,
-        ))
-        edges.append(PipelineEdge(
-            id=f"e_{kf_id}_to_{vid_id}",
-            source_node=kf_id, source_port="output",
-            target_node=vid_id, target_port="input",
-        ))
-
-        # ── TTS node (parallel with keyframe) ──────────────────
-        tts_id = f"scene_{i}_tts"
-        dialogue_text = " ".join(line.text for line in scene.dialogue) if scene.dialogue else ""
-        voice = scene.dialogue[0].voice if scene.dialogue and scene.dialogue[0].voice else "zh-CN-XiaoxiaoNeural"
-
-        if dialogue_text:
-            nodes.append(PipelineNode(
-                id=tts_id,
-                type="media_tts_synthesize",
-                domain="media_creation",
-                label=f"S{i+1} TTS",
-                x=100, y=y_base + 150,
-                params={
-                    "text": dialogue_text,
-                    "voice": voice,
-                    "provider": "edge_tts",
-                },
-            ))
-
-        # ── Assembly node (mux video + audio) ──────────────────
-        asm_id = f"assembly_{i}"
-        asm_params: dict[str, Any] = {
-            "video_path": f"{{{{{vid_id}.path}}}}",
+    kf_width = 1280 if quality != "draft" else 512
+    kf_height = 720 if quality != "draft" else 288
+
+    # One map node fans the per-scene subgraph (keyframe → video, tts →
+    # assembly) out over the scenes, so the graph size doesn't grow with them.
+    scene_items = []
+    for scene in scenes:
+        scene_items.append({
+            "scene_id": scene.id,
+            "prompt": scene.visual_prompt or scene.description,
+            "frames": max(8, int(scene.duration_seconds * 4)),
+            "text": " ".join(line.text for line in scene.dialogue) if scene.dialogue else "",
+            "voice": scene.dialogue[0].voice if scene.dialogue and scene.dialogue[0].voice
+                     else "zh-CN-XiaoxiaoNeural",
+            # Synthesized per line (and cached per line), then joined
+            "lines": [{"text": line.text, "voice": script.voice_for(line)}
+                      for line in scene.dialogue],
+        })
+
+    if use_controlnet:
+        vid_type = "media_local_controlnet_video"
+        vid_params = {
+            "prompt": "{{item.prompt}}",
+            "reference_image_base64": "{{keyframe.image_base64}}",
+            "control_type": controlnet_type,
+            "controlnet_scale": controlnet_scale,
+        }
+    else:
+        vid_type = "media_local_generate_video"
+        vid_params = {
+            "prompt": "{{item.prompt}}",
+            "image_base64": "{{keyframe.image_base64}}",
+            "model": video_model,
+            "frames": "{{item.frames}}",
         }
-        if dialogue_text:
-            asm_params["audio_path"] = f"{{{{{tts_id}.path}}}}"
-
-        nodes.append(PipelineNode(
-            id=asm_id,
-            type="media_scene_assembly",
-            domain="media_creation",
-            label=f"S{i+1} Assembly",
-            x=700, y=y_base,
-            params=asm_params,
-        ))
 
-        # Edge: video → assembly
-        edges.append(PipelineEdge(
-            id=f"e_{vid_id}_to_{asm_id}",
-            source_node=vid_id, source_port="output",
-            target_node=asm_id, target_port="input",
-        ))
-        # Edge: tts → assembly (if dialogue exists)
-        if dialogue_text:
-            edges.append(PipelineEdge(
-                id=f"e_{tts_id}_to_{asm_id}",
-                source_node=tts_id, source_port="output",
-                target_node=asm_id, target_port="audio",
-            ))
+    scene_graph = PipelineSubgraph(
+        nodes=[
+            PipelineNode(
+                id="keyframe", type="media_local_generate_image", domain="media_creation",
+                label="Keyframe", x=100, y=0,
+                params={"prompt": "{{item.prompt}}", "model": image_model,
+                        "width": kf_width, "height": kf_height},
+            ),
+            PipelineNode(
+                id="video", type=vid_type, domain="media_creation",
+                label="Video", x=400, y=0, params=vid_params,
+            ),
+            # Scenes without dialogue skip TTS; assembly then passes the video through
+            PipelineNode(
+                id="tts", type="media_tts_synthesize", domain="media_creation",
+                label="TTS", x=100, y=150, when="{{item.text}}",
+                params={"text": "{{item.text}}", "lines": "{{item.lines}}",
+                        "voice": "{{item.voice}}", "provider": "edge_tts"},
+            ),
+            PipelineNode(
+                id="assembly", type="media_scene_assembly", domain="media_creation",
+                label="Assembly", x=700, y=0,
+                params={"video_path": "{{video.path}}", "audio_path": "{{tts.path}}"},
+            ),
+        ],
+        edges=[
+            PipelineEdge(id="e_keyframe_to_video", source_node="keyframe",
+                         target_node="video"),
+            PipelineEdge(id="e_video_to_assembly", source_node="video",
+                         target_node="assembly"),
+            PipelineEdge(id="e_tts_to_assembly", source_node="tts",
+                         target_node="assembly", target_port="audio"),
+        ],
+    )
 
-        assembly_ids.append(asm_id)
+    scenes_id = "scenes"
+    nodes.append(PipelineNode(
+        id=scenes_id,
+        type=MAP_NODE_TYPE,
+        domain="pipeline",
+        label=f"Scenes ({len(scenes)})",
+        x=100, y=0,
+        params={
+            "items": scene_items,
+            "parallelism": settings.get("scene_parallelism", 4),
+            "gather": "assembly",
+        },
+        subgraph=scene_graph,
+    ))
 
-    # ── Post-processing nodes (all scenes → concat → upscale → grade → encode) ──
+    # ── Post-processing nodes (all scenes → concat → upscale → grade + encode) ──
 
     post_x = 1000
-    post_y = len(scenes) * 150  # Center vertically
+    post_y = 0
 
     # Concat all scene assemblies
     concat_id = "post_concat"
-    concat_clips = [f"{{{{{aid}.path}}}}" for aid in assembly_ids]
     nodes.append(PipelineNode(
         id=concat_id,
         type="media_video_assembly",
         domain="media_creation",
         label="Concat All",
         x=post_x, y=post_y,
-        params={"clips": concat_clips},
+        params={"clips": f"{{{{{scenes_id}.paths}}}}"},
+    ))
+    edges.append(PipelineEdge(
+        id=f"e_{scenes_id}_to_{concat_id}",
+        source_node=scenes_id, source_port="output",
+        target_node=concat_id, target_port="input",
     ))
-    for aid in assembly_ids:
-        edges.append(PipelineEdge(
-            id=f"e_{aid}_to_{concat_id}",
-            source_node=aid, source_port="output",
-            target_node=concat_id, target_port="input",
-        ))
 
     prev_id = concat_id
 
@@ -188,45 +165,27 @@ def build_episode_pipeline(
         ))
         prev_id = upscale_id
 
-    # LUT color grading
-    if color_grade:
-        grade_id = "post_colorgrade"
+    # LUT color grading + platform encoding, fused into one ffmpeg pass
+    if color_grade or export_platform:
+        finish_id = "post_finish"
+        steps = [s for s in (color_grade and f"Color: {color_grade}",
+                             export_platform and f"Encode: {export_platform}") if s]
         nodes.append(PipelineNode(
-            id=grade_id,
-            type="media_lut_colorgrade",
+            id=finish_id,
+            type="media_post_process",
             domain="media_creation",
-            label=f"Color: {color_grade}",
+            label=" + ".join(steps),
             x=post_x + 500, y=post_y,
             params={
                 "video_path": f"{{{{{prev_id}.path}}}}",
                 "lut_name": color_grade,
-            },
-        ))
-        edges.append(PipelineEdge(
-            id=f"e_{prev_id}_to_{grade_id}",
-            source_node=prev_id, source_port="output",
-            target_node=grade_id, target_port="input",
-        ))
-        prev_id = grade_id
-
-    # Platform encoding
-    if export_platform:
-        encode_id = "post_encode"
-        nodes.append(PipelineNode(
-            id=encode_id,
-            type="media_platform_encode",
-            domain="media_creation",
-            label=f"Encode: {export_platform}",
-            x=post_x + 750, y=post_y,
-            params={
-                "video_path": f"{{{{{prev_id}.path}}}}",
                 "platform": export_platform,
             },
         ))
         edges.append(PipelineEdge(
-            id=f"e_{prev_id}_to_{encode_id}",
+            id=f"e_{prev_id}_to_{finish_id}",
             source_node=prev_id, source_port="output",
-            target_node=encode_id, target_port="input",
+            target_node=finish_id, target_port="input",
         ))
 
     pipeline_id = f"ep_{episode_id[:8]}"
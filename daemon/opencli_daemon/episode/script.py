@@ -101,6 +101,15 @@ class EpisodeScript:
             scenes=[EpisodeScene.from_json(s) for s in data.get("scenes", [])],
         )
 
+    def voice_for(self, line: DialogueLine) -> str:
+        """The line's voice, else its character's default voice."""
+        if line.voice:
+            return line.voice
+        for c in self.characters:
+            if c.id == line.character_id and c.default_voice:
+                return c.default_voice
+        return "zh-CN-XiaoxiaoNeural"
+
     def to_json(self) -> dict:
         return {
             "title": self.title, "synopsis": self.synopsis,
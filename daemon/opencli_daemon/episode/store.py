@@ -7,13 +7,28 @@ import json
 import time
 from typing import Any
 
+from opencli_daemon.database import blob_store
 from opencli_daemon.database import connection as db
 
+# Explicit projection — never SELECT the legacy inline BLOB columns
+CHARACTER_COLUMNS = (
+    "id", "episode_id", "character_id", "name", "visual_description",
+    "default_voice", "created_at",
+    "reference_image_hash", "reference_image_size",
+    "embedding_hash", "embedding_size",
+)
+
 
 async def list_episodes(limit: int = 50) -> list[dict]:
     return await db.list_rows("episodes", order_by="updated_at DESC", limit=limit)
 
 
+async def list_episodes_by_status(status: str, limit: int = 50) -> list[dict]:
+    return await db.list_rows("episodes", where="status = ?", params=(status,),
+                              order_by="updated_at DESC", limit=limit,
+                              columns=("id", "title", "progress", "pipeline_id", "updated_at"))
+
+
 async def get_episode(episode_id: str) -> dict | None:
     return await db.get_row("episodes", "id", episode_id)
 
@@ -36,6 +51,26 @@ async def update_episode_status(episode_id: str, status: str, progress: float =
     await database.commit()
 
 
+async def get_episode_checkpoint(episode_id: str) -> str | None:
+    row = await db.get_row("episodes", "id", episode_id, columns=("checkpoint",))
+    return row["checkpoint"] if row else None
+
+
+async def save_episode_checkpoint(episode_id: str, checkpoint: str | None) -> None:
+    await db.execute("UPDATE episodes SET checkpoint = ? WHERE id = ?", (checkpoint, episode_id))
+
+
+async def mark_interrupted_episodes() -> list[dict]:
+    """Flag episodes left 'generating' by a previous daemon process as 'interrupted'.
+
+    Call once at startup, before any generation can start.
+    """
+    stale = await list_episodes_by_status("generating", limit=1000)
+    if stale:
+        await db.execute("UPDATE episodes SET status = 'interrupted' WHERE status = 'generating'")
+    return stale
+
+
 async def delete_episode(episode_id: str) -> bool:
     return await db.delete_row("episodes", "id", episode_id)
 
@@ -45,15 +80,48 @@ async def delete_episode(episode_id: str) -> bool:
 async def list_characters(episode_id: str | None = None) -> list[dict]:
     if episode_id:
         return await db.list_rows("character_references", where="episode_id = ?",
-                                  params=(episode_id,), order_by="created_at DESC")
-    return await db.list_rows("character_references", order_by="created_at DESC", limit=100)
+                                  params=(episode_id,), order_by="created_at DESC",
+                                  columns=CHARACTER_COLUMNS)
+    return await db.list_rows("character_references", order_by="created_at DESC", limit=100,
+                              columns=CHARACTER_COLUMNS)
+
+
+async def get_character(char_id: str) -> dict | None:
+    return await db.get_row("character_references", "id", char_id, columns=CHARACTER_COLUMNS)
 
 
 async def save_character(data: dict) -> None:
+    """Upsert a character. Raw ``reference_image``/``embedding`` bytes are
+    moved into the blob store and replaced by their hash + size."""
     now = int(time.time() * 1000)
     data.setdefault("created_at", now)
+    for col in ("reference_image", "embedding"):
+        raw = data.pop(col, None)
+        if raw:
+            digest, size = await blob_store.put_blob(bytes(raw))
+            data[f"{col}_hash"] = digest
+            data[f"{col}_size"] = size
+    old = await get_character(data["id"]) if "id" in data else None
     await db.upsert_row("character_references", data)
+    if old:
+        # The replaced row's blobs, unless still referenced
+        await blob_store.release_blobs(old["reference_image_hash"], old["embedding_hash"])
+
+
+async def get_character_blob(char_id: str, kind: str) -> bytes | None:
+    """Lazily load a character's ``reference_image`` or ``embedding`` bytes."""
+    if kind not in ("reference_image", "embedding"):
+        raise ValueError(f"Unknown character blob: {kind}")
+    row = await db.get_row("character_references", "id", char_id, columns=(f"{kind}_hash",))
+    if row is None:
+        return None
+    return await blob_store.get_blob(row[f"{kind}_hash"])
 
 
 async def delete_character(char_id: str) -> bool:
-    return await db.delete_row("character_references", "id", char_id)
+    """Delete a character and the blobs only it referenced."""
+    old = await get_character(char_id)
+    deleted = await db.delete_row("character_references", "id", char_id)
+    if old:
+        await blob_store.release_blobs(old["reference_image_hash"], old["embedding_hash"])
+    return deleted
@@ -18,15 +18,40 @@ def _format_time(seconds: float) -> str:
     return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
 
 
+def _line_times(count: int, length: float, measured: list[float | None] | None) -> list[float]:
+    """Per-line display times for a scene of *length* seconds.
+
+    Measured voice durations are used as they are (the lines play back to
+    back, a blank line takes 0); without them — or if any is missing — the
+    scene is split evenly.
+    """
+    if (measured and len(measured) == count and sum(d or 0 for d in measured) > 0
+            and all(d is not None and d >= 0 for d in measured)):
+        return [float(d) for d in measured]
+    return [length / max(count, 1)] * count
+
+
 def generate_ass(
     scenes: list[EpisodeScene],
     output_path: str,
     *,
+    scene_durations: list[float | None] | None = None,
+    line_durations: list[list[float | None] | None] | None = None,
+    overlap: float = 0.0,
     font_name: str = "Arial",
     font_size: int = 24,
     margin_v: int = 20,
 ) -> str:
-    """Generate an ASS subtitle file from episode scenes."""
+    """Generate an ASS subtitle file from episode scenes.
+
+    Events follow a cumulative timeline: each scene starts where the
+    previous one ends, less *overlap* (the concat transition). A scene
+    lasts ``scene_durations[i]`` (its measured clip length) when given,
+    else its ``duration_seconds``; a None duration drops the scene, as the
+    concat does with a scene that has no clip. ``line_durations[i]`` holds
+    the measured TTS length of each of the scene's lines; lines are clipped
+    to the end of their scene.
+    """
     header = f"""[Script Info]
 Title: OpenCLI Episode Subtitles
 ScriptType: v4.00+
@@ -42,21 +67,31 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 """
     events = []
     current_time = 0.0
+    first = True
 
-    for scene in scenes:
+    for i, scene in enumerate(scenes):
+        length = scene.duration_seconds
+        if scene_durations is not None:
+            length = scene_durations[i]
+            if length is None:
+                continue
+        start_time = current_time if first else max(0.0, current_time - overlap)
+        first = False
+        current_time = start_time + length
         if not scene.dialogue:
-            current_time += scene.duration_seconds
             continue
 
-        time_per_line = scene.duration_seconds / max(len(scene.dialogue), 1)
-
-        for line in scene.dialogue:
-            start = _format_time(current_time)
-            end = _format_time(current_time + time_per_line)
-            # Escape special chars for ASS
-            text = line.text.replace("\\", "\\\\").replace("\n", "\\N")
-            events.append(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{text}")
-            current_time += time_per_line
+        measured = line_durations[i] if line_durations else None
+        line_time = start_time
+        for line, seconds in zip(scene.dialogue, _line_times(len(scene.dialogue), length, measured)):
+            end_time = min(line_time + seconds, current_time)
+            if end_time > line_time:
+                start = _format_time(line_time)
+                end = _format_time(end_time)
+                # Escape special chars for ASS
+                text = line.text.replace("\\", "\\\\").replace("\n", "\\N")
+                events.append(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{text}")
+            line_time += seconds
 
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
@@ -3,13 +3,19 @@
 Ported from daemon/lib/pipeline/pipeline_definition.dart.
 """
 
+import hashlib
 import json
-import re
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any
 
 
+# Node type that fans a subgraph out over a list (see PipelineSubgraph)
+MAP_NODE_TYPE = "map"
+# Default cap on concurrent node executions inside one map node
+DEFAULT_MAP_PARALLELISM = 4
+
+
 @dataclass
 class PipelineNode:
     id: str
@@ -19,10 +25,15 @@ class PipelineNode:
     x: float = 0
     y: float = 0
     params: dict[str, Any] = field(default_factory=dict)
+    # Optional guard, e.g. "{{item.text}}" — the node is skipped when it resolves falsy
+    when: str = ""
+    # Template applied per item by 'map' nodes
+    subgraph: "PipelineSubgraph | None" = None
 
     @classmethod
     def from_json(cls, data: dict) -> "PipelineNode":
         pos = data.get("position", {})
+        sub = data.get("subgraph")
         return cls(
             id=data["id"],
             type=data["type"],
@@ -31,14 +42,21 @@ class PipelineNode:
             x=float(pos.get("x", 0)),
             y=float(pos.get("y", 0)),
             params=data.get("params", {}),
+            when=data.get("when", ""),
+            subgraph=PipelineSubgraph.from_json(sub) if sub else None,
         )
 
     def to_json(self) -> dict:
-        return {
+        data = {
             "id": self.id, "type": self.type, "domain": self.domain,
             "label": self.label, "position": {"x": self.x, "y": self.y},
             "params": self.params,
         }
+        if self.when:
+            data["when"] = self.when
+        if self.subgraph is not None:
+            data["subgraph"] = self.subgraph.to_json()
+        return data
 
 
 @dataclass
@@ -66,6 +84,34 @@ class PipelineEdge:
         }
 
 
+@dataclass
+class PipelineSubgraph:
+    """Nodes and edges a map node runs once per item.
+
+    The map node's params: ``items`` (a list, or a reference such as
+    ``{{params.scenes}}`` / ``{{node.items}}``), ``parallelism`` (max
+    concurrent node executions, default 4) and ``gather`` (the subgraph node
+    whose result is collected per item; defaults to the single sink).
+    Subgraph params reference the current item as ``{{item.field}}`` —
+    ``{{item.value}}`` for non-dict items, ``{{item.index}}`` for its
+    position — and may reference sibling subgraph nodes or upstream nodes
+    of the map node.
+    """
+    nodes: list[PipelineNode] = field(default_factory=list)
+    edges: list[PipelineEdge] = field(default_factory=list)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "PipelineSubgraph":
+        return cls(
+            nodes=[PipelineNode.from_json(n) for n in data.get("nodes", [])],
+            edges=[PipelineEdge.from_json(e) for e in data.get("edges", [])],
+        )
+
+    def to_json(self) -> dict:
+        return {"nodes": [n.to_json() for n in self.nodes],
+                "edges": [e.to_json() for e in self.edges]}
+
+
 @dataclass
 class PipelineParam:
     name: str
@@ -128,6 +174,12 @@ class PipelineDefinition:
             "updated_at": self.updated_at.isoformat(),
         }
 
+    @property
+    def version(self) -> str:
+        """Content hash of the nodes, their params and the edges."""
+        raw = json.dumps(_structure(self.nodes, self.edges), sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
     def to_summary(self) -> dict:
         return {
             "id": self.id, "name": self.name, "description": self.description,
@@ -137,36 +189,11 @@ class PipelineDefinition:
         }
 
 
-def resolve_variables(value: str, node_results: dict[str, dict], params: dict[str, Any]) -> Any:
-    """Resolve {{nodeId.field}} and {{params.name}} references in a string."""
-    if not isinstance(value, str):
-        return value
-
-    def _replace(m: re.Match) -> str:
-        ref = m.group(1)
-        if ref.startswith("params."):
-            param_name = ref[7:]
-            return str(params.get(param_name, m.group(0)))
-        parts = ref.split(".", 1)
-        if len(parts) == 2:
-            node_id, field_name = parts
-            result = node_results.get(node_id, {})
-            return str(result.get(field_name, m.group(0)))
-        return m.group(0)
-
-    resolved = re.sub(r"\{\{(.+?)\}\}", _replace, value)
-
-    # If the entire string was a single variable, try to preserve its type
-    single_match = re.fullmatch(r"\{\{(.+?)\}\}", value)
-    if single_match:
-        ref = single_match.group(1)
-        if ref.startswith("params."):
-            return params.get(ref[7:], value)
-        parts = ref.split(".", 1)
-        if len(parts) == 2:
-            node_id, field_name = parts
-            result = node_results.get(node_id, {})
-            if field_name in result:
-                return result[field_name]
-
-    return resolved
+def _structure(nodes: list[PipelineNode], edges: list[PipelineEdge]) -> list:
+    """What execution depends on — layout fields (labels, positions) excluded."""
+    return (
+        [[n.id, n.type, n.params, n.when,
+          _structure(n.subgraph.nodes, n.subgraph.edges) if n.subgraph else None]
+         for n in nodes]
+        + [[e.source_node, e.target_node] for e in edges]
+    )
@@ -1,6 +1,9 @@
 """Pipeline executor — Kahn's algorithm with parallel node execution.
 
-Ported from daemon/lib/pipeline/pipeline_executor.dart.
+Ported from daemon/lib/pipeline/pipeline_executor.dart. Nodes start as
+soon as their inputs are done; when slots are contended (see
+scheduling.py) the node with the longest estimated critical path runs
+first.
 """
 
 import asyncio
@@ -8,10 +11,14 @@ import os
 import time
 from enum import Enum
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Awaitable, Callable
 
-from .definition import PipelineDefinition, resolve_variables
+from .definition import DEFAULT_MAP_PARALLELISM, MAP_NODE_TYPE, PipelineDefinition, PipelineNode
+from . import run_store, scheduling, worker_pool
+from .graph import CompiledPipeline, get_compiled
 from opencli_daemon.api.storage_api import register_media_asset
+from opencli_daemon.utils import ffmpeg_scheduler, tracing
+from opencli_daemon.utils.cancellation import CancelToken, OperationCancelled, use_token
 
 
 _OPENCLI_DIR = str(Path.home() / ".opencli")
@@ -41,16 +48,145 @@ def _path_to_url(path: str) -> str | None:
     return f"http://localhost:9529/api/v1/files/{relative}"
 
 
+def _light_result(result: dict[str, Any]) -> dict[str, Any]:
+    """Progress-event copy of *result*: no base64, plus a file_url if possible."""
+    light = _strip_base64(result)
+    for key in ("path", "file_path", "output_path"):
+        if key in light and isinstance(light[key], str):
+            url = _path_to_url(light[key])
+            if url:
+                light["file_url"] = url
+                break
+    return light
+
+
+async def _register_output(pipeline: PipelineDefinition, node_id: str, task_type: str,
+                           result: dict[str, Any]) -> None:
+    """Register a media node's output file as an asset."""
+    if task_type not in _MEDIA_TASK_TYPES:
+        return
+    for key in ("path", "file_path", "output_path"):
+        fpath = result.get(key, "")
+        if fpath and Path(fpath).is_file():
+            try:
+                with tracing.span("register_asset", node_id=node_id):
+                    await register_media_asset(
+                        fpath, f"Pipeline: {pipeline.name} / {node_id}",
+                        provider="pipeline",
+                    )
+            except Exception:
+                pass
+            break
+
+
 class NodeStatus(Enum):
     PENDING = "pending"
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
     SKIPPED = "skipped"
+    CANCELLED = "cancelled"
 
 
 ProgressCallback = Callable[[dict[str, Any]], None]
 
+# (key, task_type, status, result, started_at, finished_at, params_hash, work_units)
+# — map items
+ItemRecorder = Callable[[str, str, NodeStatus, dict, int, int, str | None, float | None],
+                        Awaitable[None]]
+
+# Same-type nodes that become ready within this window share one execute_batch
+BATCH_WINDOW_S = 0.02
+MAX_BATCH_SIZE = 8
+
+
+class _NodeRunner:
+    """Registry wrapper that schedules and coalesces node executions.
+
+    Every execution holds a scheduling slot (scheduling.node_slot) taken in
+    priority order: the node's estimated duration plus its downstream
+    critical path (*tail_ms*).
+
+    When a worker pool is running (worker_pool.py), single executions go
+    to the worker processes; the pool queue uses the same priorities.
+    Tasks no worker can take run in-process.
+
+    Calls for task types the registry can batch (supports_batch) are held
+    for BATCH_WINDOW_S — or until MAX_BATCH_SIZE have queued — then sent as
+    one execute_batch, under one slot at the group's highest priority, and
+    the results split back to the callers. Everything else goes straight
+    to execute_task. *on_start* fires once the slot is held, so run
+    history times the execution rather than the wait.
+    """
+
+    def __init__(self, registry: Any, model: scheduling.DurationModel) -> None:
+        self._registry = registry
+        self.model = model
+        self._can_batch = hasattr(registry, "supports_batch") and hasattr(registry, "execute_batch")
+        self._pending: dict[str, list[tuple[dict, float, Callable | None, asyncio.Future]]] = {}
+
+    async def execute_task(self, task_type: str, params: dict[str, Any], tail_ms: float = 0.0,
+                           on_start: Callable[[], None] | None = None) -> dict[str, Any]:
+        priority = tail_ms + self.model.estimate(task_type, params)
+        queued_ns = time.time_ns()
+        if not (self._can_batch and self._registry.supports_batch(task_type)):
+            async with scheduling.node_slot(task_type, priority):
+                tracing.add_span("queue", queued_ns, time.time_ns(), priority_ms=round(priority))
+                if on_start:
+                    on_start()
+                return await self._execute_one(task_type, params, priority)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        group = self._pending.setdefault(task_type, [])
+        group.append((params, priority, on_start, future))
+        if len(group) == 1:
+            loop.call_later(BATCH_WINDOW_S, self._flush, task_type, group)
+        if len(group) >= MAX_BATCH_SIZE:
+            self._flush(task_type, group)
+        return await future
+
+    async def _execute_one(self, task_type: str, params: dict[str, Any],
+                           priority: float) -> dict[str, Any]:
+        pool = worker_pool.get_pool()
+        if pool is not None and pool.accepts(task_type):
+            try:
+                return await pool.execute(task_type, params, priority)
+            except worker_pool.WorkerUnavailable:
+                pass
+        return await self._registry.execute_task(task_type, params)
+
+    def _flush(self, task_type: str, group: list) -> None:
+        if self._pending.get(task_type) is not group:
+            return  # already sent
+        del self._pending[task_type]
+        # The task inherits the caller's context, so the cancel token stays bound
+        asyncio.create_task(self._dispatch(task_type, group))
+
+    async def _dispatch(self, task_type: str, group: list) -> None:
+        items = [params for params, _, _, _ in group]
+        queued_ns = time.time_ns()
+        try:
+            async with scheduling.node_slot(task_type, max(p for _, p, _, _ in group)):
+                tracing.add_span("queue", queued_ns, time.time_ns())
+                for _, _, on_start, _ in group:
+                    if on_start:
+                        on_start()
+                if len(items) == 1:
+                    results = [await self._registry.execute_task(task_type, items[0])]
+                else:
+                    results = await self._registry.execute_batch(task_type, items)
+            if len(results) != len(items):
+                raise RuntimeError(f"execute_batch returned {len(results)} results "
+                                   f"for {len(items)} {task_type} tasks")
+        except BaseException as e:
+            for _, _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, _, future), result in zip(group, results):
+            if not future.done():
+                future.set_result(result)
+
 
 async def execute_pipeline(
     pipeline: PipelineDefinition,
@@ -60,35 +196,98 @@ async def execute_pipeline(
     start_from_node: str | None = None,
     previous_results: dict[str, Any] | None = None,
     cancelled: Callable[[], bool] | None = None,
+    record_run: bool = True,
+    run_id: str | None = None,
+    parent_run_id: str | None = None,
+    resume_results: dict[str, Any] | None = None,
+    cancel_token: CancelToken | None = None,
 ) -> dict[str, Any]:
     """Execute a pipeline DAG with topological ordering and parallel execution.
 
     If start_from_node is provided, skips all upstream nodes and injects
     previous_results as if those nodes had already completed.
+
+    With record_run (the default) the run and every node outcome are
+    persisted to pipeline_runs / pipeline_node_runs; the returned dict then
+    carries the run_id.
+
+    resume_results ({node_id: result}) marks those nodes as already completed
+    — used to resume an interrupted run without redoing finished work.
+
+    cancel_token is bound while each node runs, so cancelling it kills the
+    node's subprocesses / polls mid-flight. The older ``cancelled`` callable
+    is still honoured (polled into a token).
+
+    Ready nodes whose task type the registry can batch are coalesced into
+    execute_batch calls, and contended slots go to the nodes on the longest
+    estimated critical path (see _NodeRunner).
+
+    Every run is traced (utils/tracing.py); recorded runs keep the trace
+    under their run_id for GET /pipelines/runs/{run_id}/trace.
     """
+    if record_run and not run_id:
+        run_id = run_store.new_run_id()
+    trace_id = run_id or run_store.new_run_id()
+    # Pipeline encodes queue behind interactive FFmpeg work
+    with tracing.start_trace(trace_id, f"pipeline {pipeline.name}", pipeline_id=pipeline.id,
+                             nodes=len(pipeline.nodes)) as trace, \
+            ffmpeg_scheduler.use_priority(ffmpeg_scheduler.BATCH):
+        result = await _run_pipeline(
+            pipeline, domain_registry, override_params, on_progress, start_from_node,
+            previous_results, cancelled, record_run, run_id, parent_run_id,
+            resume_results, cancel_token,
+        )
+    if record_run:
+        try:
+            await asyncio.to_thread(tracing.save_trace, trace)
+        except OSError as e:
+            print(f"[Pipeline] Could not save trace for {run_id}: {e}")
+    return result
+
+
+async def _run_pipeline(
+    pipeline: PipelineDefinition,
+    domain_registry: Any,
+    override_params: dict[str, Any] | None = None,
+    on_progress: ProgressCallback | None = None,
+    start_from_node: str | None = None,
+    previous_results: dict[str, Any] | None = None,
+    cancelled: Callable[[], bool] | None = None,
+    record_run: bool = True,
+    run_id: str | None = None,
+    parent_run_id: str | None = None,
+    resume_results: dict[str, Any] | None = None,
+    cancel_token: CancelToken | None = None,
+) -> dict[str, Any]:
     start_time = time.time()
     params = {p.name: p.default for p in pipeline.parameters}
     if override_params:
         params.update(override_params)
 
+    recorder: run_store.RunRecorder | None = None
+    if record_run:
+        recorder = await run_store.RunRecorder.start(
+            pipeline.id, params, start_from_node=start_from_node,
+            parent_run_id=parent_run_id, run_id=run_id,
+        )
+
     node_results: dict[str, dict] = {}
     node_statuses: dict[str, NodeStatus] = {n.id: NodeStatus.PENDING for n in pipeline.nodes}
     node_map = {n.id: n for n in pipeline.nodes}
 
-    # Build adjacency for Kahn's algorithm
-    in_degree: dict[str, int] = {n.id: 0 for n in pipeline.nodes}
-    dependents: dict[str, list[str]] = {n.id: [] for n in pipeline.nodes}
-
-    for edge in pipeline.edges:
-        in_degree[edge.target_node] = in_degree.get(edge.target_node, 0) + 1
-        dependents.setdefault(edge.source_node, []).append(edge.target_node)
+    # Adjacency, topo order and param templates are compiled once per definition
+    with tracing.span("compile"):
+        compiled = get_compiled(pipeline)
+    graph = compiled.graph
+    in_degree = dict(graph.in_degree)
+    dependents = graph.children
 
     # If start_from_node, find upstream nodes to skip
     skip_nodes: set[str] = set()
     if start_from_node:
         # Find all nodes that are upstream of start_from_node
         # (all ancestors in the DAG)
-        skip_nodes = _find_upstream_nodes(start_from_node, pipeline.edges)
+        skip_nodes = set(graph.ancestors(start_from_node))
         # Inject previous results for skipped nodes
         if previous_results:
             for nid, result in previous_results.items():
@@ -101,107 +300,160 @@ async def execute_pipeline(
                 node_statuses[nid] = NodeStatus.SKIPPED
                 node_results[nid] = {"success": True, "skipped": True}
 
-    # Cycle detection
-    visited: set[str] = set()
-    temp: set[str] = set()
-    for n in pipeline.nodes:
-        if _has_cycle(n.id, dependents, visited, temp):
-            return {"success": False, "error": "Pipeline contains a cycle"}
-
-    # BFS execution (Kahn's algorithm)
-    queue = [n.id for n in pipeline.nodes if in_degree[n.id] == 0]
+    # Resume: nodes with checkpointed results are treated as done
+    if resume_results:
+        for nid, result in resume_results.items():
+            if nid in node_map:
+                node_results[nid] = result
+                node_statuses[nid] = NodeStatus.COMPLETED
+                skip_nodes.add(nid)
+                if recorder:
+                    recorder.add_node(nid, node_map[nid].type, "completed", result)
+
+    if compiled.has_cycle:
+        if recorder:
+            await recorder.finish("failed", 0, "Pipeline contains a cycle")
+        return {"success": False, "error": "Pipeline contains a cycle"}
+
+    # References must follow the edges
+    if compiled.reference_errors:
+        error = "Invalid variable references: " + "; ".join(compiled.reference_errors)
+        if recorder:
+            await recorder.finish("failed", 0, error)
+        return {"success": False, "error": error,
+                "reference_errors": compiled.reference_errors}
+
+    token = cancel_token or CancelToken()
+    with tracing.span("schedule"):
+        model = await scheduling.get_duration_model()
+        runner = _NodeRunner(domain_registry, model)
+        tails, estimates = scheduling.critical_path_tails(compiled, node_map, model,
+                                                          node_results, params)
+    watcher = None
+    if cancelled is not None and cancelled is not cancel_token:
+        watcher = asyncio.create_task(_watch_cancelled(cancelled, token))
+
+    # Event-driven Kahn's algorithm: a node starts once its last input is done
+    ready = [n.id for n in pipeline.nodes if in_degree[n.id] == 0]
+    running: dict[asyncio.Task, str] = {}
     completed_count = 0
     # Count only nodes we'll actually execute
     total = len([n for n in pipeline.nodes if n.id not in skip_nodes])
 
-    while queue:
-        current_level = list(queue)
-        queue.clear()
-
-        # Separate nodes to execute vs skip
-        to_execute = [nid for nid in current_level if nid not in skip_nodes]
-        to_skip = [nid for nid in current_level if nid in skip_nodes]
-
-        # Mark skipped nodes' dependents as ready
-        for nid in to_skip:
-            for dep_id in dependents.get(nid, []):
-                in_degree[dep_id] -= 1
-                if in_degree[dep_id] <= 0:
-                    queue.append(dep_id)
-
-        if not to_execute:
-            continue
-
-        # Check cancellation before executing this level
-        if cancelled and cancelled():
-            for nid in to_execute:
-                node_statuses[nid] = NodeStatus.SKIPPED
-                node_results[nid] = {"success": False, "cancelled": True}
-            break
-
-        # Execute all non-skipped nodes in current level in parallel
-        tasks = []
-        for nid in to_execute:
-            tasks.append(_execute_node(
-                nid, node_map, domain_registry, node_results, node_statuses, params
-            ))
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Process results and enqueue dependents
-        for i, nid in enumerate(to_execute):
-            if isinstance(results[i], Exception):
-                node_statuses[nid] = NodeStatus.FAILED
-                node_results[nid] = {"success": False, "error": str(results[i])}
-            completed_count += 1
-
-            if on_progress:
-                # Build lightweight result (strip base64 to avoid huge WS messages)
-                light_result = _strip_base64(node_results.get(nid, {}))
-                # Convert local file paths to serveable URLs
-                for key in ("path", "file_path", "output_path"):
-                    if key in light_result and isinstance(light_result[key], str):
-                        url = _path_to_url(light_result[key])
-                        if url:
-                            light_result["file_url"] = url
-                            break
-
+    async def _record_item(key: str, task_type: str, status: NodeStatus, result: dict,
+                           started_at: int, finished_at: int, p_hash: str | None,
+                           units: float | None) -> None:
+        # Map items are recorded as "<map_id>[<i>].<node_id>"
+        if recorder:
+            recorder.add_node(key, task_type, status.value, result, started_at=started_at,
+                              finished_at=finished_at, resolved_params_hash=p_hash,
+                              work_units=units)
+        if status == NodeStatus.COMPLETED:
+            await _register_output(pipeline, key, task_type, result)
+        if on_progress:
+            with tracing.span("progress", node_id=key):
                 await on_progress({
                     "pipeline_id": pipeline.id,
-                    "node_id": nid,
-                    "node_status": node_statuses[nid].value,
+                    "node_id": key,
+                    "node_status": status.value,
                     "progress": int(completed_count / total * 100),
-                    "node_result": light_result,
-                    "all_statuses": {k: v.value for k, v in node_statuses.items()},
+                    "node_result": _light_result(result),
                 })
 
-            # Register media outputs as assets
-            node = node_map[nid]
-            if node.type in _MEDIA_TASK_TYPES and node_statuses[nid] == NodeStatus.COMPLETED:
-                res = node_results.get(nid, {})
-                for key in ("path", "file_path", "output_path"):
-                    fpath = res.get(key, "")
-                    if fpath and Path(fpath).is_file():
-                        try:
-                            await register_media_asset(
-                                fpath, f"Pipeline: {pipeline.name} / {nid}",
-                                provider="pipeline",
-                            )
-                        except Exception:
-                            pass
-                        break
+    async def _run_and_record(nid: str) -> None:
+        with tracing.span(f"node {nid}", new_track=True, node_id=nid,
+                          task_type=node_map[nid].type) as node_span:
+            started_at, finished_at, p_hash, units = await _execute_node(
+                nid, node_map, compiled, runner, node_results, node_statuses,
+                params, token, _record_item, resume_results, tail_ms=tails[nid],
+            )
+            if node_span:
+                node_span.set(status=node_statuses[nid].value)
+        if recorder:
+            recorder.add_node(
+                nid, node_map[nid].type, node_statuses[nid].value, node_results[nid],
+                started_at=started_at, finished_at=finished_at, resolved_params_hash=p_hash,
+                work_units=units,
+            )
+            # Checkpoint expensive outputs now rather than with the next batch
+            if finished_at - started_at >= run_store.CHECKPOINT_MIN_MS:
+                await recorder.flush()
+
+    def _release_dependents(nid: str) -> None:
+        # Dependents whose in-degree drops to 0 become ready
+        for dep_id in dependents.get(nid, []):
+            in_degree[dep_id] -= 1
+            if in_degree[dep_id] > 0:
+                continue
+            # Skip if any dependency failed
+            if any(node_statuses.get(s) == NodeStatus.FAILED for s in graph.parents[dep_id]):
+                node_statuses[dep_id] = NodeStatus.SKIPPED
+                node_results[dep_id] = {"success": False, "skipped": True}
+                if recorder:
+                    recorder.add_node(dep_id, node_map[dep_id].type, "skipped",
+                                      node_results[dep_id])
+            else:
+                ready.append(dep_id)
 
-            # Enqueue dependents whose in-degree drops to 0
-            for dep_id in dependents.get(nid, []):
-                in_degree[dep_id] -= 1
-                if in_degree[dep_id] <= 0:
-                    # Skip if any dependency failed
-                    dep_sources = [e.source_node for e in pipeline.edges if e.target_node == dep_id]
-                    if any(node_statuses.get(s) == NodeStatus.FAILED for s in dep_sources):
-                        node_statuses[dep_id] = NodeStatus.SKIPPED
-                        node_results[dep_id] = {"success": False, "skipped": True}
+    try:
+        while ready or running:
+            # Longest remaining path first, so it also reaches the slots first
+            while ready:
+                batch = sorted(ready, key=lambda n: tails[n] + estimates[n], reverse=True)
+                ready.clear()
+                for nid in batch:
+                    if nid in skip_nodes:
+                        _release_dependents(nid)
+                    elif token.cancelled:
+                        node_statuses[nid] = NodeStatus.SKIPPED
+                        node_results[nid] = {"success": False, "cancelled": True}
+                        if recorder:
+                            recorder.add_node(nid, node_map[nid].type, "cancelled",
+                                              node_results[nid])
                     else:
-                        queue.append(dep_id)
+                        running[asyncio.create_task(_run_and_record(nid))] = nid
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                nid = running.pop(task)
+                error = task.exception()
+                if error is not None:
+                    node_statuses[nid] = NodeStatus.FAILED
+                    node_results[nid] = {"success": False, "error": str(error)}
+                    if recorder:
+                        recorder.add_node(nid, node_map[nid].type, "failed", node_results[nid])
+                completed_count += 1
+
+                if on_progress:
+                    # Lightweight result (no base64) to avoid huge WS messages
+                    with tracing.span("progress", node_id=nid):
+                        await on_progress({
+                            "pipeline_id": pipeline.id,
+                            "node_id": nid,
+                            "node_status": node_statuses[nid].value,
+                            "progress": int(completed_count / total * 100),
+                            "node_result": _light_result(node_results.get(nid, {})),
+                            "all_statuses": {k: v.value for k, v in node_statuses.items()},
+                        })
+
+                # Register media outputs as assets
+                if node_statuses[nid] == NodeStatus.COMPLETED:
+                    await _register_output(pipeline, nid, node_map[nid].type,
+                                           node_results.get(nid, {}))
+                _release_dependents(nid)
+
+            # One batched write per round of completions
+            if recorder:
+                await recorder.flush()
+    finally:
+        # Only reached with nodes still running if we were cancelled ourselves
+        for task in running:
+            task.cancel()
+
+    if watcher:
+        watcher.cancel()
 
     elapsed = time.time() - start_time
     failed = [nid for nid, s in node_statuses.items() if s == NodeStatus.FAILED]
@@ -217,76 +469,219 @@ async def execute_pipeline(
                         res["file_url"] = url
                         break
 
+    duration_ms = int(elapsed * 1000)
+    cancelled_run = any(r.get("cancelled") for r in node_results.values())
+    if recorder:
+        status = "failed" if failed else ("cancelled" if cancelled_run else "completed")
+        error = node_results[failed[0]].get("error") if failed else None
+        await recorder.finish(status, duration_ms, error if isinstance(error, str) else None)
+
     return {
-        "success": len(failed) == 0,
+        "success": len(failed) == 0 and not cancelled_run,
+        "cancelled": cancelled_run,
         "pipeline_id": pipeline.id,
+        "run_id": recorder.run_id if recorder else None,
         "node_results": node_results,
         "node_statuses": {k: v.value for k, v in node_statuses.items()},
         "failed_nodes": failed,
         "skipped_nodes": skipped,
-        "duration_ms": int(elapsed * 1000),
+        "duration_ms": duration_ms,
     }
 
 
 async def _execute_node(
     node_id: str,
     node_map: dict,
-    registry: Any,
+    compiled: CompiledPipeline,
+    runner: _NodeRunner,
     node_results: dict,
     node_statuses: dict,
     params: dict,
-) -> None:
-    """Execute a single pipeline node."""
+    token: CancelToken,
+    record: ItemRecorder | None = None,
+    prior: dict[str, Any] | None = None,
+    tail_ms: float = 0.0,
+) -> tuple[int, int, str | None, float | None]:
+    """Execute a single pipeline node.
+
+    Returns (started_at_ms, finished_at_ms, resolved_params_hash, work_units)
+    for run history. *record* and *prior* are only used by map nodes, for
+    their per-item runs. *tail_ms* is the node's estimated downstream
+    critical path, its scheduling priority.
+    """
     node = node_map[node_id]
-    node_statuses[node_id] = NodeStatus.RUNNING
+    template = compiled.templates[node_id]
+    if not template.should_run(node_results, params):
+        # Guard resolved falsy — skipped, but dependents still run
+        now = int(time.time() * 1000)
+        node_results[node_id] = {"success": True, "skipped": True}
+        node_statuses[node_id] = NodeStatus.SKIPPED
+        return now, now, None, None
 
-    # Resolve variable references in params (recursive for lists/dicts)
-    def _resolve(val: Any) -> Any:
-        if isinstance(val, str):
-            return resolve_variables(val, node_results, params)
-        if isinstance(val, list):
-            return [_resolve(item) for item in val]
-        if isinstance(val, dict):
-            return {k2: _resolve(v2) for k2, v2 in val.items()}
-        return val
+    node_statuses[node_id] = NodeStatus.RUNNING
+    with tracing.span("resolve"):
+        resolved_params = template.fill(node_results, params)
+        p_hash = run_store.params_hash(resolved_params)
+    units = None if node.type == MAP_NODE_TYPE else scheduling.work_units(node.type, resolved_params)
+    started_at = int(time.time() * 1000)
 
-    resolved_params = {k: _resolve(v) for k, v in node.params.items()}
+    def _started() -> None:
+        nonlocal started_at
+        started_at = int(time.time() * 1000)
 
     try:
-        result = await registry.execute_task(node.type, resolved_params)
+        # Bound via contextvar (not a kwarg) so any registry-like object works
+        with use_token(token):
+            if node.type == MAP_NODE_TYPE:
+                result = await _execute_map(
+                    node, resolved_params, compiled.subgraphs[node_id], runner,
+                    node_results, params, token, record, prior or {}, tail_ms,
+                )
+            else:
+                result = await runner.execute_task(node.type, resolved_params, tail_ms, _started)
         node_results[node_id] = result
         node_statuses[node_id] = NodeStatus.COMPLETED if result.get("success") else NodeStatus.FAILED
+    except OperationCancelled:
+        pass
     except Exception as e:
         node_results[node_id] = {"success": False, "error": str(e)}
         node_statuses[node_id] = NodeStatus.FAILED
-
-
-def _find_upstream_nodes(target_node: str, edges: list) -> set[str]:
-    """Find all nodes that are upstream of target_node (its ancestors)."""
-    # Build reverse adjacency: for each node, what nodes feed into it
-    parents: dict[str, list[str]] = {}
-    for edge in edges:
-        parents.setdefault(edge.target_node, []).append(edge.source_node)
-
-    upstream: set[str] = set()
-    queue = list(parents.get(target_node, []))
-    while queue:
-        nid = queue.pop()
-        if nid not in upstream:
-            upstream.add(nid)
-            queue.extend(parents.get(nid, []))
-    return upstream
-
-
-def _has_cycle(node_id: str, dependents: dict, visited: set, temp: set) -> bool:
-    if node_id in temp:
-        return True
-    if node_id in visited:
-        return False
-    temp.add(node_id)
-    for dep in dependents.get(node_id, []):
-        if _has_cycle(dep, dependents, visited, temp):
-            return True
-    temp.discard(node_id)
-    visited.add(node_id)
-    return False
+    if token.cancelled and node_statuses[node_id] != NodeStatus.COMPLETED:
+        # Aborted mid-flight (domains may report it as a plain failure)
+        node_results[node_id] = {"success": False, "cancelled": True}
+        node_statuses[node_id] = NodeStatus.CANCELLED
+    return started_at, int(time.time() * 1000), p_hash, units
+
+
+async def _execute_map(
+    node: PipelineNode,
+    resolved: dict[str, Any],
+    sub: CompiledPipeline,
+    runner: _NodeRunner,
+    outer_results: dict,
+    params: dict,
+    token: CancelToken,
+    record: ItemRecorder | None,
+    prior: dict[str, Any],
+    tail_ms: float = 0.0,
+) -> dict[str, Any]:
+    """Run a map node's subgraph once per item and gather the results.
+
+    Items advance level by level in lockstep — every item's first-level
+    nodes run (bounded by ``parallelism``) before any second-level node — so
+    same-type work across items is in flight together; within a level the
+    ``parallelism`` slots go to the longest remaining item paths first.
+    Each item sees its own subgraph results, ``item`` and the map node's
+    upstream results.
+    *prior* holds results of an earlier run keyed "<map_id>[<i>].<node_id>";
+    those item nodes are not run again.
+    """
+    items = resolved.get("items")
+    if not isinstance(items, list):
+        return {"success": False,
+                "error": f"Map node '{node.id}': items must be a list, got {type(items).__name__}"}
+    graph = sub.graph
+    gather = resolved.get("gather") or (
+        graph.sinks[0] if len(graph.sinks) == 1 else graph.topo_order[-1])
+    if gather not in graph.children:
+        return {"success": False, "error": f"Map node '{node.id}': unknown gather node '{gather}'"}
+    sub_map = {n.id: n for n in node.subgraph.nodes}
+    limit = scheduling.PrioritySlots(
+        max(1, int(resolved.get("parallelism") or DEFAULT_MAP_PARALLELISM)))
+
+    # Earlier results, split per item (nested maps keep the rest of the key)
+    item_prior: dict[int, dict[str, Any]] = {}
+    head = f"{node.id}["
+    for key, value in prior.items():
+        if key.startswith(head):
+            idx, _, rest = key[len(head):].partition("].")
+            if idx.isdigit() and rest:
+                item_prior.setdefault(int(idx), {})[rest] = value
+
+    scopes = [scheduling.item_scope(item, i, outer_results) for i, item in enumerate(items)]
+    statuses = [{sid: NodeStatus.PENDING for sid in graph.node_ids} for _ in items]
+    # Downstream path of each item node: within the item, then after the map
+    paths = [scheduling.critical_path_tails(sub, sub_map, runner.model, scope, params)
+             for scope in scopes]
+
+    def _item_record(i: int) -> ItemRecorder | None:
+        if record is None:
+            return None
+
+        async def _record(key, task_type, status, result, started_at, finished_at, p_hash,
+                          units):
+            await record(f"{node.id}[{i}].{key}", task_type, status, result,
+                         started_at, finished_at, p_hash, units)
+        return _record
+
+    def _ok(i: int, sid: str) -> bool:
+        status = statuses[i].get(sid)
+        if status == NodeStatus.SKIPPED:
+            return bool(scopes[i].maps[0][sid].get("success"))
+        return status == NodeStatus.COMPLETED
+
+    async def _run(i: int, sid: str) -> None:
+        tails, estimates = paths[i]
+        tail = tail_ms + tails[sid]
+        key = f"{node.id}[{i}].{sid}"
+        async with limit.acquire(tail + estimates[sid]):
+            if token.cancelled:
+                return
+            with tracing.span(f"node {key}", new_track=True, node_id=key,
+                              task_type=sub_map[sid].type) as node_span:
+                started_at, finished_at, p_hash, units = await _execute_node(
+                    sid, sub_map, sub, runner, scopes[i], statuses[i], params, token,
+                    _item_record(i), item_prior.get(i), tail_ms=tail,
+                )
+                if node_span:
+                    node_span.set(status=statuses[i][sid].value)
+        if record:
+            await record(key, sub_map[sid].type, statuses[i][sid],
+                         scopes[i].maps[0][sid], started_at, finished_at, p_hash, units)
+
+    for level in graph.levels:
+        if token.cancelled:
+            break
+        runs = []
+        for sid in level:
+            for i in range(len(items)):
+                local = scopes[i].maps[0]
+                if not all(_ok(i, p) for p in graph.parents[sid]):
+                    local[sid] = {"success": False, "skipped": True}
+                    statuses[i][sid] = NodeStatus.SKIPPED
+                elif sid in item_prior.get(i, {}):
+                    local[sid] = item_prior[i][sid]
+                    statuses[i][sid] = NodeStatus.COMPLETED
+                else:
+                    runs.append(_run(i, sid))
+        await asyncio.gather(*runs, return_exceptions=True)
+
+    token.raise_if_cancelled()
+    results, failed = [], []
+    for i in range(len(items)):
+        if not all(_ok(i, sid) for sid in graph.node_ids):
+            failed.append(i)
+        results.append(_strip_base64(scopes[i].maps[0].get(gather, {})))
+
+    out: dict[str, Any] = {
+        "success": not failed,
+        "count": len(items),
+        "results": results,
+        "paths": [r.get("path") for r in results],
+        "failed_items": failed,
+    }
+    if failed:
+        local = scopes[failed[0]].maps[0]
+        first = next((local[sid]["error"] for sid in graph.topo_order
+                      if local.get(sid, {}).get("error")), None)
+        out["error"] = f"{len(failed)} of {len(items)} items failed" + (f": {first}" if first else "")
+    return out
+
+
+async def _watch_cancelled(cancelled: Callable[[], bool], token: CancelToken) -> None:
+    """Bridge a legacy ``cancelled()`` poll function onto a CancelToken."""
+    while not token.cancelled:
+        if cancelled():
+            token.cancel()
+            return
+        await asyncio.sleep(0.5)
@@ -0,0 +1,155 @@
+"""Compiled pipeline graph.
+
+PipelineGraph indexes a definition's edges once: forward and reverse
+adjacency, in-degrees, a topological order (iterative Kahn, which doubles
+as cycle detection without recursion limits) and memoized ancestor sets.
+get_compiled() bundles it with the node param templates and caches the
+result by pipeline id and version, so repeated runs of a definition —
+generated episode graphs reach hundreds of nodes — skip the work.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+
+from .definition import MAP_NODE_TYPE, PipelineDefinition
+from .template import ParamTemplate, compile_pipeline
+
+# Compiled definitions kept in memory (oldest evicted first)
+MAX_COMPILED = 64
+
+
+class PipelineGraph:
+    """Adjacency indexes and orderings for one pipeline definition."""
+
+    def __init__(self, pipeline: PipelineDefinition) -> None:
+        self.node_ids = [n.id for n in pipeline.nodes]
+        self.children: dict[str, list[str]] = {nid: [] for nid in self.node_ids}
+        self.parents: dict[str, list[str]] = {nid: [] for nid in self.node_ids}
+        # Duplicate edges are kept: each one counts towards the in-degree
+        for edge in pipeline.edges:
+            self.children.setdefault(edge.source_node, []).append(edge.target_node)
+            self.parents.setdefault(edge.target_node, []).append(edge.source_node)
+            self.children.setdefault(edge.target_node, [])
+            self.parents.setdefault(edge.source_node, [])
+        self.in_degree = {nid: len(ps) for nid, ps in self.parents.items()}
+        self.sources = [nid for nid in self.node_ids if self.in_degree[nid] == 0]
+
+        # Kahn's algorithm; anything left unvisited sits on a cycle
+        remaining = dict(self.in_degree)
+        ready = deque(nid for nid, d in remaining.items() if d == 0)
+        order: list[str] = []
+        depth = {nid: 0 for nid in ready}
+        while ready:
+            nid = ready.popleft()
+            order.append(nid)
+            for child in self.children[nid]:
+                depth[child] = max(depth.get(child, 0), depth[nid] + 1)
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+        self.has_cycle = len(order) < len(remaining)
+        self.topo_order = order
+        # Nodes grouped by longest distance from a source
+        self.levels: list[list[str]] = []
+        for nid in order:
+            if depth[nid] == len(self.levels):
+                self.levels.append([])
+            self.levels[depth[nid]].append(nid)
+        self.sinks = [nid for nid in self.node_ids if not self.children[nid]]
+        self._ancestors: dict[str, frozenset[str]] = {}
+
+    def ancestors(self, node_id: str) -> frozenset[str]:
+        """All nodes upstream of *node_id* (memoized)."""
+        cached = self._ancestors.get(node_id)
+        if cached is not None:
+            return cached
+        upstream: set[str] = set()
+        stack = list(self.parents.get(node_id, []))
+        while stack:
+            nid = stack.pop()
+            if nid in upstream:
+                continue
+            upstream.add(nid)
+            known = self._ancestors.get(nid)
+            if known is not None:
+                upstream.update(known)
+            else:
+                stack.extend(self.parents.get(nid, []))
+        result = frozenset(upstream)
+        self._ancestors[node_id] = result
+        return result
+
+    def reference_errors(
+        self,
+        templates: dict[str, ParamTemplate],
+        external: frozenset[str] = frozenset(),
+    ) -> list[str]:
+        """One error per ``{{node.field}}`` reference not backed by an edge path.
+
+        A referenced node must be an ancestor, otherwise it may not have run
+        (or may run concurrently) when the referencing node executes.
+        *external* names results that are always available (a map subgraph's
+        ``item`` and the map node's own upstream nodes).
+        """
+        known = set(self.node_ids)
+        errors = []
+        for nid, template in templates.items():
+            if not template.deps:
+                continue
+            parents = self.parents.get(nid, [])
+            for dep in sorted(template.deps):
+                if dep in parents or (dep in external and dep not in known):
+                    continue  # the common case; avoids building ancestor sets
+                if dep not in known:
+                    errors.append(f"Node '{nid}' references unknown node '{dep}'")
+                elif dep not in self.ancestors(nid):
+                    errors.append(f"Node '{nid}' references '{dep}' but has no edge path from it")
+        return errors
+
+
+@dataclass
+class CompiledPipeline:
+    graph: PipelineGraph
+    templates: dict[str, ParamTemplate]
+    reference_errors: list[str]
+    # Compiled subgraph per map node id
+    subgraphs: dict[str, "CompiledPipeline"] = field(default_factory=dict)
+
+    @property
+    def has_cycle(self) -> bool:
+        return self.graph.has_cycle or any(s.has_cycle for s in self.subgraphs.values())
+
+
+_compiled: dict[tuple[str, str], CompiledPipeline] = {}
+
+
+def _compile(pipeline: PipelineDefinition, external: frozenset[str] = frozenset()) -> CompiledPipeline:
+    graph = PipelineGraph(pipeline)
+    templates = compile_pipeline(pipeline)
+    compiled = CompiledPipeline(graph, templates, graph.reference_errors(templates, external))
+    for node in pipeline.nodes:
+        if node.type != MAP_NODE_TYPE:
+            continue
+        if node.subgraph is None or not node.subgraph.nodes:
+            compiled.reference_errors.append(f"Map node '{node.id}' has no subgraph")
+            continue
+        sub = _compile(
+            PipelineDefinition(id=f"{pipeline.id}/{node.id}", name=node.id,
+                               nodes=node.subgraph.nodes, edges=node.subgraph.edges),
+            external | graph.ancestors(node.id) | {"item"},
+        )
+        compiled.subgraphs[node.id] = sub
+        compiled.reference_errors.extend(f"{node.id}: {e}" for e in sub.reference_errors)
+    return compiled
+
+
+def get_compiled(pipeline: PipelineDefinition) -> CompiledPipeline:
+    """Compile *pipeline* (graph + param templates), cached by id and version."""
+    key = (pipeline.id, pipeline.version)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = _compile(pipeline)
+        _compiled[key] = compiled
+        while len(_compiled) > MAX_COMPILED:
+            _compiled.pop(next(iter(_compiled)))
+    return compiled
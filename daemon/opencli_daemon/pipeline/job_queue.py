@@ -0,0 +1,240 @@
+"""Pipeline job queue — asynchronous pipeline runs.
+
+submit() returns a run_id immediately; a fixed pool of worker tasks pulls
+jobs from a bounded priority queue and runs them through execute_pipeline.
+Callers poll status, long-poll the result (wait_for) or subscribe to
+progress events (used for the SSE endpoint).
+
+Config (~/.opencli/config.yaml):
+    pipeline.max_concurrent_runs  — worker count (default 2)
+    pipeline.max_queued_runs      — queue capacity (default 100)
+"""
+
+import asyncio
+import itertools
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+from opencli_daemon.config import load_config, get_nested
+from opencli_daemon.utils.cancellation import CancelToken
+from . import executor
+from .definition import PipelineDefinition
+
+DEFAULT_CONCURRENCY = 2
+DEFAULT_MAX_QUEUED = 100
+
+# Finished jobs kept in memory for status/result lookups (run history has the rest)
+MAX_FINISHED_JOBS = 200
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class QueueFullError(Exception):
+    """Raised by submit() when the queue is at capacity."""
+
+
+@dataclass
+class PipelineJob:
+    run_id: str
+    pipeline: PipelineDefinition
+    registry: Any
+    options: dict[str, Any]
+    priority: int = 0
+    status: str = "queued"
+    progress: int = 0
+    current_node: str = ""
+    result: dict[str, Any] | None = None
+    submitted_at: int = field(default_factory=lambda: int(time.time() * 1000))
+    started_at: int | None = None
+    finished_at: int | None = None
+    cancel_token: CancelToken = field(default_factory=CancelToken)
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    subscribers: list[asyncio.Queue] = field(default_factory=list)
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "pipeline_id": self.pipeline.id,
+            "status": self.status,
+            "priority": self.priority,
+            "progress": self.progress,
+            "current_node": self.current_node,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "success": self.result.get("success") if self.result else None,
+        }
+
+    def publish(self, event: dict[str, Any]) -> None:
+        for q in self.subscribers:
+            q.put_nowait(event)
+
+
+class JobQueue:
+    """Bounded priority queue of pipeline runs with N concurrent workers."""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY,
+                 max_queued: int = DEFAULT_MAX_QUEUED) -> None:
+        self.concurrency = max(1, concurrency)
+        self.max_queued = max(1, max_queued)
+        self._queue: asyncio.PriorityQueue | None = None
+        self._seq = itertools.count()
+        self._jobs: dict[str, PipelineJob] = {}
+        self._workers: list[asyncio.Task] = []
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            # Unbounded: cancelled jobs linger until dequeued, so submit()
+            # checks capacity against the jobs still queued
+            self._queue = asyncio.PriorityQueue()
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker())
+                             for _ in range(self.concurrency)]
+
+    def submit(
+        self,
+        pipeline: PipelineDefinition,
+        registry: Any,
+        *,
+        priority: int = 0,
+        run_id: str | None = None,
+        **options: Any,
+    ) -> PipelineJob:
+        """Enqueue a run. Higher priority runs first; FIFO within a priority.
+
+        *options* are passed through to execute_pipeline.
+        """
+        self._ensure_started()
+        if sum(1 for j in self._jobs.values() if j.status == "queued") >= self.max_queued:
+            raise QueueFullError(f"Job queue is full ({self.max_queued} queued runs)")
+        job = PipelineJob(
+            run_id=run_id or f"run_{uuid.uuid4().hex[:12]}",
+            pipeline=pipeline, registry=registry, options=options, priority=priority,
+        )
+        self._queue.put_nowait((-priority, next(self._seq), job))
+        self._jobs[job.run_id] = job
+        self._prune()
+        return job
+
+    def get(self, run_id: str) -> PipelineJob | None:
+        return self._jobs.get(run_id)
+
+    def list_jobs(self) -> list[PipelineJob]:
+        return sorted(self._jobs.values(), key=lambda j: j.submitted_at, reverse=True)
+
+    def position(self, job: PipelineJob) -> int | None:
+        """1-based position among queued jobs, or None if not queued."""
+        if job.status != "queued" or self._queue is None:
+            return None
+        queued = sorted(item for item in self._queue._queue if item[2].status == "queued")
+        for i, (_, _, j) in enumerate(queued):
+            if j is job:
+                return i + 1
+        return None
+
+    def cancel(self, run_id: str) -> bool:
+        job = self._jobs.get(run_id)
+        if job is None or job.status in TERMINAL_STATUSES:
+            return False
+        # Running nodes are killed mid-flight; the worker then picks up the next job
+        job.cancel_token.cancel("Cancelled by user")
+        if job.status == "queued":
+            # Worker drops it when dequeued; report it as cancelled right away
+            self._finish(job, "cancelled", {"success": False, "cancelled": True,
+                                            "run_id": run_id})
+        return True
+
+    async def wait_for(self, run_id: str, timeout: float) -> PipelineJob | None:
+        """Long-poll helper: wait up to *timeout* seconds for the job to finish."""
+        job = self._jobs.get(run_id)
+        if job is None:
+            return None
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    def stats(self) -> dict[str, Any]:
+        counts: dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "concurrency": self.concurrency,
+            "max_queued": self.max_queued,
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "counts": counts,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if job.status == "queued":
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: PipelineJob) -> None:
+        job.status = "running"
+        job.started_at = int(time.time() * 1000)
+        job.publish({"event": "status", **job.to_json()})
+
+        user_progress = job.options.pop("on_progress", None)
+
+        async def on_progress(data: dict) -> None:
+            job.progress = data.get("progress", job.progress)
+            job.current_node = data.get("node_id", job.current_node)
+            job.publish({"event": "progress", "run_id": job.run_id, **data})
+            if user_progress:
+                await user_progress(data)
+
+        try:
+            result = await executor.execute_pipeline(
+                job.pipeline, job.registry,
+                on_progress=on_progress,
+                cancel_token=job.cancel_token,
+                run_id=job.run_id,
+                **job.options,
+            )
+        except Exception as e:
+            result = {"success": False, "error": str(e), "run_id": job.run_id}
+
+        if job.cancel_token.cancelled:
+            status = "cancelled"
+        else:
+            status = "completed" if result.get("success") else "failed"
+        self._finish(job, status, result)
+
+    def _finish(self, job: PipelineJob, status: str, result: dict[str, Any]) -> None:
+        job.status = status
+        job.result = result
+        job.finished_at = int(time.time() * 1000)
+        job.done.set()
+        job.publish({"event": "done", **job.to_json()})
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in TERMINAL_STATUSES]
+        if len(finished) <= MAX_FINISHED_JOBS:
+            return
+        finished.sort(key=lambda j: j.finished_at or 0)
+        for job in finished[:len(finished) - MAX_FINISHED_JOBS]:
+            self._jobs.pop(job.run_id, None)
+
+
+_job_queue: JobQueue | None = None
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue, sized from config on first use."""
+    global _job_queue
+    if _job_queue is None:
+        config = load_config()
+        _job_queue = JobQueue(
+            concurrency=int(get_nested(config, "pipeline.max_concurrent_runs", DEFAULT_CONCURRENCY)),
+            max_queued=int(get_nested(config, "pipeline.max_queued_runs", DEFAULT_MAX_QUEUED)),
+        )
+    return _job_queue
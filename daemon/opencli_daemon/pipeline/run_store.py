@@ -0,0 +1,321 @@
+"""Pipeline run history — pipeline_runs / pipeline_node_runs CRUD.
+
+Every execute_pipeline call gets a run row; node outcomes are buffered by a
+RunRecorder and written with one executemany per DAG level (slow nodes are
+checkpointed as soon as they finish). Stored results have their base64
+payloads stripped; load_node_results re-hydrates them from the artifact
+files so run-from-node and crash recovery can resume without the client
+resending previous_results.
+
+Runs still marked 'running' when the daemon starts were interrupted by a
+crash or restart; mark_interrupted_runs flags them so they can be resumed.
+"""
+
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from opencli_daemon.database import connection as db
+from opencli_daemon.utils import tracing
+
+# Keep the newest N runs; node rows go with them via ON DELETE CASCADE
+MAX_RUNS = 500
+
+# Base64-only results (no local file) are spilled here so resumes can use them
+RUNS_DIR = Path(os.environ.get("HOME", ".")) / ".opencli" / "runs"
+
+# Nodes slower than this are written immediately instead of at level end
+CHECKPOINT_MIN_MS = 2000
+
+_BASE64_KEYS = ("image_base64", "video_base64", "audio_base64")
+_PATH_KEYS = ("path", "file_path", "output_path")
+
+
+def _now() -> int:
+    return int(time.time() * 1000)
+
+
+def params_hash(params: dict[str, Any]) -> str:
+    """Stable hash of resolved node params (used to tell reruns apart)."""
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def artifact_paths(result: dict[str, Any]) -> list[str]:
+    """Local files referenced by a node result."""
+    paths = []
+    for key in _PATH_KEYS:
+        val = result.get(key)
+        if isinstance(val, str) and val and Path(val).is_file():
+            paths.append(val)
+    return paths
+
+
+def _compact_result(run_id: str, node_id: str, result: dict[str, Any]) -> tuple[dict, list]:
+    """Drop base64 payloads, remembering which file each one can be re-read from.
+
+    A payload is re-read from the result's own artifact holding the same
+    bytes, or else spilled to a file of its own. Returns (compact result,
+    artifacts) where artifacts is a list of {"path", "size"} used to
+    validate the outputs before a resume.
+    """
+    compact = {k: v for k, v in result.items() if k not in _BASE64_KEYS}
+    paths = artifact_paths(result)
+    stripped: dict[str, str] = {}
+    for key in _BASE64_KEYS:
+        if not result.get(key):
+            continue
+        data = base64.b64decode(result[key])
+        source = next((p for p in paths if os.path.getsize(p) == len(data)
+                       and Path(p).read_bytes() == data), None)
+        if source is None:
+            # Nothing on disk holds this payload — spill it ourselves
+            spill = RUNS_DIR / run_id / f"{node_id}.{key}"
+            spill.parent.mkdir(parents=True, exist_ok=True)
+            spill.write_bytes(data)
+            source = str(spill)
+        stripped[key] = source
+    if stripped:
+        compact["_stripped"] = stripped
+    artifacts = []
+    for p in dict.fromkeys([*paths, *stripped.values()]):
+        try:
+            artifacts.append({"path": p, "size": os.path.getsize(p)})
+        except OSError:
+            continue
+    return compact, artifacts
+
+
+def artifacts_valid(artifacts: list[dict]) -> bool:
+    """True if every recorded artifact still exists with its recorded size."""
+    for a in artifacts:
+        try:
+            if os.path.getsize(a["path"]) != a.get("size"):
+                return False
+        except (OSError, KeyError, TypeError):
+            return False
+    return True
+
+
+def new_run_id() -> str:
+    return f"run_{uuid.uuid4().hex[:12]}"
+
+
+class RunRecorder:
+    """Buffers node outcomes for one run and flushes them in batches."""
+
+    def __init__(self, run_id: str) -> None:
+        self.run_id = run_id
+        self._pending: list[tuple] = []
+
+    @classmethod
+    async def start(
+        cls,
+        pipeline_id: str,
+        params: dict[str, Any],
+        *,
+        start_from_node: str | None = None,
+        parent_run_id: str | None = None,
+        run_id: str | None = None,
+    ) -> "RunRecorder":
+        run_id = run_id or new_run_id()
+        await db.upsert_row("pipeline_runs", {
+            "id": run_id,
+            "pipeline_id": pipeline_id,
+            "status": "running",
+            "params": json.dumps(params, default=str),
+            "start_from_node": start_from_node,
+            "parent_run_id": parent_run_id,
+            "started_at": _now(),
+        })
+        return cls(run_id)
+
+    def add_node(
+        self,
+        node_id: str,
+        task_type: str,
+        status: str,
+        result: dict[str, Any],
+        *,
+        started_at: int | None = None,
+        finished_at: int | None = None,
+        resolved_params_hash: str | None = None,
+        work_units: float | None = None,
+    ) -> None:
+        self._pending.append((node_id, task_type, status, result, started_at,
+                              finished_at, resolved_params_hash, work_units))
+
+    def _build_rows(self, pending: list[tuple]) -> list[tuple]:
+        rows = []
+        for node_id, task_type, status, result, started_at, finished_at, p_hash, units in pending:
+            duration = finished_at - started_at if started_at and finished_at else None
+            compact, artifacts = _compact_result(self.run_id, node_id, result)
+            error = result.get("error")
+            rows.append((
+                self.run_id, node_id, task_type, status, started_at, finished_at,
+                duration, p_hash, json.dumps(compact, default=str), json.dumps(artifacts),
+                error if isinstance(error, str) else None, units,
+            ))
+        return rows
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        with tracing.span("db_flush", rows=len(pending)):
+            # Serializing results and spilling base64 can be large — keep it off the loop
+            rows = await asyncio.to_thread(self._build_rows, pending)
+            database = await db.get_db()
+            await database.executemany(
+                "INSERT OR REPLACE INTO pipeline_node_runs "
+                "(run_id, node_id, task_type, status, started_at, finished_at, duration_ms, "
+                "params_hash, result, artifacts, error, work_units) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            await database.commit()
+
+    async def finish(self, status: str, duration_ms: int, error: str | None = None) -> None:
+        await self.flush()
+        database = await db.get_db()
+        await database.execute(
+            "UPDATE pipeline_runs SET status = ?, finished_at = ?, duration_ms = ?, error = ? "
+            "WHERE id = ?",
+            (status, _now(), duration_ms, error, self.run_id),
+        )
+        cursor = await database.execute(
+            f"SELECT id FROM pipeline_runs ORDER BY started_at DESC LIMIT -1 OFFSET {MAX_RUNS}"
+        )
+        expired = [row[0] for row in await cursor.fetchall()]
+        if expired:
+            await database.executemany("DELETE FROM pipeline_runs WHERE id = ?",
+                                       [(rid,) for rid in expired])
+        await database.commit()
+        for rid in expired:
+            shutil.rmtree(RUNS_DIR / rid, ignore_errors=True)
+
+
+# ── Queries ──────────────────────────────────────────────────────────────────
+
+
+async def list_runs(
+    pipeline_id: str | None = None, limit: int = 50, status: str | None = None,
+) -> list[dict]:
+    clauses, params = [], []
+    if pipeline_id:
+        clauses.append("pipeline_id = ?")
+        params.append(pipeline_id)
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    return await db.list_rows("pipeline_runs", where=" AND ".join(clauses) or None,
+                              params=tuple(params), order_by="started_at DESC", limit=limit)
+
+
+async def mark_interrupted_runs() -> list[dict]:
+    """Flag runs left 'running' by a previous daemon process as 'interrupted'.
+
+    Call once at startup, before any new run can start.
+    """
+    stale = await list_runs(status="running", limit=MAX_RUNS)
+    if stale:
+        await db.execute(
+            "UPDATE pipeline_runs SET status = 'interrupted', error = ? WHERE status = 'running'",
+            ("Daemon stopped before the run finished",),
+        )
+    return stale
+
+
+async def set_run_status(run_id: str, status: str) -> None:
+    await db.execute("UPDATE pipeline_runs SET status = ? WHERE id = ?", (status, run_id))
+
+
+async def get_run(run_id: str, *, include_nodes: bool = True) -> dict | None:
+    run = await db.get_row("pipeline_runs", "id", run_id)
+    if run is None:
+        return None
+    run["params"] = json.loads(run["params"]) if run.get("params") else {}
+    if not include_nodes:
+        return run
+    nodes = await db.list_rows("pipeline_node_runs", where="run_id = ?", params=(run_id,),
+                               order_by="rowid", limit=10_000)
+    for n in nodes:
+        n["result"] = json.loads(n["result"]) if n.get("result") else {}
+        n["artifacts"] = json.loads(n["artifacts"]) if n.get("artifacts") else []
+    run["nodes"] = nodes
+    return run
+
+
+async def latest_run_id(pipeline_id: str) -> str | None:
+    rows = await db.list_rows("pipeline_runs", where="pipeline_id = ?", params=(pipeline_id,),
+                              order_by="started_at DESC", limit=1, columns=("id",))
+    return rows[0]["id"] if rows else None
+
+
+async def load_node_results(
+    run_id: str, *, completed_only: bool = True, validate: bool = False,
+) -> dict[str, dict]:
+    """Rebuild {node_id: result} for a past run, re-reading base64 from artifacts.
+
+    With validate, nodes whose artifacts are missing or changed size are left
+    out so a resume re-executes them.
+    """
+    where = "run_id = ? AND status = 'completed'" if completed_only else "run_id = ?"
+    rows = await db.list_rows("pipeline_node_runs", where=where, params=(run_id,),
+                              order_by="rowid", limit=10_000,
+                              columns=("node_id", "result", "artifacts"))
+    return await asyncio.to_thread(_rehydrate, rows, validate)
+
+
+def _rehydrate(rows: list[dict], validate: bool) -> dict[str, dict]:
+    results: dict[str, dict] = {}
+    for row in rows:
+        artifacts = json.loads(row["artifacts"]) if row.get("artifacts") else []
+        if validate and not artifacts_valid(artifacts):
+            continue
+        result = json.loads(row["result"]) if row.get("result") else {}
+        stripped = result.pop("_stripped", {})
+        if isinstance(stripped, list):
+            # Rows written before each key recorded its own file
+            spill = result.pop("_spill", None)
+            sources = [spill] if spill else artifact_paths(result)
+            stripped = {key: sources[0] for key in stripped[:1] if sources}
+        for key, path in stripped.items():
+            with contextlib.suppress(OSError):
+                result[key] = base64.b64encode(Path(path).read_bytes()).decode()
+        results[row["node_id"]] = result
+    return results
+
+
+async def node_duration_stats(task_type: str | None = None) -> list[dict]:
+    """Historical per-task-type latency for completed nodes."""
+    where = "WHERE status = 'completed' AND duration_ms IS NOT NULL"
+    params: tuple = ()
+    if task_type:
+        where += " AND task_type = ?"
+        params = (task_type,)
+    return await db.raw_query(
+        f"""SELECT task_type, COUNT(*) AS count, AVG(duration_ms) AS avg_ms,
+                   MIN(duration_ms) AS min_ms, MAX(duration_ms) AS max_ms
+            FROM pipeline_node_runs {where}
+            GROUP BY task_type ORDER BY avg_ms DESC""",
+        params,
+    )
+
+
+async def node_duration_samples(limit: int = 5000) -> list[dict]:
+    """Most recent completed-node (task_type, duration_ms, work_units) rows."""
+    return await db.raw_query(
+        """SELECT task_type, duration_ms, work_units FROM pipeline_node_runs
+           WHERE status = 'completed' AND duration_ms IS NOT NULL
+           ORDER BY rowid DESC LIMIT ?""",
+        (limit,),
+    )
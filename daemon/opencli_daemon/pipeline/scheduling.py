@@ -0,0 +1,278 @@
+"""Critical-path priorities for pipeline nodes.
+
+Each node's duration is estimated from past runs: DurationModel fits
+``duration_ms ≈ a + b·work_units`` per task type over recent completed
+pipeline_node_runs, where work_units() sizes a node from its params
+(frames × steps × megapixels, text length, clip count). Task types
+without history fall back to coarse priors.
+
+critical_path_tails() turns the estimates into each node's remaining
+downstream path, and PrioritySlots hands contended slots to the waiter
+on the longest path first — so with a limited number of GPU slots the
+long video nodes start ahead of short TTS / assembly work and the
+episode's makespan shrinks.
+
+Config (~/.opencli/config.yaml):
+    pipeline.node_slots  — concurrent node executions across all runs (default 0 = unlimited)
+    pipeline.gpu_slots   — concurrent GPU-bound executions (default 0 = unlimited)
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import time
+from collections import ChainMap
+from typing import Any, AsyncIterator
+
+from opencli_daemon.config import load_config, get_nested
+from . import run_store
+from .definition import DEFAULT_MAP_PARALLELISM, MAP_NODE_TYPE, PipelineNode
+from .graph import CompiledPipeline
+
+logger = logging.getLogger(__name__)
+
+# Fallback estimates (ms) by task-type keyword, first match wins
+_PRIORS_MS = (
+    ("video", 120_000.0),
+    ("upscale", 60_000.0),
+    ("interpolate", 60_000.0),
+    ("image", 20_000.0),
+    ("style_transfer", 20_000.0),
+    ("tts", 3_000.0),
+    ("assembly", 10_000.0),
+    ("encode", 10_000.0),
+    ("concat", 10_000.0),
+    ("lut", 10_000.0),
+)
+_DEFAULT_PRIOR_MS = 1_000.0
+
+# Task types competing for the GPU slots
+_GPU_PREFIXES = ("media_local_",)
+_GPU_KEYWORDS = ("upscale", "interpolate")
+
+# Samples a fit needs before the slope is trusted over the mean
+MIN_FIT_SAMPLES = 5
+MODEL_TTL_S = 60.0
+MODEL_SAMPLES = 5000
+
+
+def work_units(task_type: str, params: dict[str, Any]) -> float:
+    """Size of a node's work as a product of its numeric size params (1.0 if none)."""
+    units = 1.0
+
+    def _num(*keys: str) -> float | None:
+        for key in keys:
+            value = params.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+                return float(value)
+        return None
+
+    for value in (_num("frames", "num_frames"), _num("steps", "num_inference_steps")):
+        if value:
+            units *= value
+    width, height = _num("width"), _num("height")
+    if width and height:
+        units *= width * height / 1e6
+    text = params.get("text")
+    if isinstance(text, str) and text:
+        units *= max(1.0, len(text) / 100)
+    clips = params.get("clips")
+    if isinstance(clips, list) and clips:
+        units *= len(clips)
+    return units
+
+
+def is_gpu_task(task_type: str) -> bool:
+    return task_type.startswith(_GPU_PREFIXES) or any(k in task_type for k in _GPU_KEYWORDS)
+
+
+def _prior_ms(task_type: str) -> float:
+    for keyword, ms in _PRIORS_MS:
+        if keyword in task_type:
+            return ms
+    return _DEFAULT_PRIOR_MS
+
+
+class DurationModel:
+    """Per-task-type ``a + b·work_units`` duration fit over past node runs."""
+
+    def __init__(self, samples: list[dict[str, Any]] = ()) -> None:
+        by_type: dict[str, list[tuple[float, float]]] = {}
+        for row in samples:
+            if row.get("duration_ms") is None:
+                continue
+            units = row.get("work_units")
+            by_type.setdefault(row["task_type"], []).append(
+                (float(units) if units else 1.0, float(row["duration_ms"])))
+        self._fits: dict[str, tuple[float, float]] = {}
+        for task_type, points in by_type.items():
+            self._fits[task_type] = self._fit(points)
+
+    @staticmethod
+    def _fit(points: list[tuple[float, float]]) -> tuple[float, float]:
+        n = len(points)
+        mean_u = sum(u for u, _ in points) / n
+        mean_d = sum(d for _, d in points) / n
+        var = sum((u - mean_u) ** 2 for u, _ in points)
+        if n < MIN_FIT_SAMPLES or var == 0:
+            return mean_d, 0.0
+        slope = sum((u - mean_u) * (d - mean_d) for u, d in points) / var
+        if slope <= 0:
+            return mean_d, 0.0
+        return max(0.0, mean_d - slope * mean_u), slope
+
+    def estimate(self, task_type: str, params: dict[str, Any] | None = None) -> float:
+        """Expected duration (ms) of a *task_type* node with *params*."""
+        fit = self._fits.get(task_type)
+        if fit is None:
+            return _prior_ms(task_type)
+        intercept, slope = fit
+        return intercept + slope * work_units(task_type, params or {})
+
+
+_model: DurationModel | None = None
+_model_loaded_at = 0.0
+
+
+async def get_duration_model() -> DurationModel:
+    """Duration model over recent history, refreshed every MODEL_TTL_S."""
+    global _model, _model_loaded_at
+    if _model is None or time.monotonic() - _model_loaded_at > MODEL_TTL_S:
+        try:
+            _model = DurationModel(await run_store.node_duration_samples(MODEL_SAMPLES))
+        except Exception as e:
+            logger.warning("Could not load node duration history: %s", e)
+            _model = _model or DurationModel()
+        _model_loaded_at = time.monotonic()
+    return _model
+
+
+def critical_path_tails(
+    compiled: CompiledPipeline,
+    node_map: dict[str, PipelineNode],
+    model: DurationModel,
+    scope: dict[str, Any],
+    params: dict[str, Any],
+) -> tuple[dict[str, float], dict[str, float]]:
+    """(tails, estimates): per node, the estimated ms from its completion to
+    the end of the graph, and its own estimated duration.
+
+    Node params are filled from *scope* (known results, e.g. a map item),
+    so params that are literal or come from pipeline parameters size the
+    estimate. The runner re-estimates a node once its params are resolved.
+    """
+    graph = compiled.graph
+    est: dict[str, float] = {}
+    for nid in graph.node_ids:
+        node = node_map[nid]
+        filled = compiled.templates[nid].fill(scope, params)
+        if node.type == MAP_NODE_TYPE:
+            est[nid] = _map_estimate(node, filled, compiled.subgraphs.get(nid), model, scope, params)
+        else:
+            est[nid] = model.estimate(node.type, filled)
+    tails: dict[str, float] = {}
+    for nid in reversed(graph.topo_order):
+        tails[nid] = max((tails[c] + est[c] for c in graph.children[nid]), default=0.0)
+    return tails, est
+
+
+def _map_estimate(node: PipelineNode, filled: dict, sub: CompiledPipeline | None,
+                  model: DurationModel, scope: dict, params: dict) -> float:
+    items = filled.get("items")
+    if sub is None or not isinstance(items, list) or not items:
+        return 0.0
+    sub_map = {n.id: n for n in node.subgraph.nodes}
+    paths = [item_path(sub, sub_map, model, item, i, scope, params)
+             for i, item in enumerate(items)]
+    parallelism = max(1, int(filled.get("parallelism") or DEFAULT_MAP_PARALLELISM))
+    return max(max(paths), sum(paths) / min(parallelism, len(paths)))
+
+
+def item_scope(item: Any, index: int, outer: dict) -> ChainMap:
+    """Results scope of one map item: its own results, ``item``, then *outer*."""
+    ctx = dict(item) if isinstance(item, dict) else {}
+    ctx.setdefault("value", item)
+    ctx.setdefault("index", index)
+    return ChainMap({}, {"item": ctx}, outer)
+
+
+def item_path(sub: CompiledPipeline, sub_map: dict, model: DurationModel, item: Any, index: int,
+              outer: dict, params: dict) -> float:
+    """Estimated critical path (ms) of one map item through the subgraph."""
+    tails, est = critical_path_tails(sub, sub_map, model, item_scope(item, index, outer), params)
+    return max((tails[s] + est[s] for s in sub.graph.sources), default=0.0)
+
+
+class PrioritySlots:
+    """Counting semaphore that wakes the highest-priority waiter first.
+
+    A capacity of 0 (or less) means unlimited; acquire() then never waits.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._used = 0
+        self._waiters: list[tuple[float, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, priority: float = 0.0) -> AsyncIterator[None]:
+        if self.capacity <= 0:
+            yield
+            return
+        if self._used < self.capacity and not self._waiters:
+            self._used += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (-priority, next(self._seq), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release()  # handed a slot we no longer want
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        # The slot passes straight to the next live waiter
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._used -= 1
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, f in self._waiters if not f.done())
+
+
+_node_slots: PrioritySlots | None = None
+_gpu_slots: PrioritySlots | None = None
+
+
+def get_slots() -> tuple[PrioritySlots, PrioritySlots]:
+    """Process-wide (node, gpu) slots, sized from config on first use."""
+    global _node_slots, _gpu_slots
+    if _node_slots is None:
+        config = load_config()
+        _node_slots = PrioritySlots(int(get_nested(config, "pipeline.node_slots", 0)))
+        _gpu_slots = PrioritySlots(int(get_nested(config, "pipeline.gpu_slots", 0)))
+    return _node_slots, _gpu_slots
+
+
+@contextlib.asynccontextmanager
+async def node_slot(task_type: str, priority: float) -> AsyncIterator[None]:
+    """Hold a node slot (and a GPU slot for GPU task types) for one execution."""
+    nodes, gpu = get_slots()
+    # GPU slot first: a node waiting for the GPU shouldn't hold a general slot
+    async with contextlib.AsyncExitStack() as stack:
+        if is_gpu_task(task_type):
+            await stack.enter_async_context(gpu.acquire(priority))
+        await stack.enter_async_context(nodes.acquire(priority))
+        yield
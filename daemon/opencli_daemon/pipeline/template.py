@@ -0,0 +1,185 @@
+"""Compiled variable templates for pipeline node params.
+
+Node params reference upstream outputs and pipeline parameters as
+``{{node_id.field}}`` and ``{{params.name}}``. compile_pipeline() parses
+every node's params once, before anything runs:
+
+- strings without references stay constants,
+- a string that is exactly one reference becomes a type-preserving slot,
+- mixed strings become a list of literal / reference parts,
+
+and collects each node's static dependency list so references can be
+checked against the edges (PipelineGraph.reference_errors). Executing a
+node is then a plain lookup-and-fill (ParamTemplate.fill) instead of
+regex-scanning every string — including large substituted base64
+payloads — at run time.
+"""
+
+import re
+from typing import Any
+
+from .definition import PipelineDefinition
+
+_VAR_RE = re.compile(r"\{\{(.+?)\}\}")
+
+
+class _Ref:
+    """One parsed ``{{...}}`` reference."""
+
+    __slots__ = ("raw", "node_id", "field")
+
+    def __init__(self, raw: str, node_id: str | None, field: str) -> None:
+        self.raw = raw            # original text, kept when the value is missing
+        self.node_id = node_id    # None for params.* references
+        self.field = field
+
+    def lookup(self, node_results: dict[str, dict], params: dict[str, Any]) -> tuple[bool, Any]:
+        if self.node_id is None:
+            if self.field in params:
+                return True, params[self.field]
+            return False, None
+        result = node_results.get(self.node_id) or {}
+        if self.field in result:
+            return True, result[self.field]
+        if result.get("skipped"):
+            return True, None  # skipped nodes have no outputs
+        return False, None
+
+
+class _Const:
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def fill(self, node_results: dict, params: dict) -> Any:
+        return self.value
+
+
+class _Slot:
+    """A string that is a single reference — the referenced value keeps its type."""
+
+    __slots__ = ("ref",)
+
+    def __init__(self, ref: _Ref) -> None:
+        self.ref = ref
+
+    def fill(self, node_results: dict, params: dict) -> Any:
+        found, value = self.ref.lookup(node_results, params)
+        return value if found else self.ref.raw
+
+
+class _Concat:
+    """Literal text interleaved with references, rendered as a string."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: list[str | _Ref]) -> None:
+        self.parts = parts
+
+    def fill(self, node_results: dict, params: dict) -> str:
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+            else:
+                found, value = part.lookup(node_results, params)
+                if not found:
+                    out.append(part.raw)
+                elif value is not None:
+                    out.append(str(value))
+        return "".join(out)
+
+
+class _List:
+    __slots__ = ("items",)
+
+    def __init__(self, items: list) -> None:
+        self.items = items
+
+    def fill(self, node_results: dict, params: dict) -> list:
+        return [item.fill(node_results, params) for item in self.items]
+
+
+class _Dict:
+    __slots__ = ("items",)
+
+    def __init__(self, items: dict) -> None:
+        self.items = items
+
+    def fill(self, node_results: dict, params: dict) -> dict:
+        return {k: v.fill(node_results, params) for k, v in self.items.items()}
+
+
+def _parse_ref(body: str, raw: str) -> _Ref | None:
+    if body.startswith("params."):
+        return _Ref(raw, None, body[7:])
+    node_id, sep, field = body.partition(".")
+    if not sep:
+        return None  # not a reference we resolve; left as literal text
+    return _Ref(raw, node_id, field)
+
+
+def _compile_string(value: str, deps: set[str]) -> Any:
+    parts: list[str | _Ref] = []
+    pos = 0
+    for m in _VAR_RE.finditer(value):
+        ref = _parse_ref(m.group(1), m.group(0))
+        if ref is None:
+            continue
+        if m.start() > pos:
+            parts.append(value[pos:m.start()])
+        parts.append(ref)
+        if ref.node_id is not None:
+            deps.add(ref.node_id)
+        pos = m.end()
+    if not any(isinstance(p, _Ref) for p in parts):
+        return _Const(value)
+    if pos < len(value):
+        parts.append(value[pos:])
+    if len(parts) == 1:
+        return _Slot(parts[0])
+    return _Concat(parts)
+
+
+def _compile_value(value: Any, deps: set[str]) -> Any:
+    if isinstance(value, str):
+        return _compile_string(value, deps)
+    # Containers are rebuilt on every fill so handlers never share (and mutate)
+    # the definition's own lists/dicts
+    if isinstance(value, list):
+        return _List([_compile_value(v, deps) for v in value])
+    if isinstance(value, dict):
+        return _Dict({k: _compile_value(v, deps) for k, v in value.items()})
+    return _Const(value)
+
+
+class ParamTemplate:
+    """Compiled form of one node's params (and its optional ``when`` guard)."""
+
+    __slots__ = ("_root", "_when", "deps")
+
+    def __init__(self, params: dict[str, Any], when: str = "") -> None:
+        deps: set[str] = set()
+        self._root = _Dict({k: _compile_value(v, deps) for k, v in params.items()})
+        self._when = _compile_string(when, deps) if when else None
+        self.deps = frozenset(deps)
+
+    def fill(self, node_results: dict[str, dict], params: dict[str, Any]) -> dict[str, Any]:
+        """Substitute upstream results and pipeline params into a fresh params dict."""
+        return self._root.fill(node_results, params)
+
+    def should_run(self, node_results: dict[str, dict], params: dict[str, Any]) -> bool:
+        """False when the node's ``when`` guard resolves to a falsy value."""
+        if self._when is None:
+            return True
+        value = self._when.fill(node_results, params)
+        if isinstance(value, str):
+            return value.strip().lower() not in ("", "0", "false", "no", "none")
+        return bool(value)
+
+
+def compile_pipeline(pipeline: PipelineDefinition) -> dict[str, ParamTemplate]:
+    """Compile every node's params; returns {node_id: ParamTemplate}."""
+    return {n.id: ParamTemplate(n.params, n.when) for n in pipeline.nodes}
+
@@ -0,0 +1,141 @@
+"""Pipeline worker process — executes nodes pushed by the daemon's WorkerPool.
+
+    python -m opencli_daemon.pipeline.worker --connect HOST:PORT [--slots N]
+
+Builds the built-in domain registry, connects to the coordinator (see
+worker_pool.py for the protocol) and runs up to --slots tasks at a time,
+each under its own CancelToken so a cancel from the coordinator kills the
+task's subprocesses. Reconnects with backoff unless --exit-on-disconnect
+(used for workers the daemon spawns itself).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+import uuid
+from typing import Any
+
+from opencli_daemon.utils import ffmpeg_scheduler
+from opencli_daemon.utils.auth import DEFAULT_AUTH_SECRET, generate_sha256_token
+from opencli_daemon.utils.cancellation import CancelToken
+from .worker_pool import LINE_LIMIT, encode_message
+
+RECONNECT_MAX_S = 30.0
+
+
+async def _serve(registry: Any, host: str, port: int, worker_id: str, slots: int,
+                 secret: str, task_types: list[str]) -> None:
+    """One coordinator connection; returns when it closes."""
+    reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+    timestamp = int(time.time() * 1000)
+    writer.write(encode_message({
+        "type": "hello", "worker_id": worker_id, "timestamp": timestamp,
+        "token": generate_sha256_token(worker_id, timestamp, secret),
+        "slots": slots, "task_types": task_types,
+        "pid": os.getpid(), "host": socket.gethostname(),
+    }))
+    reply = json.loads(await reader.readline() or b"{}")
+    if reply.get("type") != "welcome":
+        writer.close()
+        raise ConnectionError(reply.get("message") or "Rejected by coordinator")
+    print(f"[Worker {worker_id}] Connected to {host}:{port}")
+
+    tokens: dict[str, CancelToken] = {}
+    tasks: set[asyncio.Task] = set()
+
+    async def _run(task_id: str, task_type: str, params: dict[str, Any]) -> None:
+        token = tokens[task_id]
+        try:
+            # Pipeline work: its encodes queue behind this host's interactive ones
+            with ffmpeg_scheduler.use_priority(ffmpeg_scheduler.BATCH):
+                result = await registry.execute_task(task_type, params, cancel_token=token)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        finally:
+            tokens.pop(task_id, None)
+        if token.cancelled:
+            return  # the coordinator has moved on
+        writer.write(encode_message({"type": "result", "task_id": task_id, "result": result}))
+        await writer.drain()
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message.get("type") == "task":
+                task_id = message["task_id"]
+                tokens[task_id] = CancelToken()
+                task = asyncio.create_task(
+                    _run(task_id, message["task_type"], message.get("params") or {}))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            elif message.get("type") == "cancel":
+                token = tokens.get(message.get("task_id"))
+                if token:
+                    token.cancel(message.get("reason") or "Cancelled by coordinator")
+    finally:
+        # Coordinator gone: its tasks were requeued elsewhere
+        for token in list(tokens.values()):
+            token.cancel("Coordinator disconnected")
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        writer.close()
+
+
+async def run_worker(host: str, port: int, *, slots: int = 2, secret: str = DEFAULT_AUTH_SECRET,
+                     task_types: list[str] | None = None, worker_id: str | None = None,
+                     exit_on_disconnect: bool = False) -> None:
+    from opencli_daemon.domains.registry import create_builtin_registry
+
+    registry = create_builtin_registry()
+    await registry.initialize_all()
+    # Advertise only what this worker can run
+    task_types = [t for t in (task_types or registry.all_task_types) if registry.handles_task_type(t)]
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+
+    delay = 0.5
+    while True:
+        try:
+            await _serve(registry, host, port, worker_id, slots, secret, task_types)
+            delay = 0.5
+        except (ConnectionError, OSError, ValueError) as e:
+            print(f"[Worker {worker_id}] {e}")
+        if exit_on_disconnect:
+            return
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, RECONNECT_MAX_S)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="OpenCLI pipeline worker")
+    parser.add_argument("--connect", required=True, help="coordinator HOST:PORT")
+    parser.add_argument("--slots", type=int, default=2, help="concurrent tasks")
+    parser.add_argument("--secret", default=os.environ.get("OPENCLI_WORKER_SECRET",
+                                                           DEFAULT_AUTH_SECRET))
+    parser.add_argument("--task-types", default="", help="comma-separated (default: all)")
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--exit-on-disconnect", action="store_true")
+    args = parser.parse_args(argv)
+
+    host, _, port = args.connect.rpartition(":")
+    if not host or not port.isdigit():
+        parser.error("--connect must be HOST:PORT")
+    task_types = [t.strip() for t in args.task_types.split(",") if t.strip()]
+    try:
+        asyncio.run(run_worker(
+            host, int(port), slots=max(1, args.slots), secret=args.secret,
+            task_types=task_types or None, worker_id=args.worker_id,
+            exit_on_disconnect=args.exit_on_disconnect,
+        ))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""Worker pool — runs pipeline nodes in separate worker processes.
+
+The daemon is the coordinator: it listens on a TCP port, worker processes
+(pipeline/worker.py) connect and announce how many tasks they run at once
+and which task types they handle, and node executions are pushed to them
+from one priority queue (highest critical-path priority first, see
+scheduling.py). The CPU-bound parts of a node — calculator, base64,
+subtitle generation, JSON of large results — then no longer share the
+API's event loop.
+
+Workers may run on other hosts: set pipeline.workers.host to a LAN
+address and start ``python -m opencli_daemon.pipeline.worker --connect
+HOST:PORT`` there. File paths in results are the worker's own, so remote
+workers need ~/.opencli on shared storage for media nodes.
+
+Protocol — one JSON object per line, both directions:
+    worker → {"type": "hello", "worker_id", "timestamp", "token", "slots", "task_types", "pid", "host"}
+    coord  → {"type": "welcome"} | {"type": "error", "message"}
+    coord  → {"type": "task", "task_id", "task_type", "params"}
+    worker → {"type": "result", "task_id", "result"}
+    coord  → {"type": "cancel", "task_id", "reason"}
+The token is utils.auth's SHA256(worker_id:timestamp:secret).
+
+A worker that disconnects has its in-flight tasks requeued (up to
+MAX_ATTEMPTS); tasks no connected worker can take — including queued and
+in-flight ones once the last such worker disconnects — raise
+WorkerUnavailable and the caller runs them in-process.
+
+Config (~/.opencli/config.yaml):
+    pipeline.workers.enabled     — start the coordinator (default false)
+    pipeline.workers.host        — listen address (default 127.0.0.1)
+    pipeline.workers.port        — listen port (default 9531)
+    pipeline.workers.local       — worker processes spawned by the daemon (default 2)
+    pipeline.workers.slots       — concurrent tasks per spawned worker (default 2)
+    pipeline.workers.secret      — shared secret for worker auth
+    pipeline.workers.task_types  — task types sent to workers (default: all they handle)
+    pipeline.workers.start_timeout — seconds to wait for spawned workers (default 15)
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from opencli_daemon.config import load_config, get_nested
+from opencli_daemon.utils import ffmpeg_scheduler, tracing
+from opencli_daemon.utils.auth import DEFAULT_AUTH_SECRET, verify_token
+from opencli_daemon.utils.cancellation import OperationCancelled, current_token, terminate_process
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the opencli_daemon package; spawned workers import from it
+_PACKAGE_ROOT = Path(__file__).resolve().parents[2]
+
+DEFAULT_PORT = 9531
+DEFAULT_LOCAL_WORKERS = 2
+DEFAULT_WORKER_SLOTS = 2
+DEFAULT_START_TIMEOUT = 15.0
+
+# Tries per task before a worker disconnect fails it
+MAX_ATTEMPTS = 2
+
+# Results carry base64 media; lines can be large
+LINE_LIMIT = 512 * 1024 * 1024
+
+
+class WorkerUnavailable(Exception):
+    """No connected worker can run the task — run it in-process instead."""
+
+
+def encode_message(message: dict[str, Any]) -> bytes:
+    return json.dumps(message, default=str).encode() + b"\n"
+
+
+@dataclass
+class _Worker:
+    worker_id: str
+    writer: asyncio.StreamWriter
+    slots: int
+    task_types: set[str]
+    host: str = ""
+    pid: int | None = None
+    connected_at: int = field(default_factory=lambda: int(time.time() * 1000))
+    running: dict[str, "_Task"] = field(default_factory=dict)
+    completed: int = 0
+
+    def handles(self, task_type: str) -> bool:
+        return not self.task_types or task_type in self.task_types
+
+    def send(self, message: dict[str, Any]) -> None:
+        self.writer.write(encode_message(message))
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "worker_id": self.worker_id, "host": self.host, "pid": self.pid,
+            "slots": self.slots, "running": len(self.running),
+            "completed": self.completed, "connected_at": self.connected_at,
+        }
+
+
+@dataclass(order=True)
+class _Task:
+    sort_key: tuple[float, int]
+    task_id: str = field(compare=False)
+    task_type: str = field(compare=False)
+    params: dict[str, Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+    span: tracing.Span | None = field(default=None, compare=False)
+
+
+class WorkerPool:
+    """Coordinator side: accepts workers and hands them queued tasks."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 secret: str = DEFAULT_AUTH_SECRET, task_types: list[str] | None = None) -> None:
+        self.host = host
+        self.port = port
+        self._secret = secret
+        self._task_types = set(task_types or ())
+        self._server: asyncio.AbstractServer | None = None
+        self._workers: dict[str, _Worker] = {}
+        self._queue: list[_Task] = []
+        self._seq = itertools.count()
+        self._processes: list[asyncio.subprocess.Process] = []
+
+    # ── lifecycle ────────────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=LINE_LIMIT)
+        # Port 0 binds a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def spawn_local(self, count: int, slots: int = DEFAULT_WORKER_SLOTS) -> None:
+        """Start *count* worker processes on this machine.
+
+        The daemon and the workers each get an equal share of the
+        machine's FFmpeg budget.
+        """
+        if count < 1:
+            return
+        host = "127.0.0.1" if self.host in ("0.0.0.0", "") else self.host
+        ffmpeg_budget = ffmpeg_scheduler.split_budget(count + 1)
+        # Importable whatever directory the daemon was started from
+        python_path = os.pathsep.join(
+            p for p in (str(_PACKAGE_ROOT), os.environ.get("PYTHONPATH", "")) if p)
+        for _ in range(count):
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "opencli_daemon.pipeline.worker",
+                "--connect", f"{host}:{self.port}", "--slots", str(slots),
+                "--exit-on-disconnect",
+                # Via the environment so the secret stays out of ps output
+                env={**os.environ, **ffmpeg_budget, "PYTHONPATH": python_path,
+                     "OPENCLI_WORKER_SECRET": self._secret},
+                start_new_session=True,
+            )
+            self._processes.append(proc)
+
+    async def wait_for_workers(self, count: int, timeout: float) -> bool:
+        """Wait until *count* workers are connected (False on timeout, or once spawned workers exit)."""
+        deadline = time.monotonic() + timeout
+        while len(self._workers) < count and time.monotonic() < deadline:
+            if self._processes and len(self._processes) - len(self.exited()) < count - len(self._workers):
+                break  # spawned workers died; the rest can't all connect
+            await asyncio.sleep(0.05)
+        return len(self._workers) >= count
+
+    def exited(self) -> list[int]:
+        """Return codes of spawned worker processes that have exited."""
+        return [p.returncode for p in self._processes if p.returncode is not None]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        for worker in list(self._workers.values()):
+            worker.writer.close()
+        await asyncio.gather(*(terminate_process(p) for p in self._processes),
+                             return_exceptions=True)
+        self._processes.clear()
+        for task in self._queue:
+            if not task.future.done():
+                task.future.set_exception(WorkerUnavailable("Worker pool stopped"))
+        self._queue.clear()
+
+    # ── execution ────────────────────────────────────────────────────────
+
+    def accepts(self, task_type: str) -> bool:
+        """True if *task_type* is routed to workers and a connected one handles it."""
+        if self._task_types and task_type not in self._task_types:
+            return False
+        return any(w.handles(task_type) for w in self._workers.values())
+
+    async def execute(self, task_type: str, params: dict[str, Any],
+                      priority: float = 0.0) -> dict[str, Any]:
+        """Run one task on a worker. Cancels with the current CancelToken."""
+        if not self.accepts(task_type):
+            raise WorkerUnavailable(f"No worker handles {task_type}")
+        with tracing.span("worker", task_type=task_type) as span:
+            task = _Task((-priority, next(self._seq)), f"wt_{uuid.uuid4().hex[:12]}",
+                         task_type, params, asyncio.get_running_loop().create_future(),
+                         span=span)
+            heapq.heappush(self._queue, task)
+            self._dispatch()
+            return await self._wait(task)
+
+    async def _wait(self, task: _Task) -> dict[str, Any]:
+        token = current_token()
+        if token is None:
+            return await task.future
+        token.raise_if_cancelled()
+        waiter = asyncio.ensure_future(token.wait())
+        try:
+            await asyncio.wait({task.future, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+        if task.future.done():
+            return task.future.result()
+        self._cancel(task, token.reason)
+        raise OperationCancelled(token.reason)
+
+    def _cancel(self, task: _Task, reason: str) -> None:
+        for worker in self._workers.values():
+            if worker.running.pop(task.task_id, None) is not None:
+                worker.send({"type": "cancel", "task_id": task.task_id, "reason": reason})
+        if task in self._queue:
+            self._queue.remove(task)
+            heapq.heapify(self._queue)
+        task.future.cancel()
+        self._dispatch()
+
+    def _handled(self, task_type: str) -> bool:
+        return any(w.handles(task_type) for w in self._workers.values())
+
+    def _dispatch(self) -> None:
+        """Hand queued tasks, highest priority first, to workers with free slots.
+
+        Tasks no connected worker handles (e.g. after the last one
+        disconnected) fail with WorkerUnavailable so they run in-process.
+        """
+        stranded = [t for t in self._queue if not t.future.done() and not self._handled(t.task_type)]
+        for task in stranded:
+            task.future.set_exception(WorkerUnavailable(f"No worker handles {task.task_type}"))
+        if stranded:
+            self._queue = [t for t in self._queue if not t.future.done()]
+            heapq.heapify(self._queue)
+        skipped: list[_Task] = []
+        while self._queue:
+            free = [w for w in self._workers.values() if len(w.running) < w.slots]
+            if not free:
+                break
+            task = heapq.heappop(self._queue)
+            if task.future.done():
+                continue
+            able = [w for w in free if w.handles(task.task_type)]
+            if not able:
+                skipped.append(task)  # its workers are busy
+                continue
+            # Least loaded first
+            worker = min(able, key=lambda w: len(w.running) / w.slots)
+            worker.running[task.task_id] = task
+            task.attempts += 1
+            if task.span:
+                task.span.set(worker_id=worker.worker_id, attempts=task.attempts)
+            worker.send({"type": "task", "task_id": task.task_id,
+                         "task_type": task.task_type, "params": task.params})
+        for task in skipped:
+            heapq.heappush(self._queue, task)
+
+    # ── connections ──────────────────────────────────────────────────────
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        worker: _Worker | None = None
+        try:
+            hello = json.loads(await asyncio.wait_for(reader.readline(), timeout=10) or b"{}")
+            worker_id = str(hello.get("worker_id", ""))
+            if hello.get("type") != "hello" or not worker_id or not verify_token(
+                    worker_id, int(hello.get("timestamp", 0)), str(hello.get("token", "")),
+                    self._secret):
+                writer.write(encode_message({"type": "error", "message": "Authentication failed"}))
+                return
+            if worker_id in self._workers:
+                writer.write(encode_message({"type": "error",
+                                             "message": f"Duplicate worker id: {worker_id}"}))
+                return
+            worker = _Worker(worker_id, writer, max(1, int(hello.get("slots", 1))),
+                             set(hello.get("task_types") or ()), host=str(hello.get("host", "")),
+                             pid=hello.get("pid"))
+            self._workers[worker_id] = worker
+            worker.send({"type": "welcome"})
+            print(f"[Workers] {worker_id} connected ({worker.host}, {worker.slots} slots)")
+            self._dispatch()
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get("type") != "result":
+                    continue
+                task = worker.running.pop(message.get("task_id"), None)
+                if task is None:
+                    continue  # cancelled meanwhile
+                worker.completed += 1
+                if not task.future.done():
+                    task.future.set_result(message.get("result") or {})
+                self._dispatch()
+        except (asyncio.TimeoutError, ConnectionError, ValueError) as e:
+            print(f"[Workers] Connection error: {e}")
+        finally:
+            if worker is not None:
+                self._workers.pop(worker.worker_id, None)
+                self._requeue(worker)
+                print(f"[Workers] {worker.worker_id} disconnected")
+            writer.close()
+
+    def _requeue(self, worker: _Worker) -> None:
+        for task in worker.running.values():
+            if task.future.done():
+                continue
+            if task.attempts >= MAX_ATTEMPTS:
+                task.future.set_result({
+                    "success": False,
+                    "error": f"Worker {worker.worker_id} disconnected while running the task",
+                })
+            elif not self._handled(task.task_type):
+                # No worker left to retry on (spawned ones aren't respawned)
+                task.future.set_exception(WorkerUnavailable(
+                    f"Worker {worker.worker_id} disconnected and no other worker handles {task.task_type}"))
+            else:
+                heapq.heappush(self._queue, task)
+        worker.running.clear()
+        self._dispatch()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "address": f"{self.host}:{self.port}",
+            "queued": sum(1 for t in self._queue if not t.future.done()),
+            "running": sum(len(w.running) for w in self._workers.values()),
+            "task_types": sorted(self._task_types),
+            "workers": [w.to_json() for w in self._workers.values()],
+        }
+
+
+_pool: WorkerPool | None = None
+
+
+def get_pool() -> WorkerPool | None:
+    """The running worker pool, or None when nodes run in-process."""
+    return _pool
+
+
+async def start_pool() -> WorkerPool | None:
+    """Start the coordinator (and local workers) if enabled in config."""
+    global _pool
+    config = load_config()
+    if _pool is not None or not get_nested(config, "pipeline.workers.enabled", False):
+        return _pool
+    pool = WorkerPool(
+        host=str(get_nested(config, "pipeline.workers.host", "127.0.0.1")),
+        port=int(get_nested(config, "pipeline.workers.port", DEFAULT_PORT)),
+        secret=str(get_nested(config, "pipeline.workers.secret", DEFAULT_AUTH_SECRET)),
+        task_types=get_nested(config, "pipeline.workers.task_types", None),
+    )
+    await pool.start()
+    local = int(get_nested(config, "pipeline.workers.local", DEFAULT_LOCAL_WORKERS))
+    await pool.spawn_local(local, int(get_nested(config, "pipeline.workers.slots", DEFAULT_WORKER_SLOTS)))
+    if local > 0:
+        timeout = float(get_nested(config, "pipeline.workers.start_timeout", DEFAULT_START_TIMEOUT))
+        if not await pool.wait_for_workers(local, timeout):
+            exited = pool.exited()
+            logger.warning(
+                "Only %d of %d pipeline workers connected (%s); other nodes run in-process",
+                len(pool._workers), local,
+                f"{len(exited)} exited with return codes {exited}" if exited else f"timed out after {timeout:.0f}s")
+    _pool = pool
+    return pool
+
+
+async def stop_pool() -> None:
+    global _pool
+    if _pool is not None:
+        with contextlib.suppress(Exception):
+            await _pool.stop()
+        _pool = None
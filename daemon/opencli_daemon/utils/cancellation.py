@@ -0,0 +1,194 @@
+"""Cancellation tokens for long-running tasks.
+
+A CancelToken is created per pipeline run / episode generation and bound
+to the running context with use_token(). Low-level runners (run_ffmpeg,
+run_inference, Replicate polling, TTS) pick it up via current_token() — or
+take it explicitly — and abort promptly: subprocesses are killed, HTTP
+requests are dropped and partial outputs removed.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import os
+import signal
+from typing import Any, Awaitable, Callable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Grace period between SIGTERM and SIGKILL for cancelled subprocesses
+KILL_GRACE_S = 3.0
+
+
+class OperationCancelled(Exception):
+    """Raised by cancellable operations when their token is cancelled."""
+
+
+class CancelToken:
+    """One-shot cancellation signal shared by everything in a run."""
+
+    def __init__(self) -> None:
+        self._event = asyncio.Event()
+        self._callbacks: list[Callable[[], Any]] = []
+        self.reason = ""
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        if self._event.is_set():
+            return
+        self.reason = reason
+        self._event.set()
+        for cb in self._callbacks:
+            try:
+                cb()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback: Callable[[], Any]) -> None:
+        self._callbacks.append(callback)
+
+    async def wait(self) -> None:
+        await self._event.wait()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise OperationCancelled(self.reason)
+
+    def __call__(self) -> bool:
+        # Lets a token stand in for the older ``cancelled: Callable[[], bool]``
+        return self.cancelled
+
+
+_current: contextvars.ContextVar[CancelToken | None] = contextvars.ContextVar(
+    "opencli_cancel_token", default=None,
+)
+
+
+def current_token() -> CancelToken | None:
+    """Token bound to the running task, if any."""
+    return _current.get()
+
+
+def bind_token(token: CancelToken | None) -> contextvars.Token | None:
+    """Bind *token* to the current context; pair with unbind_token()."""
+    return _current.set(token) if token is not None else None
+
+
+def unbind_token(bound: contextvars.Token | None) -> None:
+    if bound is not None:
+        _current.reset(bound)
+
+
+@contextlib.contextmanager
+def use_token(token: CancelToken | None) -> Iterator[None]:
+    """Bind *token* for the duration of the block (no-op for None)."""
+    bound = bind_token(token)
+    try:
+        yield
+    finally:
+        unbind_token(bound)
+
+
+async def cancellable(aw: Awaitable[T], token: CancelToken | None = None) -> T:
+    """Await *aw*, abandoning it as soon as *token* (or the current one) fires."""
+    token = token or current_token()
+    if token is None:
+        return await aw
+    token.raise_if_cancelled()
+    work = asyncio.ensure_future(aw)
+    waiter = asyncio.ensure_future(token.wait())
+    try:
+        await asyncio.wait({work, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+    if work.done():
+        return work.result()
+    work.cancel()
+    with contextlib.suppress(asyncio.CancelledError, Exception):
+        await work
+    raise OperationCancelled(token.reason)
+
+
+async def sleep(seconds: float, token: CancelToken | None = None) -> None:
+    """asyncio.sleep that wakes up early (raising) on cancellation."""
+    await cancellable(asyncio.sleep(seconds), token)
+
+
+async def terminate_process(proc: asyncio.subprocess.Process) -> None:
+    """SIGTERM the process group, then SIGKILL after KILL_GRACE_S."""
+    if proc.returncode is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError, OSError):
+        with contextlib.suppress(ProcessLookupError):
+            proc.terminate()
+    try:
+        await asyncio.wait_for(proc.wait(), KILL_GRACE_S)
+    except asyncio.TimeoutError:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, OSError):
+            with contextlib.suppress(ProcessLookupError):
+                proc.kill()
+        await proc.wait()
+
+
+async def communicate(
+    proc: asyncio.subprocess.Process,
+    input: bytes | None = None,
+    *,
+    timeout: float | None = None,
+    token: CancelToken | None = None,
+) -> tuple[bytes, bytes]:
+    """proc.communicate() that kills the process on timeout or cancellation.
+
+    Start the process with ``start_new_session=True`` so its children are
+    killed along with it. Raises TimeoutError / OperationCancelled.
+    """
+    return await supervise(proc, proc.communicate(input), timeout=timeout, token=token)
+
+
+async def supervise(
+    proc: asyncio.subprocess.Process,
+    io_work: Awaitable[T],
+    *,
+    timeout: float | None = None,
+    token: CancelToken | None = None,
+) -> T:
+    """Await *io_work* (reading *proc*'s pipes), killing the process on timeout or cancellation."""
+    token = token or current_token()
+    io = asyncio.ensure_future(io_work)
+    waiters: set[asyncio.Future] = {io}
+    cancel_wait = asyncio.ensure_future(token.wait()) if token else None
+    if cancel_wait:
+        waiters.add(cancel_wait)
+    try:
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        # Our own task was cancelled — don't leave the process behind
+        await terminate_process(proc)
+        raise
+    finally:
+        if cancel_wait:
+            cancel_wait.cancel()
+    if io.done():
+        return io.result()
+
+    await terminate_process(proc)
+    with contextlib.suppress(Exception):
+        await io
+    if token and token.cancelled:
+        raise OperationCancelled(token.reason)
+    raise TimeoutError(f"Process timed out after {timeout}s")
+
+
+def remove_partial(*paths: str | os.PathLike | None) -> None:
+    """Best-effort removal of partially written outputs."""
+    for p in paths:
+        if p:
+            with contextlib.suppress(OSError):
+                os.remove(p)
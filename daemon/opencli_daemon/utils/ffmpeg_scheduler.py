@@ -0,0 +1,237 @@
+"""Process-wide scheduler for FFmpeg jobs.
+
+run_ffmpeg (and run_command when it runs ffmpeg) take a job slot here
+before spawning. At most ``ffmpeg.max_jobs`` encodes run at once, and
+each is given ``-threads`` from a shared core budget so concurrent x264
+processes don't oversubscribe the machine — an even share of the free
+cores across the job slots still open. A job that starts on an idle
+scheduler with nothing queued gets every core, but is charged only its
+even share, so jobs arriving later still start (briefly oversubscribing).
+
+Queued jobs start in priority order — interactive work (a preview from
+the UI, a single domain task) before batch work (episode generation,
+pipeline runs), FIFO within a class. Batch code binds its class with
+use_priority(BATCH); everything else defaults to INTERACTIVE.
+
+stats() reports queue depth, running jobs, cores in use and recent wait
+times per class (GET /api/v1/pipelines/ffmpeg).
+
+Config (~/.opencli/config.yaml):
+    ffmpeg:
+      max_jobs: 4          # concurrent FFmpeg processes (default: half the cores, max 4)
+      thread_budget: 8     # cores shared between them (default: all cores)
+
+Both are machine-wide. The scheduler itself is per process, so when the
+daemon spawns local pipeline workers, split_budget() gives the daemon and
+each worker an equal share; workers read theirs from OPENCLI_FFMPEG_MAX_JOBS
+and OPENCLI_FFMPEG_THREAD_BUDGET.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Iterator
+
+from opencli_daemon.config import load_config, get_nested
+from . import cancellation, tracing
+
+INTERACTIVE = 1
+BATCH = 0
+_CLASS_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Recent waits kept per class for stats()
+WAIT_SAMPLES = 500
+
+# A spawned worker's share of the budget (set by split_budget)
+ENV_MAX_JOBS = "OPENCLI_FFMPEG_MAX_JOBS"
+ENV_THREAD_BUDGET = "OPENCLI_FFMPEG_THREAD_BUDGET"
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "opencli_ffmpeg_priority", default=INTERACTIVE,
+)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def bind_priority(priority: int) -> contextvars.Token:
+    """Bind *priority* for FFmpeg jobs in the current context; pair with unbind_priority()."""
+    return _priority.set(priority)
+
+
+def unbind_priority(bound: contextvars.Token) -> None:
+    _priority.reset(bound)
+
+
+@contextlib.contextmanager
+def use_priority(priority: int) -> Iterator[None]:
+    """Run FFmpeg jobs started in the block (and its tasks) at *priority*."""
+    bound = bind_priority(priority)
+    try:
+        yield
+    finally:
+        unbind_priority(bound)
+
+
+class FFmpegScheduler:
+    """Priority queue of FFmpeg jobs over a job cap and a core budget."""
+
+    def __init__(self, max_jobs: int, thread_budget: int) -> None:
+        self.max_jobs = max(1, max_jobs)
+        self.thread_budget = max(1, thread_budget)
+        self._running = 0
+        self._threads_used = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []  # future → (threads, charged)
+        self._seq = itertools.count()
+        self._waits: dict[int, deque[float]] = {p: deque(maxlen=WAIT_SAMPLES) for p in _CLASS_NAMES}
+        self._started: dict[int, int] = {p: 0 for p in _CLASS_NAMES}
+
+    def _grant(self, behind: int = 0) -> tuple[int, int] | None:
+        """(threads, charged cores) for the next job if one may start now, else None.
+
+        *behind* is the number of jobs queued after it.
+        """
+        free = self.thread_budget - self._threads_used
+        if self._running >= self.max_jobs or free < 1:
+            return None
+        # An even share of what's free among the slots still open: threads
+        # can't be handed back mid-encode, so no job takes cores a later one needs
+        share = max(1, free // (self.max_jobs - self._running))
+        if self._running == 0 and behind == 0:
+            return free, share  # alone: use the machine, charged as a share
+        return share, share
+
+    def _dispatch(self) -> None:
+        while self._waiters:
+            pending = sum(1 for _, _, f in self._waiters if not f.done())
+            grant = self._grant(max(0, pending - 1))
+            if grant is None:
+                return
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._take(grant[1])
+            future.set_result(grant)
+
+    def _take(self, charged: int) -> None:
+        self._running += 1
+        self._threads_used += charged
+
+    def _release(self, charged: int) -> None:
+        self._running -= 1
+        self._threads_used -= charged
+        self._dispatch()
+
+    async def _acquire(self, priority: int) -> tuple[int, int]:
+        if not self._waiters:
+            grant = self._grant()
+            if grant is not None:
+                self._take(grant[1])
+                return grant
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._seq), future))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(future.result()[1])  # handed a slot we no longer want
+            raise
+
+    @contextlib.asynccontextmanager
+    async def job(self, priority: int | None = None,
+                  cancel_token: cancellation.CancelToken | None = None) -> AsyncIterator[int]:
+        """Hold a job slot; yields the number of threads the job may use.
+
+        Waiting is abandoned (OperationCancelled) when *cancel_token* — or
+        the current one — fires.
+        """
+        priority = current_priority() if priority is None else priority
+        queued_ns = time.time_ns()
+        threads, charged = await cancellation.cancellable(self._acquire(priority), cancel_token)
+        waited_ns = time.time_ns() - queued_ns
+        self._waits.setdefault(priority, deque(maxlen=WAIT_SAMPLES)).append(waited_ns / 1e6)
+        self._started[priority] = self._started.get(priority, 0) + 1
+        if waited_ns > 1_000_000:
+            tracing.add_span("ffmpeg queue", queued_ns, queued_ns + waited_ns,
+                             priority=_CLASS_NAMES.get(priority, priority))
+        try:
+            yield threads
+        finally:
+            self._release(charged)
+
+    def stats(self) -> dict[str, Any]:
+        queued: dict[str, int] = {name: 0 for name in _CLASS_NAMES.values()}
+        for neg_priority, _, future in self._waiters:
+            if not future.done():
+                name = _CLASS_NAMES.get(-neg_priority, str(-neg_priority))
+                queued[name] = queued.get(name, 0) + 1
+        waits = {}
+        for priority, samples in self._waits.items():
+            ordered = sorted(samples)
+            waits[_CLASS_NAMES.get(priority, str(priority))] = {
+                "started": self._started.get(priority, 0),
+                "mean_ms": round(sum(ordered) / len(ordered), 1) if ordered else 0.0,
+                "p95_ms": round(ordered[int(len(ordered) * 0.95)] if ordered else 0.0, 1),
+                "max_ms": round(ordered[-1], 1) if ordered else 0.0,
+            }
+        return {
+            "max_jobs": self.max_jobs, "thread_budget": self.thread_budget,
+            "running": self._running, "threads_in_use": self._threads_used,
+            "queued": queued, "queue_depth": sum(queued.values()), "waits": waits,
+        }
+
+
+_scheduler: FFmpegScheduler | None = None
+
+
+def _configured_budget() -> tuple[int, int]:
+    """(max_jobs, thread_budget) for the whole machine, from config."""
+    config = load_config()
+    cores = os.cpu_count() or 2
+    return (int(get_nested(config, "ffmpeg.max_jobs", max(1, min(4, cores // 2)))),
+            int(get_nested(config, "ffmpeg.thread_budget", cores)))
+
+
+def get_scheduler() -> FFmpegScheduler:
+    """The process-wide scheduler, sized on first use (env share, else config)."""
+    global _scheduler
+    if _scheduler is None:
+        max_jobs, thread_budget = _configured_budget()
+        _scheduler = FFmpegScheduler(
+            int(os.environ.get(ENV_MAX_JOBS, max_jobs)),
+            int(os.environ.get(ENV_THREAD_BUDGET, thread_budget)),
+        )
+    return _scheduler
+
+
+def split_budget(processes: int) -> dict[str, str]:
+    """Share the machine's budget evenly between *processes* FFmpeg-running processes.
+
+    Sizes this process's scheduler to one share and returns the
+    environment that gives a spawned process its share.
+    """
+    max_jobs, thread_budget = _configured_budget()
+    processes = max(1, processes)
+    max_jobs, thread_budget = max(1, max_jobs // processes), max(1, thread_budget // processes)
+    scheduler = get_scheduler()
+    scheduler.max_jobs, scheduler.thread_budget = max_jobs, thread_budget
+    return {ENV_MAX_JOBS: str(max_jobs), ENV_THREAD_BUDGET: str(thread_budget)}
+
+
+def with_threads(args: list[str], threads: int) -> list[str]:
+    """FFmpeg *args* with ``-threads`` / ``-filter_threads`` set unless the caller chose.
+
+    ``-threads`` goes before the last output, where it caps the encoder.
+    """
+    args = list(args)
+    if "-filter_threads" not in args:
+        args = ["-filter_threads", str(threads), *args]
+    if "-threads" not in args and args and not str(args[-1]).startswith("-"):
+        args[-1:-1] = ["-threads", str(threads)]
+    return args
@@ -1,8 +1,12 @@
 """Async subprocess helper for AppleScript and FFmpeg calls."""
 
 import asyncio
+import os
 from typing import Sequence
 
+from . import cancellation, ffmpeg_scheduler
+from .cancellation import CancelToken
+
 
 async def run_osascript(script: str, timeout: float = 30.0) -> str:
     """Run an AppleScript and return stdout."""
@@ -31,21 +35,36 @@ async def run_command(
     *,
     timeout: float = 120.0,
     cwd: str | None = None,
+    cancel_token: CancelToken | None = None,
+    priority: int | None = None,
 ) -> tuple[str, str, int]:
-    """Run a command and return (stdout, stderr, returncode)."""
+    """Run a command and return (stdout, stderr, returncode).
+
+    Killed on timeout or when the (explicit or current) cancel token fires.
+    An ffmpeg command first waits for a job slot in the FFmpeg scheduler,
+    like run_ffmpeg.
+    """
+    if args and os.path.basename(args[0]) == "ffmpeg":
+        async with ffmpeg_scheduler.get_scheduler().job(priority, cancel_token) as threads:
+            return await _run(
+                [args[0], *ffmpeg_scheduler.with_threads(list(args[1:]), threads)],
+                timeout, cwd, cancel_token,
+            )
+    return await _run(args, timeout, cwd, cancel_token)
+
+
+async def _run(args: Sequence[str], timeout: float, cwd: str | None,
+               cancel_token: CancelToken | None) -> tuple[str, str, int]:
     proc = await asyncio.create_subprocess_exec(
         *args,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
         cwd=cwd,
+        start_new_session=True,
     )
     try:
-        stdout, stderr = await asyncio.wait_for(
-            proc.communicate(), timeout=timeout
-        )
-    except asyncio.TimeoutError:
-        proc.kill()
-        await proc.communicate()
+        stdout, stderr = await cancellation.communicate(proc, timeout=timeout, token=cancel_token)
+    except TimeoutError:
         raise TimeoutError(f"Command timed out after {timeout}s: {args[0]}")
 
     return stdout.decode(), stderr.decode(), proc.returncode
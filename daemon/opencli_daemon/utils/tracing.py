@@ -0,0 +1,241 @@
+"""Structured tracing spans for pipeline runs.
+
+execute_pipeline opens a Trace and binds it to the running context; code
+below it — node execution, the domain registry, run_inference, run_ffmpeg,
+asset registration, progress broadcasts — wraps its phases in span().
+Outside a trace span() is a no-op, so the instrumented helpers cost
+nothing when called directly.
+
+Spans nest through a contextvar, which asyncio copies into new tasks, so
+concurrent nodes get the right parents. Node spans open a new *track*
+(the lowest free lane), which becomes the thread row in a Chrome trace.
+
+Finished traces are kept as JSON under ~/.opencli/traces/<run_id>.json
+and exported as Chrome trace-event JSON (chrome://tracing, Perfetto) or
+OpenTelemetry OTLP/JSON.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+_HOME = Path(os.environ.get("HOME", "."))
+TRACE_DIR = _HOME / ".opencli" / "traces"
+
+# Trace files kept on disk (oldest deleted first)
+MAX_TRACE_FILES = 200
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "track", "attrs")
+
+    def __init__(self, trace: "Trace", name: str, parent: "Span | None", track: int,
+                 attrs: dict[str, Any], start_ns: int | None = None) -> None:
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: int | None = None
+        self.track = track
+        self.attrs = attrs
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "span_id": self.span_id, "parent_id": self.parent_id, "name": self.name,
+            "start_ns": self.start_ns, "end_ns": self.end_ns or time.time_ns(),
+            "track": self.track, "attrs": self.attrs,
+        }
+
+
+class Trace:
+    """All spans of one run."""
+
+    def __init__(self, trace_id: str, name: str) -> None:
+        self.trace_id = trace_id
+        self.name = name
+        self.spans: list[Span] = []
+        self._busy_tracks: set[int] = set()
+
+    def _take_track(self) -> int:
+        track = 1
+        while track in self._busy_tracks:
+            track += 1
+        self._busy_tracks.add(track)
+        return track
+
+    def to_json(self) -> dict[str, Any]:
+        return {"trace_id": self.trace_id, "name": self.name,
+                "spans": [s.to_json() for s in self.spans]}
+
+
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "opencli_trace_span", default=None,
+)
+
+# Traces of runs still in progress, by trace id
+_active: dict[str, Trace] = {}
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def span(name: str, *, new_track: bool = False, **attrs: Any) -> Iterator[Span | None]:
+    """Time the block as a child of the current span (no-op outside a trace)."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    trace = parent.trace
+    track = trace._take_track() if new_track else parent.track
+    current = Span(trace, name, parent, track, attrs)
+    trace.spans.append(current)
+    bound = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current.reset(bound)
+        if new_track:
+            trace._busy_tracks.discard(track)
+
+
+def add_span(name: str, start_ns: int, end_ns: int, **attrs: Any) -> None:
+    """Record an already-timed phase (e.g. reported by a subprocess) under the current span."""
+    parent = _current.get()
+    if parent is None:
+        return
+    child = Span(parent.trace, name, parent, parent.track, attrs, start_ns=start_ns)
+    child.end_ns = end_ns
+    parent.trace.spans.append(child)
+
+
+@contextlib.contextmanager
+def start_trace(trace_id: str, name: str, **attrs: Any) -> Iterator[Trace]:
+    """Open a trace with a root span and bind it for the duration of the block."""
+    trace = Trace(trace_id, name)
+    root = Span(trace, name, None, trace._take_track(), attrs)
+    trace.spans.append(root)
+    _active[trace_id] = trace
+    bound = _current.set(root)
+    try:
+        yield trace
+    except BaseException as e:
+        root.attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        root.end_ns = time.time_ns()
+        _current.reset(bound)
+        _active.pop(trace_id, None)
+
+
+# ── Storage ──────────────────────────────────────────────────────────────────
+
+
+def _trace_path(trace_id: str) -> Path:
+    return TRACE_DIR / f"{Path(trace_id).name}.json"
+
+
+def save_trace(trace: Trace) -> None:
+    """Write *trace* to disk and drop the oldest files beyond MAX_TRACE_FILES."""
+    TRACE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _trace_path(trace.trace_id)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(trace.to_json(), f, default=str)
+    os.replace(tmp, path)
+    files = sorted(TRACE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for old in files[:max(0, len(files) - MAX_TRACE_FILES)]:
+        with contextlib.suppress(OSError):
+            old.unlink()
+
+
+def load_trace(trace_id: str) -> dict[str, Any] | None:
+    """A finished trace from disk, or the live one if the run is in progress."""
+    live = _active.get(trace_id)
+    if live is not None:
+        return live.to_json()
+    path = _trace_path(trace_id)
+    if not path.is_file():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# ── Export ───────────────────────────────────────────────────────────────────
+
+
+def to_chrome(trace: dict[str, Any]) -> dict[str, Any]:
+    """Chrome trace-event JSON: one complete ("X") event per span, a row per track."""
+    spans = trace["spans"]
+    origin = min((s["start_ns"] for s in spans), default=0)
+    events: list[dict[str, Any]] = [{
+        "name": "process_name", "ph": "M", "pid": 1, "tid": 0,
+        "args": {"name": trace.get("name") or trace["trace_id"]},
+    }]
+    for track in sorted({s["track"] for s in spans}):
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": track,
+                       "args": {"name": f"lane {track}"}})
+    for s in spans:
+        events.append({
+            "name": s["name"], "cat": s["name"].split(" ", 1)[0], "ph": "X",
+            "ts": (s["start_ns"] - origin) / 1000,
+            "dur": max(0, s["end_ns"] - s["start_ns"]) / 1000,
+            "pid": 1, "tid": s["track"],
+            "args": s["attrs"],
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms",
+            "otherData": {"trace_id": trace["trace_id"]}}
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value if isinstance(value, str) else json.dumps(value, default=str)}
+
+
+def to_otlp(trace: dict[str, Any]) -> dict[str, Any]:
+    """OpenTelemetry OTLP/JSON (ExportTraceServiceRequest) for collectors and Jaeger."""
+    # OTLP wants a 16-byte trace id; derive a stable one from ours
+    trace_id = hashlib.sha256(trace["trace_id"].encode()).hexdigest()[:32]
+    out = []
+    for s in trace["spans"]:
+        attrs = s["attrs"]
+        span_json: dict[str, Any] = {
+            "traceId": trace_id,
+            "spanId": s["span_id"],
+            "name": s["name"],
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(s["start_ns"]),
+            "endTimeUnixNano": str(s["end_ns"]),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attrs.items()],
+            "status": {"code": 2, "message": str(attrs["error"])} if "error" in attrs else {"code": 1},
+        }
+        if s["parent_id"]:
+            span_json["parentSpanId"] = s["parent_id"]
+        out.append(span_json)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": "opencli-daemon"}},
+            {"key": "opencli.run_id", "value": {"stringValue": trace["trace_id"]}},
+        ]},
+        "scopeSpans": [{"scope": {"name": "opencli_daemon.pipeline"}, "spans": out}],
+    }]}
@@ -13,6 +13,9 @@ import time
 import httpx
 import websockets
 
+from opencli_daemon.pipeline.worker_pool import WorkerPool, WorkerUnavailable, encode_message
+from opencli_daemon.utils.auth import generate_sha256_token
+
 BASE = "http://localhost:9529"
 WS_URL = "ws://localhost:9529/ws"
 AUTH_SECRET = "opencli-dev-secret"
@@ -158,6 +161,27 @@ async def test_rest():
         else:
             fail("DELETE /api/v1/chat/messages", f"{r.status_code}")
 
+        # ── Full-text search ──
+        print("\n== Search ==")
+        await c.post("/api/v1/history", json={
+            "id": "test_search_h1", "mode": "txt2img", "prompt": "zeppelin over a neon harbor",
+            "provider": "pollinations",
+        })
+        r = await c.get("/api/v1/search", params={"q": "zeppel"})
+        d = r.json()
+        hits = [x for x in d.get("results", []) if x.get("id") == "test_search_h1"]
+        if r.status_code == 200 and hits and "<mark>" in hits[0].get("snippet", ""):
+            ok(f"GET /api/v1/search ({d.get('total')} hits)")
+        else:
+            fail("GET /api/v1/search", f"{r.status_code} {r.text}")
+        await c.delete("/api/v1/history/test_search_h1")
+
+        r = await c.get("/api/v1/search", params={"q": "zeppelin", "types": "history"})
+        if r.status_code == 200 and not any(x.get("id") == "test_search_h1" for x in r.json().get("results", [])):
+            ok("GET /api/v1/search (deleted rows leave the index)")
+        else:
+            fail("GET /api/v1/search (deleted rows)", f"{r.status_code} {r.text}")
+
         # ── Pipelines CRUD ──
         print("\n== Pipelines ==")
         r = await c.get("/api/v1/pipelines")
@@ -212,6 +236,12 @@ async def test_rest():
         else:
             fail("GET /api/v1/episodes", f"{r.status_code}")
 
+        r = await c.get("/api/v1/episodes/resumable")
+        if r.status_code == 200 and "episodes" in r.json():
+            ok("GET /api/v1/episodes/resumable")
+        else:
+            fail("GET /api/v1/episodes/resumable", f"{r.status_code}")
+
         r = await c.post("/api/v1/episodes", json={
             "title": "Test Episode", "narrative": "A hero sets out on an adventure.",
             "scenes": [], "characters": []
@@ -323,6 +353,49 @@ async def test_rest():
             else:
                 fail("POST /api/v1/pipelines/{id}/run-from/{nodeId}", f"{d}")
 
+            # Full run, then resume from n2 using the persisted run history
+            d = (await c.post("/api/v1/pipelines/test_rfn/run", json={})).json()
+            run_id = d.get("run_id")
+            r = await c.post("/api/v1/pipelines/test_rfn/run-from/n2", json={"run_id": run_id})
+            d = r.json()
+            if run_id and d.get("success") and d.get("node_statuses", {}).get("n1") == "completed":
+                ok("POST /api/v1/pipelines/{id}/run-from/{nodeId} (server-side results)")
+            else:
+                fail("POST /api/v1/pipelines/{id}/run-from/{nodeId} (server-side results)", f"{d}")
+
+            r = await c.get(f"/api/v1/pipelines/runs/{run_id}")
+            d = r.json()
+            if d.get("success") and len(d["run"]["nodes"]) == 2:
+                ok("GET /api/v1/pipelines/runs/{runId}")
+            else:
+                fail("GET /api/v1/pipelines/runs/{runId}", f"{d}")
+
+            d = (await c.get(f"/api/v1/pipelines/runs/{run_id}/trace")).json()
+            if any(e.get("name", "").startswith("node ") for e in d.get("traceEvents", [])):
+                ok("GET /api/v1/pipelines/runs/{runId}/trace")
+            else:
+                fail("GET /api/v1/pipelines/runs/{runId}/trace", f"{d}")
+
+            r = await c.get("/api/v1/pipelines/test_rfn/runs")
+            if r.status_code == 200 and len(r.json().get("runs", [])) >= 3:
+                ok("GET /api/v1/pipelines/{id}/runs")
+            else:
+                fail("GET /api/v1/pipelines/{id}/runs", f"{r.status_code} {r.text}")
+
+            # Async job: submit returns immediately, result long-polls
+            d = (await c.post("/api/v1/pipelines/test_rfn/submit", json={"priority": 1})).json()
+            job_id = d.get("run_id")
+            if d.get("success") and job_id:
+                ok("POST /api/v1/pipelines/{id}/submit")
+            else:
+                fail("POST /api/v1/pipelines/{id}/submit", f"{d}")
+            r = await c.get(f"/api/v1/pipelines/jobs/{job_id}/result", params={"wait": 5})
+            d = r.json()
+            if d.get("done") and d.get("status") == "completed":
+                ok("GET /api/v1/pipelines/jobs/{runId}/result (long-poll)")
+            else:
+                fail("GET /api/v1/pipelines/jobs/{runId}/result", f"{d}")
+
             await c.delete("/api/v1/pipelines/test_rfn")
         else:
             fail("POST /api/v1/pipelines (run-from-node setup)", f"{r.status_code}")
@@ -565,6 +638,45 @@ async def test_ws_bad_auth():
         fail("WS bad auth", str(e))
 
 
+async def test_worker_disconnect():
+    """In-process: a task whose only worker disconnects falls back to in-process."""
+    print("\n== Worker Pool Disconnect ==")
+    pool = WorkerPool(port=0)
+    await pool.start()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", pool.port)
+        ts = int(time.time() * 1000)
+        writer.write(encode_message({
+            "type": "hello", "worker_id": "fake_worker", "timestamp": ts,
+            "token": generate_sha256_token("fake_worker", ts, AUTH_SECRET),
+            "slots": 1, "task_types": [],
+        }))
+        await writer.drain()
+        await reader.readline()  # welcome
+        if not await pool.wait_for_workers(1, 5):
+            fail("Worker disconnect", "Fake worker never connected")
+            return
+
+        execution = asyncio.create_task(pool.execute("calculator_eval", {"expression": "1+1"}))
+        task = json.loads(await asyncio.wait_for(reader.readline(), timeout=5))
+        if task.get("type") != "task":
+            fail("Worker disconnect", f"Expected a task, got {task}")
+            return
+        # Drop the connection mid-task with no other worker connected
+        writer.close()
+        try:
+            await asyncio.wait_for(execution, timeout=5)
+            fail("Worker disconnect", "execute() returned instead of raising WorkerUnavailable")
+        except WorkerUnavailable:
+            ok("Task of a disconnected sole worker raises WorkerUnavailable")
+        except asyncio.TimeoutError:
+            fail("Worker disconnect", "execute() still pending after the worker disconnected")
+    except Exception as e:
+        fail("Worker disconnect", str(e))
+    finally:
+        await pool.stop()
+
+
 async def main():
     print("=" * 60)
     print("  OpenCLI Python Daemon — Integration Tests")
@@ -576,6 +688,7 @@ async def main():
     await test_ws_chat()
     await test_ws_task_submitted()
     await test_ws_bad_auth()
+    await test_worker_disconnect()
 
     print("\n" + "=" * 60)
     print(f"  Results: {passed} passed, {failed} failed")
@@ -22,6 +22,15 @@ import time
 from io import BytesIO
 from pathlib import Path
 
+# Phase marks reported back to the daemon's trace as [name, epoch seconds];
+# each phase lasts until the next mark
+_MARKS = [["startup", time.time()]]
+
+
+def _mark(phase):
+    _MARKS.append([phase, time.time()])
+
+
 # Model registry
 MODELS = {
     "waifu_diffusion": {
@@ -303,6 +312,43 @@ def _download_animegan(model_dir):
         return {"error": f"Download failed: {str(e)}"}
 
 
+# Pipelines kept loaded while run_batch() is running, keyed by model id
+_BATCH_PIPES = None
+
+
+def _load_text2img(model_id, info, model_dir, device, dtype):
+    """Load a text-to-image pipeline (reused across the items of a batch)."""
+    if _BATCH_PIPES is not None and model_id in _BATCH_PIPES:
+        return _BATCH_PIPES[model_id]
+
+    _mark("model_load")
+
+    if info["pipeline"] == "StableDiffusionXLPipeline":
+        from diffusers import StableDiffusionXLPipeline
+
+        pipe = StableDiffusionXLPipeline.from_pretrained(
+            str(model_dir), torch_dtype=dtype, use_safetensors=True
+        )
+    else:
+        from diffusers import StableDiffusionPipeline
+
+        pipe = StableDiffusionPipeline.from_pretrained(
+            str(model_dir), torch_dtype=dtype, use_safetensors=True
+        )
+
+    pipe = pipe.to(device)
+
+    # Enable memory optimizations
+    if device == "cuda":
+        pipe.enable_model_cpu_offload()
+    elif device == "mps":
+        pass  # MPS doesn't support cpu offload well
+
+    if _BATCH_PIPES is not None:
+        _BATCH_PIPES[model_id] = pipe
+    return pipe
+
+
 def generate_image(params):
     """Generate an image using a local text-to-image model."""
     import torch
@@ -332,33 +378,14 @@ def generate_image(params):
     dtype = torch.float16 if device in ("cuda", "mps") else torch.float32
 
     try:
-        # Load pipeline
-        if info["pipeline"] == "StableDiffusionXLPipeline":
-            from diffusers import StableDiffusionXLPipeline
-
-            pipe = StableDiffusionXLPipeline.from_pretrained(
-                str(model_dir), torch_dtype=dtype, use_safetensors=True
-            )
-        else:
-            from diffusers import StableDiffusionPipeline
-
-            pipe = StableDiffusionPipeline.from_pretrained(
-                str(model_dir), torch_dtype=dtype, use_safetensors=True
-            )
-
-        pipe = pipe.to(device)
-
-        # Enable memory optimizations
-        if device == "cuda":
-            pipe.enable_model_cpu_offload()
-        elif device == "mps":
-            pass  # MPS doesn't support cpu offload well
+        pipe = _load_text2img(model_id, info, model_dir, device, dtype)
 
         generator = None
         if seed is not None:
             generator = torch.Generator(device=device).manual_seed(seed)
 
         # Generate
+        _mark("diffusion")
         result = pipe(
             prompt=prompt,
             negative_prompt=negative_prompt,
@@ -369,6 +396,8 @@ def generate_image(params):
             generator=generator,
         )
 
+        _mark("encode")
+
         image = result.images[0]
 
         # Convert to base64
@@ -387,13 +416,14 @@ def generate_image(params):
     except Exception as e:
         return {"error": f"Generation failed: {str(e)}"}
     finally:
-        # Free memory
-        try:
-            del pipe
-            if device == "cuda":
-                torch.cuda.empty_cache()
-        except Exception:
-            pass
+        # Free memory (a batch keeps the pipeline for its next item)
+        if _BATCH_PIPES is None:
+            try:
+                del pipe
+                if device == "cuda":
+                    torch.cuda.empty_cache()
+            except Exception:
+                pass
 
 
 def generate_video_animatediff(params):
@@ -418,6 +448,8 @@ def generate_video_animatediff(params):
     try:
         from diffusers import AnimateDiffPipeline, MotionAdapter, DDIMScheduler
 
+        _mark("model_load")
+
         adapter = MotionAdapter.from_pretrained(str(model_dir), torch_dtype=dtype)
 
         pipe = AnimateDiffPipeline.from_pretrained(
@@ -438,6 +470,8 @@ def generate_video_animatediff(params):
         if device == "cuda":
             pipe.enable_model_cpu_offload()
 
+        _mark("diffusion")
+
         result = pipe(
             prompt=prompt,
             negative_prompt=negative_prompt,
@@ -446,6 +480,8 @@ def generate_video_animatediff(params):
             guidance_scale=guidance_scale,
         )
 
+        _mark("encode")
+
         frames = result.frames[0]  # List of PIL Images
 
         # Save as MP4 using PIL/imageio or ffmpeg
@@ -504,6 +540,8 @@ def generate_video_svd(params):
         from diffusers import StableVideoDiffusionPipeline
         from diffusers.utils import export_to_video
 
+        _mark("model_load")
+
         pipe = StableVideoDiffusionPipeline.from_pretrained(
             str(model_dir), torch_dtype=dtype, variant="fp16" if device == "cuda" else None
         )
@@ -517,12 +555,16 @@ def generate_video_svd(params):
         image = Image.open(BytesIO(img_bytes)).convert("RGB")
         image = image.resize((1024, 576))
 
+        _mark("diffusion")
+
         result = pipe(
             image,
             num_frames=num_frames,
             decode_chunk_size=decode_chunk_size,
         )
 
+        _mark("encode")
+
         frames = result.frames[0]
         output_path = MODELS_DIR / "output" / f"svd_{int(time.time())}.mp4"
         output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -672,6 +714,7 @@ def generate_video_animatediff_v3(params):
         from diffusers import AnimateDiffPipeline, MotionAdapter, DDIMScheduler
 
         # Load V3 motion adapter
+        _mark("model_load")
         adapter = MotionAdapter.from_pretrained(str(model_dir), torch_dtype=dtype)
 
         pipe = AnimateDiffPipeline.from_pretrained(
@@ -740,6 +783,8 @@ def generate_video_animatediff_v3(params):
 
         print(json.dumps({"progress": 0.2, "message": f"Generating {num_frames} frames at {width}x{height}, {steps} steps..."}), flush=True)
 
+        _mark("diffusion")
+
         result = pipe(
             prompt=prompt,
             negative_prompt=negative_prompt,
@@ -751,6 +796,8 @@ def generate_video_animatediff_v3(params):
             generator=generator,
         )
 
+        _mark("encode")
+
         frames = result.frames[0]  # List of PIL Images
 
         output_path = MODELS_DIR / "output" / f"animatediff_v3_{int(time.time())}.mp4"
@@ -893,6 +940,34 @@ def upscale_realesrgan(params):
         return {"error": f"Upscale failed: {str(e)}"}
 
 
+def _video_fps(params, video_path):
+    """Frame rate of *video_path*: params["fps"] (probed by the daemon) or ffprobe."""
+    import subprocess
+
+    try:
+        fps = float(params.get("fps") or 0)
+    except (TypeError, ValueError):
+        fps = 0.0
+    if fps > 0:
+        return fps
+
+    probe = subprocess.run([
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=r_frame_rate",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        video_path,
+    ], capture_output=True, text=True)
+    fps_str = probe.stdout.strip()
+    try:
+        if "/" in fps_str:
+            num, den = fps_str.split("/")
+            return float(num) / float(den)
+        return float(fps_str)
+    except (ValueError, ZeroDivisionError):
+        return 12.0
+
+
 def interpolate_rife(params):
     """Interpolate video frames using rife-ncnn-vulkan for smooth motion."""
     import subprocess
@@ -940,23 +1015,7 @@ def interpolate_rife(params):
             if frame_count < 2:
                 return {"error": "Not enough frames to interpolate"}
 
-            # Get original fps
-            probe = subprocess.run([
-                "ffprobe", "-v", "error",
-                "-select_streams", "v:0",
-                "-show_entries", "stream=r_frame_rate",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                video_path,
-            ], capture_output=True, text=True)
-            fps_str = probe.stdout.strip()
-            try:
-                if "/" in fps_str:
-                    num, den = fps_str.split("/")
-                    orig_fps = float(num) / float(den)
-                else:
-                    orig_fps = float(fps_str)
-            except (ValueError, ZeroDivisionError):
-                orig_fps = 12.0
+            orig_fps = _video_fps(params, video_path)
 
             target_fps = orig_fps * multiplier
 
@@ -1165,6 +1224,8 @@ def generate_controlnet_video(params):
 
         from diffusers import ControlNetModel, MotionAdapter, DDIMScheduler
 
+        _mark("model_load")
+
         controlnet = ControlNetModel.from_pretrained(str(cn_dir), torch_dtype=dtype)
         adapter = MotionAdapter.from_pretrained(str(v3_dir), torch_dtype=dtype)
 
@@ -1264,6 +1325,7 @@ def generate_controlnet_video(params):
             gen_kwargs["conditioning_frames"] = [control_image] * num_frames
 
         result = pipe(**gen_kwargs)
+        _mark("encode")
         frames = result.frames[0]
 
         # Step 6: Export to MP4
@@ -1353,23 +1415,7 @@ def upscale_video_path(params):
                 os.path.join(frames_dir, "frame_%06d.png"),
             ], capture_output=True, text=True)
 
-            # Get fps
-            probe = subprocess.run([
-                "ffprobe", "-v", "error",
-                "-select_streams", "v:0",
-                "-show_entries", "stream=r_frame_rate",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                video_path,
-            ], capture_output=True, text=True)
-            fps_str = probe.stdout.strip()
-            try:
-                if "/" in fps_str:
-                    num, den = fps_str.split("/")
-                    fps = float(num) / float(den)
-                else:
-                    fps = float(fps_str)
-            except (ValueError, ZeroDivisionError):
-                fps = 12.0
+            fps = _video_fps(params, video_path)
 
             frame_files = sorted([f for f in os.listdir(frames_dir) if f.endswith(".png")])
             total = len(frame_files)
@@ -1425,6 +1471,31 @@ def upscale_video_path(params):
         return {"error": f"Video upscale failed: {str(e)}"}
 
 
+def run_batch(params):
+    """Run several actions in one process so each model is loaded once.
+
+    params: {"items": [{"action": ..., ...}, ...]} → {"success", "results": [...]}
+    """
+    global _BATCH_PIPES
+    _BATCH_PIPES = {}
+    try:
+        results = []
+        for item in params.get("items", []):
+            try:
+                results.append(handle_action(item.get("action", ""), item))
+            except Exception as e:
+                results.append({"error": str(e)})
+        return {"success": True, "results": results}
+    finally:
+        _BATCH_PIPES = None
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+
+
 def handle_action(action: str, params: dict) -> dict:
     """Dispatch an action with params. Importable by daemon's local_inference.py."""
     dispatch = {
@@ -1444,10 +1515,12 @@ def handle_action(action: str, params: dict) -> dict:
         "extract_control": extract_control_signal,
         "generate_controlnet_video": generate_controlnet_video,
         "upscale_video_path": upscale_video_path,
+        "batch": run_batch,
     }
     fn = dispatch.get(action)
     if not fn:
         return {"error": f"Unknown action: {action}"}
+    _mark(action)
     return fn(params)
 
 
@@ -1482,6 +1555,9 @@ def main():
         print(json.dumps(result, indent=2))
     elif args.stdin or not sys.stdin.isatty():
         result = handle_stdin()
+        if isinstance(result, dict):
+            _mark("end")
+            result["_phases"] = _MARKS
         print(json.dumps(result))
     else:
         parser.print_help()